@@ -0,0 +1,95 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from django.conf import settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from project import versions
+
+# JWT 인증 유저 캐시
+# 토큰에 user_id 가 들어 있는데도 기본 JWTCookieAuthentication 은 요청마다 User 를 SELECT 한다.
+# 워커 메모리에 user_id -> User 를 LRU + TTL 로 기억해 두고, 요청에는 복사본을 넘긴다 (요청 안에서 바꿔도 캐시는 그대로).
+# 유저를 저장 / 삭제하면 project.versions 의 유저 버전을 올려서 (accounts/signals.py) 모든 워커의 캐시가 그 유저를 다시 읽는다.
+
+
+def user_version(user_id):
+    return (versions.get(versions.USERS), versions.get_user(user_id))
+
+
+class UserCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()  # user_id -> (만료 시각, 버전, User)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != user_version(user_id):
+                self._cache.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return copy.copy(entry[2])
+
+    def set(self, user_id, user, version):
+        # version: DB 에서 읽기 전에 본 user_version. 읽는 사이에 바뀌었으면 오래된 객체이므로 저장하지 않는다
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if version != user_version(user_id):
+                return
+            self._cache[user_id] = (time.monotonic() + self.ttl, version, copy.copy(user))
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, user_id):
+        # 모든 워커에서 이 유저를 다시 읽게 함
+        versions.bump_user(user_id)
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def clear(self):
+        versions.bump(versions.USERS)
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        return {'size': len(self._cache), 'max_entries': self.max_entries, 'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses}
+
+
+users = UserCache(
+    max_entries=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+class CachedJWTCookieAuthentication(JWTCookieAuthentication):
+    # dj_rest_auth.jwt_auth.JWTCookieAuthentication 과 같고, 토큰의 유저만 캐시에서 찾는다
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        user = users.get(user_id)
+        if user is None:
+            version = user_version(user_id)
+            user = super().get_user(validated_token)
+            users.set(user_id, user, version)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
@@ -0,0 +1,57 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import User
+from accounts.authentication import users
+
+
+class Command(BaseCommand):
+    help = '테스트 DB에서 JWT 쿠키 인증 요청의 쿼리 수 / 지연 시간을 유저 캐시를 끄고 / 켜고 비교한다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--path', default='/api/accounts/mypage/', help='측정할 API 경로 (로그인 필요)')
+
+    def handle(self, *args, **options):
+        # 실제 DB를 건드리지 않도록 테스트 DB를 만들어서 측정
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = User.objects.create_user(email='bench@example.com', username='bench', nickname='bench')
+            token = str(RefreshToken.for_user(user).access_token)
+            max_entries = users.max_entries
+            try:
+                # 캐시 크기 0 이면 매번 DB 에서 읽는다 (기본 JWTCookieAuthentication 과 같음)
+                for label, size in [('cache off', 0), ('cache on', max_entries or 1024)]:
+                    users.max_entries = size
+                    users.clear()
+                    self.run(label, token, options)
+            finally:
+                users.max_entries = max_entries
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, label, token, options):
+        with override_settings(ALLOWED_HOSTS=['*']):
+            client = Client()
+            client.cookies['access_token'] = token
+            timings = []
+            queries = []
+            for _ in range(options['requests']):
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    response = client.get(options['path'])
+                    timings.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.status_code
+                queries.append(len(ctx.captured_queries))
+
+        # 첫 요청은 캐시가 비어 있으므로 평균은 두 번째 요청부터
+        steady = queries[1:] or queries
+        self.stdout.write(
+            f'{label:10} first={queries[0]} queries  steady={statistics.mean(steady):.2f} queries/request  '
+            f'p50={statistics.median(timings):.2f}ms'
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-20 00:30
+
+from django.db import migrations, models
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+
+
+def fill_is_new_user(apps, schema_editor):
+    # accounts/onboarding.py refresh 의 UPDATE 만 (인증 캐시 / 버전 파일은 건드리지 않음)
+    User = apps.get_model('accounts', 'User')
+    categories = User._meta.get_field('preferred_routine_categories').remote_field.through.objects.filter(user=OuterRef('pk'))
+    User.objects.update(is_new_user=Case(
+        When(Q(Exists(categories)) & ~Q(nickname=''), then=Value(False)),
+        default=Value(True),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_new_user',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(fill_is_new_user, migrations.RunPython.noop),
+    ]
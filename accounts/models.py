@@ -25,6 +25,8 @@ class User(AbstractUser):
     is_staff = models.BooleanField(default=False)
     preferred_routine_categories = models.ManyToManyField(RoutineCategory, blank=True)
     nickname = models.CharField(max_length=30, null=False, blank=True)
+    # 온보딩(닉네임 + 선호 카테고리)을 마치지 않은 유저 (accounts/onboarding.py 에서 갱신)
+    is_new_user = models.BooleanField(default=True, editable=False)
 
     groups = models.ManyToManyField(
         Group,
@@ -48,6 +50,10 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.email
-    
-    def is_new_user(self):
-        return not (self.preferred_routine_categories.exists() and self.nickname)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 닉네임이 바뀐 저장에서만 온보딩 상태를 다시 계산하도록 불러온 값을 기억 (accounts/signals.py)
+        instance._loaded_nickname = instance.__dict__.get('nickname')
+        return instance
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import weakref
+from contextlib import asynccontextmanager
+
+import httpx
+from asgiref.sync import sync_to_async
+from dj_rest_auth.registration.serializers import SocialLoginSerializer
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+# 소셜 로그인 (카카오 / 구글) 토큰 교환을 비동기로
+# 기본 SocialLoginView 는 code -> access token 교환, 프로필 조회를 requests 로 동기 호출해서,
+# 제공자 응답이 느리면 그동안 워커가 통째로 묶인다.
+# 이 두 요청을 httpx.AsyncClient 로 보내고 (타임아웃, 워커당 동시 요청 수 제한),
+# 받은 토큰 / 프로필을 request 에 담아서 기존 SocialLoginView 에 넘긴다. 이후 DB 작업(계정 연결, JWT 발급)만 동기로 실행된다.
+# ASGI 서버(project/asgi.py)에서는 워커의 이벤트 루프마다 클라이언트 하나와 동시 요청 제한을 두고 같이 쓰며, 서버가 내려갈 때(lifespan) 닫는다.
+# WSGI 에서는 요청마다 이벤트 루프가 새로 만들어지므로 클라이언트를 요청 안에서 열고 닫는다 (동시 요청 수는 워커 스레드 수가 제한).
+# 제공자 주소는 SOCIAL_LOGIN_PROVIDER_URLS 로 바꿀 수 있다 (로컬 가짜 제공자 등).
+
+
+class ProviderError(Exception):
+    def __init__(self, detail, status):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def open_client():
+    return httpx.AsyncClient(timeout=httpx.Timeout(getattr(settings, 'SOCIAL_LOGIN_HTTP_TIMEOUT', 5)))
+
+
+class Pool:
+    # 이벤트 루프 하나에서 같이 쓰는 클라이언트 + 동시 요청 제한
+    def __init__(self, client, slots=None):
+        self.client = client
+        self.slots = slots or asyncio.Semaphore(getattr(settings, 'SOCIAL_LOGIN_MAX_CONCURRENCY', 20))
+
+
+pools = weakref.WeakKeyDictionary()  # ASGI 워커의 이벤트 루프 -> Pool
+
+
+@asynccontextmanager
+async def provider_pool(request):
+    if not isinstance(request, ASGIRequest):
+        async with open_client() as client:
+            yield Pool(client)
+        return
+    loop = asyncio.get_running_loop()
+    pool = pools.get(loop)
+    if pool is None or pool.client.is_closed:
+        pool = pools[loop] = Pool(open_client())
+    yield pool
+
+
+async def close_pool():
+    # 서버 종료 시 (project/asgi.py 의 lifespan.shutdown)
+    pool = pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.client.aclose()
+
+
+async def acquire_slot(pool):
+    # 자리가 날 때까지 기다리다가 시간이 지나면 실패. 기다리는 중에 요청이 취소되면 wait_for 가 acquire 도 같이 취소한다
+    try:
+        await asyncio.wait_for(pool.slots.acquire(), getattr(settings, 'SOCIAL_LOGIN_QUEUE_TIMEOUT', 2))
+    except asyncio.TimeoutError:
+        raise ProviderError('Too many social logins in progress. Try again shortly.', 503)
+
+
+def provider_url(adapter_class, name, default):
+    # name: 'token' / 'profile'
+    urls = getattr(settings, 'SOCIAL_LOGIN_PROVIDER_URLS', {}).get(adapter_class.provider_id, {})
+    return urls.get(name, default)
+
+
+def profile_url(adapter_class):
+    # 카카오는 profile_url, 구글은 identity_url
+    return provider_url(adapter_class, 'profile', getattr(adapter_class, 'profile_url', None) or adapter_class.identity_url)
+
+
+async def request_json(pool, method, url, **kwargs):
+    await acquire_slot(pool)
+    try:
+        response = await pool.client.request(method, url, **kwargs)
+    except httpx.TimeoutException:
+        raise ProviderError('The login provider did not respond in time.', 504)
+    except httpx.HTTPError:
+        raise ProviderError('Could not reach the login provider.', 502)
+    finally:
+        pool.slots.release()
+
+    if response.status_code >= 500:
+        raise ProviderError('The login provider returned an error.', 502)
+    if response.status_code >= 400:
+        raise ProviderError('The login provider rejected the code or token.', 400)
+    try:
+        return response.json()
+    except ValueError:
+        raise ProviderError('The login provider returned an invalid response.', 502)
+
+
+async def exchange_code(pool, adapter_class, app, code, callback_url):
+    # OAuth2Client.get_access_token 과 같은 요청
+    data = {
+        'redirect_uri': callback_url,
+        'grant_type': 'authorization_code',
+        'code': code,
+    }
+    auth = None
+    if adapter_class.basic_auth:
+        auth = (app.client_id, app.secret)
+    else:
+        data.update(client_id=app.client_id, client_secret=app.secret)
+    token = await request_json(
+        pool,
+        'POST',
+        provider_url(adapter_class, 'token', adapter_class.access_token_url),
+        data=data,
+        auth=auth,
+        headers=adapter_class.headers,
+    )
+    if 'access_token' not in token:
+        raise ProviderError('The login provider did not return an access token.', 400)
+    return token
+
+
+async def fetch_profile(pool, adapter_class, access_token):
+    return await request_json(pool, 'GET', profile_url(adapter_class), headers={'Authorization': f'Bearer {access_token}'})
+
+
+def get_app(request, adapter_class):
+    # SocialApp 은 DB / settings 에서 읽으므로 동기로
+    return adapter_class(request).get_provider().app
+
+
+class PrefetchedSocialLoginSerializer(SocialLoginSerializer):
+    # AsyncSocialLoginView 가 미리 받아 둔 토큰 / 프로필이 있으면 제공자에 다시 요청하지 않는다
+    def prefetched(self):
+        return getattr(self._get_request(), 'prefetched_social_login', None)
+
+    def validate(self, attrs):
+        prefetched = self.prefetched()
+        if prefetched:
+            attrs = {**attrs, 'access_token': prefetched['token']['access_token'], 'code': '', 'id_token': ''}
+        return super().validate(attrs)
+
+    def get_social_login(self, adapter, app, token, response):
+        prefetched = self.prefetched()
+        if not prefetched:
+            return super().get_social_login(adapter, app, token, response)
+        request = self._get_request()
+        # refresh_token / 만료 시간까지 담긴 토큰으로
+        social_token = adapter.parse_token(prefetched['token'])
+        social_token.app = app
+        social_login = adapter.get_provider().sociallogin_from_response(request, prefetched['profile'])
+        social_login.token = social_token
+        return social_login
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncSocialLoginView(View):
+    # 제공자 요청만 비동기로 하고, 나머지는 login_view(SocialLoginView) 에 그대로 맡긴다
+    login_view = None
+
+    async def post(self, request, *args, **kwargs):
+        login_view = self.login_view
+        adapter_class = login_view.adapter_class
+        data = self.parse(request)
+        code = data.get('code')
+        access_token = data.get('access_token')
+
+        try:
+            if code or access_token:
+                async with provider_pool(request) as pool:
+                    if code:
+                        app = await sync_to_async(get_app)(request, adapter_class)
+                        token = await exchange_code(pool, adapter_class, app, code, login_view.callback_url)
+                    else:
+                        token = {'access_token': access_token}
+                    profile = await fetch_profile(pool, adapter_class, token['access_token'])
+                request.prefetched_social_login = {'token': token, 'profile': profile}
+        except ProviderError as e:
+            return JsonResponse({'detail': e.detail}, status=e.status)
+
+        # 입력이 잘못된 경우(토큰 없음 등)도 기존 뷰가 같은 에러 응답을 만든다
+        return await sync_to_async(login_view.as_view())(request, *args, **kwargs)
+
+    def parse(self, request):
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return {}
+            return data if isinstance(data, dict) else {}
+        return request.POST
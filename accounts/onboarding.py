@@ -0,0 +1,37 @@
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+
+from .authentication import users as user_cache
+
+# 온보딩 상태 (User.is_new_user)
+# 닉네임과 선호 카테고리가 모두 있어야 온보딩을 마친 유저다.
+# 직렬화할 때마다 카테고리 EXISTS 를 돌리지 않도록 컬럼에 저장해 두고, 닉네임 / 선호 카테고리가 바뀔 때만 다시 계산한다.
+
+
+def categories_through(User):
+    return User._meta.get_field('preferred_routine_categories').remote_field.through
+
+
+def is_new_user_expression(User):
+    categories = categories_through(User).objects.filter(user=OuterRef('pk'))
+    return Case(
+        When(Q(Exists(categories)) & ~Q(nickname=''), then=Value(False)),
+        default=Value(True),
+    )
+
+
+def refresh(users):
+    # 유저 queryset 의 온보딩 상태를 다시 계산 (UPDATE 한 번)
+    count = users.update(is_new_user=is_new_user_expression(users.model))
+    # queryset.update 는 post_save 를 보내지 않으므로 인증 캐시도 직접 비움
+    user_cache.clear()
+    return count
+
+
+def refresh_user(user, has_categories=None):
+    # 유저 하나: 닉네임이 없거나 has_categories 를 알고 있으면 EXISTS 없이 UPDATE 만, 아니면 EXISTS 한 번 + UPDATE
+    if has_categories is None and user.nickname:
+        has_categories = categories_through(user.__class__).objects.filter(user=user.pk).exists()
+    is_new_user = not (user.nickname and has_categories)
+    user.__class__.objects.filter(pk=user.pk).update(is_new_user=is_new_user)
+    user_cache.invalidate(user.pk)
+    user.is_new_user = is_new_user
@@ -0,0 +1,34 @@
+from django.db import transaction
+
+from .models import User
+from .signals import preferences_changed
+from . import onboarding
+
+# 선호 루틴 카테고리 저장
+# set() / clear() + add() 대신 지금 저장된 카테고리와 비교해서 추가분은 INSERT 한 번, 제거분은 DELETE 한 번으로 반영한다.
+# 연결 테이블만 바꾸고 User 행은 저장하지 않으며 (온보딩 상태만 갱신), 바뀐 것이 있으면 커밋 뒤 preferences_changed 를 보낸다.
+
+Through = User.preferred_routine_categories.through
+
+
+def update_preferences(user, categories):
+    # 선호 카테고리를 categories 로 바꾼다. (추가된 id, 제거된 id) 를 돌려준다
+    wanted = {getattr(category, 'pk', category) for category in categories}
+    with transaction.atomic():
+        current = set(Through.objects.filter(user=user.pk).values_list('routinecategory_id', flat=True))
+        added = wanted - current
+        removed = current - wanted
+        if added:
+            Through.objects.bulk_create(
+                [Through(user_id=user.pk, routinecategory_id=category_id) for category_id in added],
+                ignore_conflicts=True,
+            )
+        if removed:
+            Through.objects.filter(user=user.pk, routinecategory_id__in=removed).delete()
+        if added or removed:
+            onboarding.refresh_user(user, has_categories=bool(wanted))
+            transaction.on_commit(lambda: preferences_changed.send(sender=User, user=user, added=added, removed=removed))
+
+    # 이 요청에서 미리 읽어 둔 카테고리가 있으면 버림
+    getattr(user, '_prefetched_objects_cache', {}).pop('preferred_routine_categories', None)
+    return added, removed
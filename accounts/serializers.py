@@ -4,18 +4,16 @@ from .models import User
 from routine.models import RoutineCategory
 from rank.models import CelebScore
 from rank.serializers import MypageCelebSerializer
-from calen.models import UserRoutine
+from calen.models import UserRoutine, UserCelebProgress
 from celeb.models import Celeb
+from django.db.models import Q
 
-class UserSerializer(serializers.ModelSerializer):
-    is_new_user = serializers.SerializerMethodField()
+MYPAGE_CELEB_COUNT = 3  # 마이페이지에 보여줄 셀럽 수
 
+class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'email', 'is_new_user', 'nickname']
-
-    def get_is_new_user(self, obj):
-        return obj.is_new_user()
     
 
 class CustomRoutineSerializer(serializers.Serializer):
@@ -40,10 +38,23 @@ class UserProfileSerializer(serializers.ModelSerializer):
             return []
 
         user = request.user
+        k = MYPAGE_CELEB_COUNT
+
+        # 1) 완료 체크한 루틴이 많은 셀럽 k 개를 진행 현황 테이블에서 바로 (정렬 / LIMIT 은 SQL 에서)
+        counts = dict(
+            UserCelebProgress.objects.filter(user=user, checked_count__gt=0)
+            .order_by('-checked_count', 'celeb_id')
+            .values_list('celeb_id', 'checked_count')[:k]
+        )
 
-        celebs = Celeb.objects.all()
-        sorted_celebs = sorted(celebs, key=lambda celeb: MypageCelebSerializer(context={'request': request}).get_routines_added_count(celeb), reverse=True)
-        top_celebs = sorted_celebs[:3]
+        # 2) 그 셀럽들만 가져옴. k 개가 안 되면 기존처럼 나머지는 0개인 셀럽을 id 순으로 채움
+        condition = Q(pk__in=list(counts))
+        if len(counts) < k:
+            rest = Celeb.objects.exclude(pk__in=list(counts)).order_by('id').values('pk')[:k - len(counts)]
+            condition |= Q(pk__in=rest)
+        top_celebs = sorted(Celeb.objects.filter(condition), key=lambda celeb: (-counts.get(celeb.pk, 0), celeb.pk))
+        for celeb in top_celebs:
+            celeb.checked_routines_count = counts.get(celeb.pk, 0)
 
         return MypageCelebSerializer(top_celebs, many=True, context={'request': request}).data
     
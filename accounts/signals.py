@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver, Signal
+from routine.models import RoutineCategory
+from .models import User
+from .authentication import users
+from . import onboarding
+from project import cache as response_cache
+
+# 선호 카테고리가 바뀐 뒤(커밋 후) 보낸다: sender=User, user, added(set), removed(set)
+# 유저 맞춤 피드 캐시 등은 이 signal 로 해당 유저의 캐시를 버리면 된다
+preferences_changed = Signal()
+
+
+# 유저가 바뀌면 유저 버전을 바로 올리고, 커밋 뒤에 한 번 더 올린다 (그 사이 다른 요청이 커밋 전 값을 읽어 캐시했을 수 있음)
+# 모든 워커의 인증 캐시와 이 유저의 응답 캐시가 함께 무효화된다
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # 삭제 뒤에는 instance.pk 가 None 이 되므로 지금 값을 잡아 둔다
+    user_id = instance.pk
+    users.invalidate(user_id)
+    transaction.on_commit(lambda: users.invalidate(user_id))
+
+
+# 닉네임 / 선호 카테고리가 바뀌면 온보딩 상태(is_new_user)를 다시 계산
+@receiver(post_save, sender=User)
+def refresh_onboarding_on_nickname(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # 새 유저는 선호 카테고리가 없으므로 기본값(True) 그대로
+    if not created and instance.nickname != getattr(instance, '_loaded_nickname', None):
+        onboarding.refresh_user(instance)
+    instance._loaded_nickname = instance.nickname
+
+
+@receiver(m2m_changed, sender=User.preferred_routine_categories.through)
+def refresh_onboarding_on_categories(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            onboarding.refresh_user(instance)
+        return
+    # category.user_set.add(...) 처럼 카테고리 쪽에서 바꾼 경우
+    if action == 'pre_clear':
+        instance._onboarding_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        onboarding.refresh(User.objects.filter(pk__in=instance.__dict__.pop('_onboarding_user_ids', [])))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        onboarding.refresh(User.objects.filter(pk__in=pk_set))
+
+
+@receiver(pre_delete, sender=RoutineCategory)
+def refresh_onboarding_on_category_delete(sender, instance, **kwargs):
+    # 카테고리를 지우면 연결 행이 signal 없이 지워지므로, 커밋 뒤에 그 유저들을 다시 계산
+    user_ids = list(instance.user_set.values_list('pk', flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: onboarding.refresh(User.objects.filter(pk__in=user_ids)))
+
+
+# 선호 카테고리가 바뀌면 그 유저의 응답 캐시(메인 페이지 맞춤 루틴 등)를 버림
+# (유저를 저장할 때는 위의 invalidate_cached_user 가 같은 유저 버전을 올림)
+@receiver(preferences_changed, sender=User)
+def bump_user_response_cache_on_preferences(sender, user, **kwargs):
+    response_cache.bump_user(user.pk)
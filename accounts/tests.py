@@ -1,3 +1,430 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from calen.models import UserRoutine, UserRoutineCompletion
+from celeb.models import Celeb
+from routine.models import Routine, RoutineCategory
+from search import suggest
+from project import asgi, versions
+from .authentication import UserCache, user_version, users
+from .models import User
+from .preferences import update_preferences
+from .signals import preferences_changed
+from . import oauth, onboarding
+
+
+class AccountsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = datetime.date.today()
+        self.user = User.objects.create(email='user@example.com', username='user', nickname='유저')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class MypageTests(AccountsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.celebs = [Celeb.objects.create(name=f'셀럽{i}', profession='가수') for i in range(5)]
+
+    def check_routines(self, celeb, count):
+        for i in range(count):
+            routine = Routine.objects.create(title=f'루틴{i}', sub_title='sub', content='content', celebrity=celeb, create_at=self.today)
+            user_routine = UserRoutine.objects.create(user=self.user, routine=routine, start_date=self.today, end_date=self.today)
+            completion = UserRoutineCompletion.objects.get(routine=user_routine)
+            completion.completed = True
+            completion.save()
+
+    def mypage(self):
+        response = self.client.get('/api/accounts/mypage/')
+        self.assertEqual(response.status_code, 200)
+        return [(item['name'], item['routines_added_count']) for item in response.data['celebs']]
+
+    def test_top_celebs_by_checked_routines(self):
+        self.check_routines(self.celebs[3], 1)
+        self.check_routines(self.celebs[1], 2)
+        self.check_routines(self.celebs[4], 1)
+        self.check_routines(self.celebs[0], 1)
+        self.assertEqual(self.mypage(), [('셀럽1', 2), ('셀럽0', 1), ('셀럽3', 1)])
+
+    def test_fills_with_unchecked_celebs_by_id(self):
+        self.check_routines(self.celebs[2], 1)
+        self.assertEqual(self.mypage(), [('셀럽2', 1), ('셀럽0', 0), ('셀럽1', 0)])
+
+    def test_query_count_does_not_grow_with_celebs(self):
+        self.check_routines(self.celebs[2], 1)
+        with self.assertNumQueries(2):
+            self.mypage()
+        for i in range(20):
+            self.check_routines(Celeb.objects.create(name=f'배우{i}', profession='배우'), 1)
+        with self.assertNumQueries(2):
+            self.mypage()
+
+
+class CachedAuthenticationTests(AccountsTestCase):
+    def setUp(self):
+        super().setUp()
+        users.clear()
+        self.client = APIClient()
+        self.client.cookies['access_token'] = str(RefreshToken.for_user(self.user).access_token)
+
+    def mypage(self):
+        response = self.client.get('/api/accounts/mypage/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_second_request_skips_user_query(self):
+        with CaptureQueriesContext(connection) as first:
+            self.mypage()
+        with CaptureQueriesContext(connection) as second:
+            self.mypage()
+        self.assertEqual(len(first) - len(second), 1)
+        self.assertFalse(any('"accounts_user"' in query['sql'] and 'WHERE "accounts_user"."id"' in query['sql'] for query in second))
+
+    def test_user_save_and_delete_invalidate(self):
+        self.mypage()
+        self.assertIsNotNone(users.get(self.user.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).first().save()
+        self.assertIsNone(users.get(self.user.pk))
+
+        self.mypage()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=self.user.pk).delete()
+        self.assertEqual(self.client.get('/api/accounts/mypage/').status_code, 401)
+
+    def test_inactive_cached_user_is_rejected(self):
+        self.mypage()
+        # signal 없이 바꾼 값은 캐시에 남지만, 캐시의 유저가 비활성이면 거부
+        cached = users._cache[self.user.pk]
+        cached[2].is_active = False
+        self.assertEqual(self.client.get('/api/accounts/mypage/').status_code, 401)
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        self.users = UserCache(max_entries=2, ttl=60)
+        self.accounts = [User(pk=i, username=f'u{i}') for i in range(1, 4)]
+
+    def put(self, user):
+        self.users.set(user.pk, user, user_version(user.pk))
+
+    def test_lru_eviction(self):
+        self.put(self.accounts[0])
+        self.put(self.accounts[1])
+        self.users.get(1)
+        self.put(self.accounts[2])
+        self.assertEqual(list(self.users._cache), [1, 3])
+        self.assertIsNone(self.users.get(2))
+
+    def test_ttl_expiry(self):
+        with mock.patch('accounts.authentication.time.monotonic', return_value=1000):
+            self.put(self.accounts[0])
+        with mock.patch('accounts.authentication.time.monotonic', return_value=1059):
+            self.assertIsNotNone(self.users.get(1))
+        with mock.patch('accounts.authentication.time.monotonic', return_value=1061):
+            self.assertIsNone(self.users.get(1))
+        self.assertEqual((self.users.hits, self.users.misses), (1, 1))
+
+    def test_returns_copies(self):
+        self.put(self.accounts[0])
+        self.users.get(1).username = 'changed'
+        self.assertEqual(self.users.get(1).username, 'u1')
+
+    def test_stale_read_is_not_stored(self):
+        version = user_version(1)
+        versions.bump_user(1)  # DB 에서 읽는 사이에 다른 워커가 유저를 바꿈
+        self.users.set(1, self.accounts[0], version)
+        self.assertEqual(len(self.users), 0)
+
+    def test_version_bump_from_another_worker_invalidates(self):
+        self.put(self.accounts[0])
+        self.put(self.accounts[1])
+        versions.bump_user(1)
+        self.assertIsNone(self.users.get(1))
+        self.assertIsNotNone(self.users.get(2))
+        versions.bump(versions.USERS)
+        self.assertIsNone(self.users.get(2))
+
+    def test_disabled_cache_stores_nothing(self):
+        self.users.max_entries = 0
+        self.put(self.accounts[0])
+        self.assertEqual(len(self.users), 0)
+
+
+class OnboardingTests(AccountsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.categories = [RoutineCategory.objects.create(name=f'카테고리{i}') for i in range(2)]
+
+    def is_new_user(self, user=None):
+        return User.objects.values_list('is_new_user', flat=True).get(pk=(user or self.user).pk)
+
+    def test_needs_nickname_and_categories(self):
+        self.assertTrue(self.is_new_user())
+        self.user.preferred_routine_categories.add(self.categories[0])
+        self.assertFalse(self.is_new_user())
+        self.assertFalse(self.user.is_new_user)
+
+        self.user.nickname = ''
+        self.user.save()
+        self.assertTrue(self.is_new_user())
+        self.user.nickname = '새 닉네임'
+        self.user.save()
+        self.assertFalse(self.is_new_user())
+
+        self.user.preferred_routine_categories.clear()
+        self.assertTrue(self.is_new_user())
+
+    def test_nickname_endpoint_and_user_list(self):
+        user = User.objects.create(email='new@example.com', username='new')
+        self.client.force_authenticate(user)
+        user.preferred_routine_categories.add(self.categories[0])
+        self.assertTrue(self.client.get('/api/accounts/user/').data[0]['is_new_user'])
+        self.client.post('/api/accounts/info/', {'nickname': '닉네임'})
+        self.assertFalse(self.client.get('/api/accounts/user/').data[0]['is_new_user'])
+
+    def test_changes_from_the_category_side(self):
+        other = User.objects.create(email='other@example.com', username='other', nickname='다른 유저')
+        self.categories[0].user_set.add(self.user, other)
+        self.assertEqual((self.is_new_user(), self.is_new_user(other)), (False, False))
+        self.categories[0].user_set.remove(other)
+        self.assertTrue(self.is_new_user(other))
+        self.categories[0].user_set.clear()
+        self.assertTrue(self.is_new_user())
+
+        self.categories[1].user_set.add(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categories[1].delete()
+        self.assertTrue(self.is_new_user())
+
+    def test_refresh_recomputes_queryset(self):
+        self.user.preferred_routine_categories.add(self.categories[0])
+        nameless = User.objects.create(email='nameless@example.com', username='nameless')
+        nameless.preferred_routine_categories.add(self.categories[0])
+        User.objects.update(is_new_user=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(onboarding.refresh(User.objects.all()), 2)
+        self.assertEqual((self.is_new_user(), self.is_new_user(nameless)), (False, True))
+
+
+class UpdatePreferencesTests(AccountsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.categories = [RoutineCategory.objects.create(name=f'카테고리{i}') for i in range(4)]
+        self.events = []
+        preferences_changed.connect(self.record, sender=User)
+        self.addCleanup(preferences_changed.disconnect, self.record, sender=User)
+
+    def record(self, sender, user, added, removed, **kwargs):
+        self.events.append((added, removed))
+
+    def ids(self, *indexes):
+        return {self.categories[i].pk for i in indexes}
+
+    def current(self):
+        return set(self.user.preferred_routine_categories.values_list('pk', flat=True))
+
+    def test_only_the_difference_is_written(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(update_preferences(self.user, self.categories[:2]), (self.ids(0, 1), set()))
+        with self.captureOnCommitCallbacks(execute=True):
+            # SELECT + INSERT + DELETE + 온보딩 UPDATE (트랜잭션 savepoint 제외)
+            with CaptureQueriesContext(connection) as ctx:
+                added, removed = update_preferences(self.user, [self.categories[1].pk, self.categories[2]])
+        self.assertEqual((added, removed), (self.ids(2), self.ids(0)))
+        self.assertEqual(self.current(), self.ids(1, 2))
+        writes = [query['sql'].split()[0] for query in ctx.captured_queries if 'accounts_user_preferred_routine_categories' in query['sql']]
+        self.assertEqual(writes, ['SELECT', 'INSERT', 'DELETE'])
+        self.assertEqual(self.events, [(self.ids(0, 1), set()), (self.ids(2), self.ids(0))])
+
+    def test_unchanged_preferences_do_nothing(self):
+        update_preferences(self.user, self.categories[:2])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(update_preferences(self.user, self.categories[:2]), (set(), set()))
+        self.assertEqual(callbacks, [])
+        self.assertEqual([query['sql'].split()[0] for query in ctx.captured_queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))], ['SELECT'])
+
+    def test_onboarding_and_prefetch_cache(self):
+        self.assertTrue(self.user.is_new_user)
+        user = User.objects.prefetch_related('preferred_routine_categories').get(pk=self.user.pk)
+        update_preferences(user, self.categories[:1])
+        self.assertFalse(user.is_new_user)
+        self.assertEqual(list(user.preferred_routine_categories.all()), self.categories[:1])
+        update_preferences(user, [])
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_new_user)
+
+    def test_endpoints(self):
+        url = '/api/accounts/custom-routines/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url, {'preferred_routine_categories': [c.pk for c in self.categories[:3]]}, format='json').status_code, 200)
+            self.assertEqual(self.client.patch(url, {'preferred_routine_categories': [self.categories[3].pk]}, format='json').status_code, 200)
+        self.assertEqual(self.current(), self.ids(3))
+        self.assertEqual(self.events, [(self.ids(0, 1, 2), set()), (self.ids(3), self.ids(0, 1, 2))])
+        self.assertEqual(self.client.post(url, {'preferred_routine_categories': []}, format='json').status_code, 400)
+        self.assertEqual([item['id'] for item in self.client.get(url).data['preferred_routine_categories']], [self.categories[3].pk])
+
+
+class StubProvider(BaseHTTPRequestHandler):
+    # 로컬 가짜 카카오: POST /token, GET /profile. 응답은 서버의 responses 에서 꺼낸다
+    def do_POST(self):
+        self.server.requests.append(('POST', self.path, self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()))
+        self.reply()
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path, self.headers.get('Authorization')))
+        self.reply()
+
+    def reply(self):
+        status, body = self.server.responses.get(self.path, (404, {}))
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class SocialLoginTests(AccountsTestCase):
+    url = '/api/accounts/kakao/login/'
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubProvider)
+        self.server.requests = []
+        self.server.responses = {
+            '/token': (200, {'access_token': 'provider-token', 'token_type': 'bearer', 'expires_in': 3600}),
+            '/profile': (200, {'id': 42, 'kakao_account': {'email': 'kakao@example.com'}}),
+        }
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        base = f'http://127.0.0.1:{self.server.server_port}'
+        override = self.settings(SOCIAL_LOGIN_PROVIDER_URLS={'kakao': {'token': f'{base}/token', 'profile': f'{base}/profile'}})
+        override.enable()
+        self.addCleanup(override.disable)
+
+        # 요청마다 연 클라이언트를 모아서 닫혔는지 확인
+        self.clients = []
+        open_client = oauth.open_client
+        patcher = mock.patch('accounts.oauth.open_client', side_effect=lambda: self.clients.append(open_client()) or self.clients[-1])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, **data):
+        return Client().post(self.url, data, content_type='application/json')
+
+    def assertReachedLoginView(self, response):
+        # 제공자 단계(502 / 503 / 504)를 지나서 받은 프로필로 기존 SocialLoginView 가 계정을 처리함
+        self.assertNotIn(response.status_code, (502, 503, 504))
+        self.assertTrue(User.objects.filter(email='kakao@example.com').exists())
+
+    def test_code_login_uses_stub_provider_and_closes_client(self):
+        for _ in range(2):
+            self.assertReachedLoginView(self.login(code='auth-code'))
+        self.assertEqual([(method, path) for method, path, _ in self.server.requests], [('POST', '/token'), ('GET', '/profile')] * 2)
+        self.assertIn('code=auth-code', self.server.requests[0][2])
+        self.assertEqual(self.server.requests[1][2], 'Bearer provider-token')
+        self.assertEqual(User.objects.filter(email='kakao@example.com').count(), 1)
+        self.assertEqual(len(self.clients), 2)
+        self.assertTrue(all(client.is_closed for client in self.clients))
+
+    def test_access_token_skips_exchange(self):
+        self.assertReachedLoginView(self.login(access_token='app-token'))
+        self.assertEqual(self.server.requests, [('GET', '/profile', 'Bearer app-token')])
+
+    def test_provider_errors(self):
+        self.server.responses['/token'] = (401, {'error': 'invalid_grant'})
+        self.assertEqual(self.login(code='bad').status_code, 400)
+        self.server.responses['/token'] = (200, {'error': 'none'})
+        self.assertEqual(self.login(code='bad').status_code, 400)
+        self.server.responses['/profile'] = (500, {})
+        self.assertEqual(self.login(access_token='app-token').status_code, 502)
+        self.server.responses['/profile'] = (200, b'not json')
+        self.assertEqual(self.login(access_token='app-token').status_code, 502)
+        self.assertTrue(all(client.is_closed for client in self.clients))
+        self.assertFalse(User.objects.filter(email='kakao@example.com').exists())
+
+    def test_unreachable_provider(self):
+        self.server.shutdown()
+        self.server.server_close()
+        response = self.login(access_token='app-token')
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(response.json(), {'detail': 'Could not reach the login provider.'})
+
+    async def alogin(self, **data):
+        # ASGI 요청 (워커의 이벤트 루프에 묶인 클라이언트를 같이 씀)
+        return await AsyncClient().post(self.url, data, content_type='application/json')
+
+    async def test_asgi_logins_share_one_client_until_shutdown(self):
+        for _ in range(2):
+            self.assertNotIn((await self.alogin(access_token='app-token')).status_code, (502, 503, 504))
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(len(self.clients), 1)
+        self.assertFalse(self.clients[0].is_closed)
+
+        # 서버 종료 (lifespan) 때 닫힌다 (시작 때 만드는 자동완성 인덱스는 다른 테스트에 남지 않도록 비움)
+        self.addCleanup(suggest.reset)
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        await asgi.application({'type': 'lifespan'}, receive, send)
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        self.assertTrue(self.clients[0].is_closed)
+
+    async def test_full_limiter_returns_503(self):
+        with self.settings(SOCIAL_LOGIN_MAX_CONCURRENCY=1, SOCIAL_LOGIN_QUEUE_TIMEOUT=0.05):
+            self.assertNotIn((await self.alogin(access_token='app-token')).status_code, (502, 503, 504))
+            pool = oauth.pools[asyncio.get_running_loop()]
+            await pool.slots.acquire()
+            self.assertEqual((await self.alogin(access_token='app-token')).status_code, 503)
+            pool.slots.release()
+            self.assertNotIn((await self.alogin(access_token='app-token')).status_code, (502, 503, 504))
+        self.assertEqual(len(self.server.requests), 2)
+        await oauth.close_pool()
+
+    async def test_cancelled_requests_release_their_slot(self):
+        started = asyncio.Event()
+
+        async def hang(request):
+            started.set()
+            await asyncio.Event().wait()
+
+        pool = oauth.Pool(httpx.AsyncClient(transport=httpx.MockTransport(hang)), asyncio.Semaphore(1))
+        # 제공자 응답을 기다리는 중에 취소
+        task = asyncio.create_task(oauth.request_json(pool, 'GET', 'http://provider/profile'))
+        await started.wait()
+        self.assertTrue(pool.slots.locked())
+        # 자리를 기다리는 중에 취소
+        waiting = asyncio.create_task(oauth.acquire_slot(pool))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        task.cancel()
+        for cancelled in (task, waiting):
+            with self.assertRaises(asyncio.CancelledError):
+                await cancelled
+        self.assertFalse(pool.slots.locked())
+        await oauth.acquire_slot(pool)
+        await pool.client.aclose()
@@ -11,6 +11,7 @@ from accounts.views import (
     UserProfileView,
 
 )
+from accounts.oauth import AsyncSocialLoginView
 
 router = DefaultRouter()
 router.register(r'user', UserViewSet, basename='user')
@@ -20,8 +21,9 @@ urlpatterns = [
     path('dj-rest-auth/', include('dj_rest_auth.urls')),
     path('dj-rest-auth.registration/',include('dj_rest_auth.registration.urls')),
 
-    path('kakao/login/', KakaoLoginView.as_view(), name='api_accounts_kakao_oauth'),
-    path('google/login/', GoogleLoginView.as_view(), name='api_accounts_google_oauth'),
+    # 제공자 요청은 비동기로 보내고 나머지는 KakaoLoginView / GoogleLoginView 가 처리 (accounts/oauth.py)
+    path('kakao/login/', AsyncSocialLoginView.as_view(login_view=KakaoLoginView), name='api_accounts_kakao_oauth'),
+    path('google/login/', AsyncSocialLoginView.as_view(login_view=GoogleLoginView), name='api_accounts_google_oauth'),
     path('naver/login/', NaverLoginView.as_view(), name='api_accounts_naver_oauth'),
     path('custom-routines/', CustomRoutineView.as_view(), name='custom-routines'),
     path('info/', UpdateNicknameView.as_view(), name='update_nickname'),
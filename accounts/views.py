@@ -19,6 +19,8 @@ from rest_framework import status, viewsets,generics
 from rest_framework.views import APIView
 from .serializers import CustomRoutineSerializer,UserSerializer,NicknameSerializer ,UserProfileSerializer
 from .models import User
+from .preferences import update_preferences
+from .oauth import PrefetchedSocialLoginSerializer
 from rank.models import CelebScore
 from rank.serializers import CelebScoreSerializer
 from routine.serializers import RoutineCategorySerializer
@@ -30,11 +32,13 @@ class GoogleLoginView(SocialLoginView):
     adapter_class = GoogleOAuth2Adapter
     callback_url = 'http://127.0.0.1:8000/api/accounts/google/login/callback/'
     client_class = OAuth2Client
+    serializer_class = PrefetchedSocialLoginSerializer  # 토큰 교환은 AsyncSocialLoginView 에서 (accounts/oauth.py)
 
 class KakaoLoginView(SocialLoginView):
     adapter_class = KakaoOAuth2Adapter
     callback_url = 'https://likelion-start.site/api/accounts/kakao/login/callback/'
     client_class = OAuth2Client
+    serializer_class = PrefetchedSocialLoginSerializer
 
 class NaverLoginView(SocialLoginView):
     adapter_class = NaverOAuth2Adapter
@@ -152,9 +156,8 @@ class CustomRoutineView(APIView):
                 return Response({"message": "No user available for testing."}, status=status.HTTP_400_BAD_REQUEST)
 
             try:
-                # 사용자의 선호 카테고리 업데이트
-                user.preferred_routine_categories.set(preferred_routine_categories)
-                user.save()
+                # 사용자의 선호 카테고리 업데이트 (바뀐 것만 INSERT / DELETE)
+                update_preferences(user, preferred_routine_categories)
 
                 return Response({
                     "status": 200,
@@ -186,11 +189,7 @@ class CustomRoutineView(APIView):
         if serializer.is_valid():
             preferred_routine_categories = serializer.validated_data['preferred_routine_categories']
             user = request.user
-            user.preferred_routine_categories.clear() # 기존 값들 제거
-            for category in preferred_routine_categories:
-                if not user.preferred_routine_categories.filter(id=category.id).exists():
-                    user.preferred_routine_categories.add(category)
-            user.save()
+            update_preferences(user, preferred_routine_categories) # 기존 값들과 비교해서 바뀐 것만 반영
             return Response({
                 "status": 200,
                 "message": "Preferred routine categories updated successfully."
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserRoutine, UserRoutineCompletion, PersonalSchedule, MonthlyTitle
+from .models import UserRoutine, UserRoutineCompletion, PersonalSchedule, MonthlyTitle, UserCelebProgress
 
 class UserRoutineAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'user__username', 'routine__title']
@@ -24,3 +24,9 @@ class MonthlyTitleAdmin(admin.ModelAdmin):
     list_display = ['user', 'month', 'title']
 
 admin.site.register(MonthlyTitle, MonthlyTitleAdmin)
+
+class UserCelebProgressAdmin(admin.ModelAdmin):
+    search_fields = ['user__email', 'celeb__name']
+    list_display = ['user', 'celeb', 'adopted_count', 'fully_completed_count', 'checked_count', 'last_activity']
+
+admin.site.register(UserCelebProgress, UserCelebProgressAdmin)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from calen import progress
+
+
+class Command(BaseCommand):
+    help = '유저별 셀럽 진행 현황(UserCelebProgress)을 UserRoutine 에서 다시 집계해서 비교하고, 처음부터 다시 채운다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='다시 채우지 않고 어긋난 항목만 출력 (있으면 실패로 종료)')
+
+    def handle(self, *args, **options):
+        mismatches = progress.check()
+        for user_id, celeb_id, stored, expected in mismatches:
+            self.stdout.write(f'user={user_id} celeb={celeb_id} stored={stored} expected={expected}')
+
+        if options['check']:
+            if mismatches:
+                raise CommandError(f'{len(mismatches)}개 항목이 어긋났습니다. --check 없이 실행하면 다시 채웁니다.')
+            self.stdout.write(self.style.SUCCESS('진행 현황이 UserRoutine 과 일치합니다.'))
+            return
+
+        count = progress.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'진행 현황 {count}개를 다시 채웠습니다. (어긋난 항목 {len(mismatches)}개)'))
@@ -0,0 +1,71 @@
+# Generated by Django 5.0.7 on 2026-10-20 00:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from datetime import timedelta
+
+from django.db.models import Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_progress(apps, schema_editor):
+    # calen/progress.py rebuild
+    UserRoutine = apps.get_model('calen', 'UserRoutine')
+    UserRoutineCompletion = apps.get_model('calen', 'UserRoutineCompletion')
+    UserCelebProgress = apps.get_model('calen', 'UserCelebProgress')
+
+    # 기간의 모든 날짜를 완료한 UserRoutine
+    completions = UserRoutineCompletion.objects.filter(
+        routine=OuterRef('pk'),
+        completed=True,
+        date__gte=OuterRef('start_date'),
+        date__lte=OuterRef('end_date'),
+    ).order_by().values('routine').annotate(n=Count('pk')).values('n')
+    one_day = Value(timedelta(days=1))
+    completed = UserRoutine.objects.alias(
+        completed_days=Coalesce(Subquery(completions), 0),
+    ).alias(
+        completed_span=ExpressionWrapper(F('completed_days') * one_day, output_field=DurationField()),
+        period=ExpressionWrapper(F('end_date') - F('start_date') + one_day, output_field=DurationField()),
+    ).filter(completed_span=F('period')).values('pk')
+
+    rows = (
+        UserRoutine.objects.order_by()
+        .values('user_id', celeb_id=F('routine__celebrity_id'))
+        .annotate(
+            adopted_count=Count('routine', distinct=True),
+            fully_completed_count=Count('pk', filter=Q(pk__in=completed), distinct=True),
+            checked_count=Count('pk', filter=Q(completions__completed=True), distinct=True),
+        )
+    )
+    UserCelebProgress.objects.bulk_create([UserCelebProgress(**row) for row in rows], batch_size=1_000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calen', '0002_initial'),
+        ('celeb', '0004_celeb_name_choseong'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCelebProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('adopted_count', models.IntegerField(default=0)),
+                ('fully_completed_count', models.IntegerField(default=0)),
+                ('checked_count', models.IntegerField(default=0)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('celeb', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='celeb.celeb')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'celeb')},
+            },
+        ),
+        migrations.RunPython(fill_progress, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Value, ExpressionWrapper, DurationField
+from django.db.models.functions import Coalesce
 from routine.models import Routine
 from project import settings
 from datetime import timedelta
@@ -23,8 +25,9 @@ class UserRoutine(models.Model):
         super().save(*args, **kwargs)
         
         if is_new:
+            # 담은 횟수만 UPDATE 로 올림 (Routine.save() 의 검색 인덱스 / 카탈로그 캐시 무효화를 거치지 않도록)
+            Routine.objects.filter(pk=self.routine_id).update(popular=F('popular') + 1)
             self.routine.popular += 1
-            self.routine.save()
             self.create_routine_completions()
 
     def create_routine_completions(self):
@@ -47,6 +50,45 @@ class UserRoutineCompletion(models.Model):
     class Meta:
         unique_together = ('routine', 'date') # 루틴과 조합 유일 -> 동일한 루틴에 대해 같은 날짜에 여러번 가능
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 저장할 때 완료 체크가 바뀌었는지 알 수 있도록 불러온 값을 기억 (calen/signals.py)
+        instance._loaded_completed = instance.__dict__.get('completed')
+        return instance
+
+
+class UserCelebProgress(models.Model):
+    # 유저별 셀럽 루틴 진행 현황 (calen/progress.py 가 UserRoutine / 완료 체크가 바뀔 때마다 갱신)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    celeb = models.ForeignKey('celeb.Celeb', on_delete=models.CASCADE)
+    adopted_count = models.IntegerField(default=0)  # 담은 루틴 수 (같은 루틴을 여러 번 담아도 1)
+    fully_completed_count = models.IntegerField(default=0)  # 기간의 모든 날짜를 완료한 UserRoutine 수
+    checked_count = models.IntegerField(default=0)  # 완료 체크를 한 번이라도 한 UserRoutine 수
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('user', 'celeb')
+
+def fully_completed(user_routines):
+    # 기간의 모든 날짜를 완료한 UserRoutine 만 (완료한 날짜 수 == end_date - start_date + 1)
+    # 마이그레이션의 과거 모델로도 쓸 수 있도록 완료 모델은 관계에서 찾는다
+    completion_model = user_routines.model._meta.get_field('completions').related_model
+    completions = completion_model.objects.filter(
+        routine=OuterRef('pk'),
+        completed=True,
+        date__gte=OuterRef('start_date'),
+        date__lte=OuterRef('end_date'),
+    ).order_by().values('routine').annotate(n=Count('pk')).values('n')
+    one_day = Value(timedelta(days=1))
+    return user_routines.alias(
+        completed_days=Coalesce(Subquery(completions), 0),
+    ).alias(
+        completed_span=ExpressionWrapper(F('completed_days') * one_day, output_field=DurationField()),
+        period=ExpressionWrapper(F('end_date') - F('start_date') + one_day, output_field=DurationField()),
+    ).filter(completed_span=F('period'))
+
+
 class PersonalSchedule(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
@@ -0,0 +1,96 @@
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import UserCelebProgress, fully_completed
+
+# 유저별 셀럽 진행 현황(UserCelebProgress) 갱신
+# 평소에는 바뀐 UserRoutine 하나의 상태만 다시 보고 카운터를 +-1 하고 (calen/signals.py),
+# 어긋났는지 확인하거나 처음부터 다시 채울 때는 UserRoutine 전체를 GROUP BY 로 집계한다 (rebuild_celeb_progress).
+
+
+def routine_counts(user_routine):
+    # (기간 안에서 완료한 날짜 수, 완료 체크 수, 기간 일수)
+    counts = user_routine.completions.aggregate(
+        in_period=Count('pk', filter=Q(completed=True, date__gte=user_routine.start_date, date__lte=user_routine.end_date)),
+        checked=Count('pk', filter=Q(completed=True)),
+    )
+    period = (user_routine.end_date - user_routine.start_date).days + 1
+    return counts['in_period'], counts['checked'], period
+
+
+def apply(user_id, celeb_id, adopted=0, fully_completed=0, checked=0, create=True):
+    values = {
+        'adopted_count': F('adopted_count') + adopted,
+        'fully_completed_count': F('fully_completed_count') + fully_completed,
+        'checked_count': F('checked_count') + checked,
+        'last_activity': timezone.now(),
+    }
+    progress = UserCelebProgress.objects.filter(user_id=user_id, celeb_id=celeb_id)
+    if progress.update(**values) or not create:
+        return
+    try:
+        with transaction.atomic():
+            UserCelebProgress.objects.create(
+                user_id=user_id,
+                celeb_id=celeb_id,
+                adopted_count=max(adopted, 0),
+                fully_completed_count=max(fully_completed, 0),
+                checked_count=max(checked, 0),
+                last_activity=values['last_activity'],
+            )
+    except IntegrityError:
+        # 동시에 다른 요청이 먼저 만든 경우
+        progress.update(**values)
+
+
+def compute(apps=global_apps):
+    # UserRoutine 에서 바로 집계한 (user_id, celeb_id) 별 카운터
+    UserRoutine = apps.get_model('calen', 'UserRoutine')
+    completed = fully_completed(UserRoutine.objects.all()).values('pk')
+    return (
+        UserRoutine.objects.order_by()
+        .values('user_id', celeb_id=F('routine__celebrity_id'))
+        .annotate(
+            adopted_count=Count('routine', distinct=True),
+            fully_completed_count=Count('pk', filter=Q(pk__in=completed), distinct=True),
+            checked_count=Count('pk', filter=Q(completions__completed=True), distinct=True),
+        )
+    )
+
+
+COUNTERS = ('adopted_count', 'fully_completed_count', 'checked_count')
+
+
+def check(apps=global_apps):
+    # 저장된 카운터와 다시 집계한 값이 다른 (user_id, celeb_id, 저장된 값, 집계한 값) 목록
+    Progress = apps.get_model('calen', 'UserCelebProgress')
+    expected = {(row['user_id'], row['celeb_id']): tuple(row[name] for name in COUNTERS) for row in compute(apps)}
+    stored = {
+        (row[0], row[1]): tuple(row[2:])
+        for row in Progress.objects.values_list('user_id', 'celeb_id', *COUNTERS)
+    }
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        zero = (0,) * len(COUNTERS)
+        if expected.get(key, zero) != stored.get(key, zero):
+            mismatches.append((*key, stored.get(key), expected.get(key)))
+    return sorted(mismatches)
+
+
+def rebuild(apps=global_apps):
+    # 전체를 다시 집계해서 덮어쓴다 (last_activity 는 남아 있던 값을 유지)
+    Progress = apps.get_model('calen', 'UserCelebProgress')
+    with transaction.atomic():
+        last_activity = {
+            (user_id, celeb_id): value
+            for user_id, celeb_id, value in Progress.objects.values_list('user_id', 'celeb_id', 'last_activity')
+        }
+        rows = [
+            Progress(last_activity=last_activity.get((row['user_id'], row['celeb_id'])), **row)
+            for row in compute(apps)
+        ]
+        Progress.objects.all().delete()
+        Progress.objects.bulk_create(rows, batch_size=1_000)
+    return len(rows)
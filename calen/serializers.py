@@ -3,9 +3,11 @@ from .models import UserRoutine, PersonalSchedule, MonthlyTitle, UserRoutineComp
 
 from routine.serializers import RoutineSerializer
 from datetime import date
+from django.db.models import Prefetch
+from project.mixins import EagerLoadingSerializerMixin
 
 
-class UserRoutineSerializer(serializers.ModelSerializer):
+class UserRoutineSerializer(EagerLoadingSerializerMixin, serializers.ModelSerializer):
     routine_title = serializers.CharField(source='routine.title')
     routine_content = serializers.CharField(source='routine.content')
     completed = serializers.SerializerMethodField()
@@ -13,16 +15,35 @@ class UserRoutineSerializer(serializers.ModelSerializer):
     celebrity_id = serializers.IntegerField(source='routine.celebrity.id', read_only=True)  # 셀럽 ID 필드 추가
     celebrity_name = serializers.CharField(source='routine.celebrity.name', read_only=True)  # 셀럽 이름 필드 추가
 
+    select_related_fields = ('routine__celebrity',)
+
     class Meta:
         model = UserRoutine
         fields = '__all__' 
 
+    def setup_eager_loading(self, queryset):
+        queryset = super().setup_eager_loading(queryset)
+        request = self.context.get('request')
+        if request is None:
+            return queryset
+
+        # 선택한 날짜의 완료 기록만 미리 가져옴
+        completions = UserRoutineCompletion.objects.filter(
+            user=request.user,
+            date=self.context.get('selected_date'),
+            completed=True
+        )
+        return queryset.prefetch_related(Prefetch('completions', queryset=completions, to_attr='selected_completions'))
+
     def get_completed(self, obj):
         # context에서 request를 가져옵니다
         request = self.context.get('request')
         if request is None:
             return False
 
+        if hasattr(obj, 'selected_completions'):
+            return bool(obj.selected_completions)
+
         user = request.user
         selected_date = self.context.get('selected_date')
 
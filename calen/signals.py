@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from project import cache as response_cache
+from .models import UserRoutine, UserRoutineCompletion
+from . import progress
+
+
+def has_other_adoption(user_routine):
+    # 같은 루틴을 다른 기간으로도 담아 두었는지 (담은 루틴 수는 루틴 단위로 센다)
+    return UserRoutine.objects.filter(user_id=user_routine.user_id, routine_id=user_routine.routine_id).exclude(pk=user_routine.pk).exists()
+
+
+# UserRoutine / 완료 체크가 바뀌면 유저별 셀럽 진행 현황(UserCelebProgress)도 같이 갱신
+@receiver(post_save, sender=UserRoutine)
+def add_user_routine_progress(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    adopted = 0 if has_other_adoption(instance) else 1
+    progress.apply(instance.user_id, instance.routine.celebrity_id, adopted=adopted)
+
+
+@receiver(pre_delete, sender=UserRoutine)
+def remove_user_routine_progress(sender, instance, **kwargs):
+    in_period, checked, period = progress.routine_counts(instance)
+    progress.apply(
+        instance.user_id,
+        instance.routine.celebrity_id,
+        adopted=0 if has_other_adoption(instance) else -1,
+        fully_completed=-1 if in_period == period else 0,
+        checked=-1 if checked else 0,
+        create=False,  # 셀럽 / 유저가 함께 지워지는 중일 수 있으므로 새로 만들지 않음
+    )
+
+
+@receiver(post_save, sender=UserRoutineCompletion)
+def toggle_completion_progress(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = False if created else getattr(instance, '_loaded_completed', None)
+    instance._loaded_completed = instance.completed
+    if created and not instance.completed:
+        return  # UserRoutine 을 담을 때 미리 만드는 빈 체크
+
+    user_routine = UserRoutine.objects.select_related('routine').only(
+        'user_id', 'start_date', 'end_date', 'routine__celebrity_id',
+    ).get(pk=instance.routine_id)
+    if previous is None or bool(previous) == bool(instance.completed):
+        progress.apply(user_routine.user_id, user_routine.routine.celebrity_id)
+        return
+
+    # 바뀐 뒤의 상태를 세고, 이번 체크를 되돌려서 바뀌기 전 상태를 구한다
+    in_period, checked, period = progress.routine_counts(user_routine)
+    delta = 1 if instance.completed else -1
+    in_period_before = in_period - delta if user_routine.start_date <= instance.date <= user_routine.end_date else in_period
+    checked_before = checked - delta
+    progress.apply(
+        user_routine.user_id,
+        user_routine.routine.celebrity_id,
+        fully_completed=(in_period == period) - (in_period_before == period),
+        checked=(checked > 0) - (checked_before > 0),
+    )
+
+
+# 담은 루틴 / 완료 체크가 바뀌면 그 유저의 응답 캐시(메인 페이지 챌린지, 셀럽 진행 현황)를 버림
+@receiver(post_save, sender=UserRoutine)
+@receiver(post_delete, sender=UserRoutine)
+@receiver(post_save, sender=UserRoutineCompletion)
+def bump_user_response_cache(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(lambda: response_cache.bump_user(instance.user_id))
@@ -1,3 +1,126 @@
+import datetime
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from celeb.models import Celeb
+from routine.models import Routine
+from .models import UserRoutine, UserRoutineCompletion, UserCelebProgress, fully_completed
+from . import progress
+
+
+class CalendarTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = datetime.date.today()
+        self.user = User.objects.create(email='user@example.com', username='user', nickname='유저')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.celebs = [Celeb.objects.create(name=f'셀럽{i}', profession='가수') for i in range(2)]
+        self.routines = [
+            Routine.objects.create(title=f'루틴{i}', sub_title='sub', content='content', celebrity=celeb, create_at=self.today)
+            for celeb in self.celebs for i in range(3)
+        ]
+
+    def adopt(self, routine, days=3, user=None):
+        return UserRoutine.objects.create(
+            user=user or self.user, routine=routine,
+            start_date=self.today, end_date=self.today + datetime.timedelta(days=days - 1),
+        )
+
+    def check(self, user_routine, date, completed=True):
+        completion = UserRoutineCompletion.objects.get(routine=user_routine, date=date)
+        completion.completed = completed
+        completion.save()
+
+
+class DailyTests(CalendarTestCase):
+    def test_daily_query_count_does_not_grow_with_routines(self):
+        url = f'/api/calendar/daily/{self.today.isoformat()}/'
+        self.check(self.adopt(self.routines[0]), self.today)
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        for routine in self.routines[1:]:
+            self.adopt(routine)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['routines']), len(self.routines))
+        self.assertEqual([item['completed'] for item in response.data['routines']], [True] + [False] * (len(self.routines) - 1))
+        self.assertEqual(len(few), len(many))
+
+
+class FullyCompletedTests(CalendarTestCase):
+    def test_only_routines_with_every_day_checked(self):
+        done = self.adopt(self.routines[0], days=2)
+        partial = self.adopt(self.routines[1], days=2)
+        self.adopt(self.routines[2], days=1)
+        for day in range(2):
+            self.check(done, self.today + datetime.timedelta(days=day))
+        self.check(partial, self.today)
+        # 기간 밖의 체크는 세지 않음
+        UserRoutineCompletion.objects.create(user=self.user, routine=partial, date=self.today - datetime.timedelta(days=1), completed=True)
+        self.assertEqual(list(fully_completed(UserRoutine.objects.all())), [done])
+
+
+class CelebProgressTests(CalendarTestCase):
+    def progress(self, celeb=None):
+        row = UserCelebProgress.objects.filter(user=self.user, celeb=celeb or self.celebs[0]).first()
+        return row and (row.adopted_count, row.fully_completed_count, row.checked_count)
+
+    def test_counters_follow_adoptions_and_checks(self):
+        first = self.adopt(self.routines[0], days=2)
+        second = self.adopt(self.routines[0], days=1)
+        self.assertEqual(self.progress(), (1, 0, 0))
+
+        self.check(second, self.today)
+        self.assertEqual(self.progress(), (1, 1, 1))
+        self.check(first, self.today)
+        self.assertEqual(self.progress(), (1, 1, 2))
+        self.check(first, self.today + datetime.timedelta(days=1))
+        self.assertEqual(self.progress(), (1, 2, 2))
+        self.check(first, self.today, completed=False)
+        self.assertEqual(self.progress(), (1, 1, 2))
+
+        second.delete()
+        self.assertEqual(self.progress(), (1, 0, 1))
+        first.delete()
+        self.assertEqual(self.progress(), (0, 0, 0))
+        self.assertEqual(progress.check(), [])
+
+    def test_update_view_coerces_completed(self):
+        user_routine = self.adopt(self.routines[0], days=1)
+        url = f'/api/calendar/daily/{self.today}/update_routine/'
+        response = self.client.patch(url, {'routine_id': user_routine.pk, 'completed': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.progress(), (1, 1, 1))
+        # 폼으로 온 "false" 는 체크 해제
+        self.client.patch(url, {'routine_id': user_routine.pk, 'completed': 'false'})
+        self.assertFalse(UserRoutineCompletion.objects.get(routine=user_routine).completed)
+        self.assertEqual(self.progress(), (1, 0, 0))
+        self.assertEqual(self.client.patch(url, {'routine_id': user_routine.pk, 'completed': 'maybe'}).status_code, 400)
+        self.assertEqual(progress.check(), [])
+
+    def test_matches_full_recount(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        for i, routine in enumerate(self.routines):
+            user_routine = self.adopt(routine, days=i % 3 + 1, user=other if i % 2 else None)
+            self.check(user_routine, self.today)
+        self.assertEqual(progress.check(), [])
 
-# Create your tests here.
+    def test_rebuild_command_repairs_drift(self):
+        self.check(self.adopt(self.routines[0]), self.today)
+        UserCelebProgress.objects.update(adopted_count=5)
+        self.assertEqual(len(progress.check()), 1)
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_celeb_progress', '--check', stdout=out)
+        self.assertEqual(self.progress(), (5, 0, 1))
+        call_command('rebuild_celeb_progress', stdout=out)
+        self.assertEqual(self.progress(), (1, 0, 1))
+        self.assertEqual(progress.check(), [])
@@ -1,6 +1,6 @@
 from datetime import date as dt_date, timedelta  # 여기서 date를 dt_date로 불러옵니다.
 from rest_framework.decorators import action
-from rest_framework import viewsets, status
+from rest_framework import serializers, viewsets, status
 from rest_framework.response import Response
 from django.utils.dateparse import parse_date
 from django.contrib.auth.models import AnonymousUser
@@ -54,7 +54,9 @@ class CalendarViewSet(viewsets.ViewSet):
 
         # 루틴 가져오기
         user_routines = UserRoutine.objects.filter(user=request.user, start_date__lte=target_date, end_date__gte=target_date)
-        routine_serializer = UserRoutineSerializer(user_routines, many=True, context={'request': request, 'selected_date': target_date})
+        routine_context = {'request': request, 'selected_date': target_date}
+        user_routines = UserRoutineSerializer(context=routine_context).setup_eager_loading(user_routines)
+        routine_serializer = UserRoutineSerializer(user_routines, many=True, context=routine_context)
 
         today_completed = self.check_today_completed(request.user, target_date)
 
@@ -276,6 +278,12 @@ class UpdateRoutineCompletionView(APIView):
             if routine_id is None or completed is None:
                 return Response({"detail": "Missing routine_id or completed field."}, status=status.HTTP_400_BAD_REQUEST)
 
+            # 폼 / 쿼리로 오면 "false" 같은 문자열이므로 불리언으로 바꾼다
+            try:
+                completed = serializers.BooleanField().to_internal_value(completed)
+            except serializers.ValidationError:
+                return Response({"detail": "completed must be a boolean."}, status=status.HTTP_400_BAD_REQUEST)
+
             try:
                 completion = UserRoutineCompletion.objects.get(user=user, routine_id=routine_id, date=date_obj)
                 completion.completed = completed
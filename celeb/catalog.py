@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery, Sum, prefetch_related_objects
+from django.db.models.functions import Coalesce
+
+# 셀럽별 카탈로그 집계
+# 루틴 수 / 담은 횟수는 Celeb 컬럼에 저장하고, 셀럽 상세의 루틴 카드 목록은 캐시에 넣어 둔다.
+# 루틴 / 셀럽 / 테마 / 카테고리가 바뀌면 (celeb/signals.py) 해당 셀럽의 집계를 다시 세고 catalog_version 을 올린다.
+# 캐시 키에 catalog_version 이 들어가므로, 버전이 바뀐 셀럽 행을 읽은 워커는 이전 카드를 쓰지 않는다.
+
+
+def refresh(celebs):
+    # 셀럽 queryset 의 루틴 수 / 담은 횟수를 UPDATE 한 번으로 다시 세고 버전을 올린다
+    Routine = celebs.model._meta.get_field('routine').related_model
+    routines = Routine.objects.filter(celebrity=OuterRef('pk')).order_by().values('celebrity')
+    return celebs.update(
+        routine_count=Coalesce(Subquery(routines.annotate(n=Count('pk')).values('n')), 0),
+        adoption_count=Coalesce(Subquery(routines.annotate(total=Sum('popular')).values('total')), 0),
+        catalog_version=F('catalog_version') + 1,
+    )
+
+
+def count_adoption(celeb_id):
+    # 루틴을 담으면 담은 횟수만 더하고 그 셀럽의 루틴 카드(popular 포함)만 새로 만들게 함
+    from .models import Celeb
+    Celeb.objects.filter(pk=celeb_id).update(
+        adoption_count=F('adoption_count') + 1,
+        catalog_version=F('catalog_version') + 1,
+    )
+
+
+def refresh_on_commit(celeb_ids):
+    # 지우는 중인 데이터가 반영된 뒤에 세도록 트랜잭션이 끝난 다음 실행
+    from .models import Celeb
+    celeb_ids = [celeb_id for celeb_id in set(celeb_ids) if celeb_id is not None]
+    if celeb_ids:
+        transaction.on_commit(lambda: refresh(Celeb.objects.filter(pk__in=celeb_ids)))
+
+
+def routine_cards_key(celeb):
+    return f'celeb:{celeb.pk}:routines:{celeb.catalog_version}'
+
+
+def load_routine_cards(celebs):
+    # 셀럽들의 루틴 카드를 캐시에서 한 번에 꺼내고, 없는 셀럽만 prefetch 한 번으로 만들어 채운다
+    from routine.models import Routine
+    from routine.serializers import RoutineSerializer
+
+    celebs = [celeb for celeb in celebs if not hasattr(celeb, 'routine_cards')]
+    if not celebs:
+        return
+    keys = {routine_cards_key(celeb): celeb for celeb in celebs}
+    cached = cache.get_many(list(keys))
+    missing = []
+    for key, celeb in keys.items():
+        if key in cached:
+            celeb.routine_cards = cached[key]
+        else:
+            missing.append(celeb)
+    if not missing:
+        return
+
+    routines = RoutineSerializer().setup_eager_loading(Routine.objects.all())
+    prefetch_related_objects(missing, Prefetch('routine_set', queryset=routines, to_attr='catalog_routines'))
+    for celeb in missing:
+        celeb.routine_cards = RoutineSerializer(celeb.catalog_routines, many=True).data
+    cache.set_many(
+        {routine_cards_key(celeb): celeb.routine_cards for celeb in missing},
+        getattr(settings, 'CELEB_ROUTINES_CACHE_TIMEOUT', 60 * 60 * 24),
+    )
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.7 on 2026-10-20 00:04
+
+from django.db import migrations, models
+
+# search/hangul.py choseong
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+
+
+def choseong(text):
+    result = []
+    for char in text or '':
+        code = ord(char)
+        if 0xAC00 <= code <= 0xD7A3:
+            result.append(CHOSEONG[(code - 0xAC00) // (21 * 28)])
+        elif not char.isspace():
+            result.append(char.lower())
+    return ''.join(result)
+
+
+def fill_name_choseong(apps, schema_editor):
+    Celeb = apps.get_model('celeb', 'Celeb')
+    objs = list(Celeb.objects.only('id', 'name'))
+    for obj in objs:
+        obj.name_choseong = choseong(obj.name)
+    Celeb.objects.bulk_update(objs, ['name_choseong'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('celeb', '0003_alter_celeb_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='celeb',
+            name='name_choseong',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_name_choseong, migrations.RunPython.noop),
+    ]
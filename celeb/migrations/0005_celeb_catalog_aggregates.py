@@ -0,0 +1,43 @@
+# Generated by Django 5.0.7 on 2026-10-20 00:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_catalog_aggregates(apps, schema_editor):
+    # celeb/catalog.py refresh
+    Celeb = apps.get_model('celeb', 'Celeb')
+    Routine = apps.get_model('routine', 'Routine')
+    routines = Routine.objects.filter(celebrity=OuterRef('pk')).order_by().values('celebrity')
+    Celeb.objects.update(
+        routine_count=Coalesce(Subquery(routines.annotate(n=Count('pk')).values('n')), 0),
+        adoption_count=Coalesce(Subquery(routines.annotate(total=Sum('popular')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('celeb', '0004_celeb_name_choseong'),
+        ('routine', '0004_routine_title_choseong'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='celeb',
+            name='adoption_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='celeb',
+            name='catalog_version',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='celeb',
+            name='routine_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_catalog_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-20 00:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_score_totals(apps, schema_editor):
+    # rank/leaderboard.py refresh
+    Celeb = apps.get_model('celeb', 'Celeb')
+    CelebScore = apps.get_model('rank', 'CelebScore')
+    scores = CelebScore.objects.filter(celeb=OuterRef('pk')).order_by().values('celeb')
+    Celeb.objects.update(
+        score_sum=Coalesce(Subquery(scores.annotate(total=Sum('score')).values('total')), 0),
+        score_count=Coalesce(Subquery(scores.annotate(n=Count('pk')).values('n')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('celeb', '0005_celeb_catalog_aggregates'),
+        ('rank', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='celeb',
+            name='score_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='celeb',
+            name='score_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_score_totals, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,28 @@
 from django.db import models
 from routine.models import Routine
+from search.hangul import choseong
 
 class Celeb(models.Model):
     name = models.CharField(max_length=100)
     profession = models.CharField(max_length=100)
     photo = models.URLField(max_length=500, default='https://cdn.pixabay.com/photo/2020/08/22/12/36/yoga-5508336_1280.png')
     routines = models.ManyToManyField(Routine, related_name='celebrities', blank=True)
+    name_choseong = models.CharField(max_length=100, blank=True, editable=False, db_index=True)  # 초성 검색용
+    # 카탈로그 집계 (celeb/catalog.py 가 루틴 / 셀럽이 바뀔 때 갱신)
+    routine_count = models.IntegerField(default=0, editable=False)  # 루틴 수
+    adoption_count = models.IntegerField(default=0, editable=False)  # 루틴들을 담은 횟수 합 (popular 합)
+    catalog_version = models.IntegerField(default=0, editable=False)  # 루틴 카드 캐시 키 버전
+    # 전체 랭킹용 점수 합 / 평가 수 (rank/leaderboard.py 가 점수가 바뀔 때마다 갱신)
+    score_sum = models.IntegerField(default=0, editable=False)
+    score_count = models.IntegerField(default=0, editable=False)
 
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.name_choseong = choseong(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_choseong'}
+        super().save(*args, **kwargs)
\ No newline at end of file
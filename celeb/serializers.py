@@ -1,41 +1,106 @@
 from rest_framework import serializers
 from .models import Celeb
+from . import catalog
 from rank.models import CelebScore
-from routine.serializers import RoutineSerializer
-from routine.models import Routine
-from calen.models import UserRoutine, UserRoutineCompletion
-from django.db.models import Count, Q
-from datetime import timedelta
+from calen.models import UserCelebProgress
+from django.db import models
+from django.db.models import Q, F, Prefetch, FilteredRelation
+from django.db.models.functions import Coalesce
+from project.mixins import SparseFieldsSerializerMixin, EagerLoadingSerializerMixin
 
 class CelebScoreSerializer(serializers.ModelSerializer):
     class Meta:
         model = CelebScore
         fields = '__all__'
 
-class CelebSerializer(serializers.ModelSerializer):
+def annotate_user_progress(queryset, user):
+    # 셀럽 queryset 에 이 유저의 UserCelebProgress 를 user_progress 로 LEFT JOIN
+    return queryset.annotate(
+        user_progress=FilteredRelation('usercelebprogress', condition=Q(usercelebprogress__user=user)),
+    )
+
+
+def get_user_progress(celeb, user):
+    # 진행 현황이 아직 없으면 (담은 루틴이 없으면) 빈 값
+    return UserCelebProgress.objects.filter(user=user, celeb=celeb).first() or UserCelebProgress(user=user, celeb=celeb)
+
+
+class CelebSummarySerializer(serializers.ModelSerializer):
+    # 점수 목록 등에서 쓰는 가벼운 셀럽 표현
+    class Meta:
+        model = Celeb
+        fields = ['id', 'name', 'photo']
+
+
+class CelebListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # 셀럽 목록의 루틴 카드를 캐시 조회 한 번 (+ 없는 셀럽만 prefetch 한 번)으로 채운 뒤 직렬화
+        celebs = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'routines' in self.child.fields:
+            catalog.load_routine_cards(celebs)
+        return super().to_representation(celebs)
+
+
+class CelebSerializer(SparseFieldsSerializerMixin, EagerLoadingSerializerMixin, serializers.ModelSerializer):
     scores = serializers.SerializerMethodField()
     routines = serializers.SerializerMethodField()
     routines_count = serializers.SerializerMethodField()
     routines_added_count = serializers.SerializerMethodField()
     
+    # 메서드 필드가 읽는 Celeb 컬럼 (?fields= 로 일부만 요청할 때도 함께 가져옴)
+    method_field_columns = {
+        'routines': ('catalog_version',),
+        'routines_count': ('routine_count',),
+    }
+
     class Meta:
         model = Celeb
-        fields = '__all__'
+        # 집계 / 내부용 컬럼은 응답에 넣지 않음 (전체 루틴 수는 routines_count 로)
+        exclude = ['name_choseong', 'catalog_version', 'score_sum', 'score_count', 'routine_count', 'adoption_count']
+        list_serializer_class = CelebListSerializer
 
-    def get_routines_count(self, obj):
+    def get_user(self):
         request = self.context.get('request', None)
         if request is None or not request.user.is_authenticated:
+            return None
+        return request.user
+
+    def setup_eager_loading(self, queryset):
+        queryset = super().setup_eager_loading(queryset)
+        user = self.get_user()
+
+        if user is not None and 'scores' in self.fields:
+            scores = CelebScore.objects.filter(user=user)
+            queryset = queryset.prefetch_related(Prefetch('celebscore_set', queryset=scores, to_attr='user_scores'))
+
+        if user is not None and ('routines_count' in self.fields or 'routines_added_count' in self.fields):
+            queryset = self.annotate_progress(queryset, user)
+        return queryset
+
+    @staticmethod
+    def annotate_progress(queryset, user):
+        # 유저 진행 현황은 UserCelebProgress 에서 (이 유저의 행만 LEFT JOIN), 전체 루틴 수는 Celeb.routine_count
+        #   user_routines_count: 유저가 담은 루틴 수
+        #   fully_completed_count: 기간의 모든 날짜를 완료한 UserRoutine 수
+        return annotate_user_progress(queryset, user).annotate(
+            user_routines_count=Coalesce(F('user_progress__adopted_count'), 0),
+            fully_completed_count=Coalesce(F('user_progress__fully_completed_count'), 0),
+        )
+
+    def get_routines_count(self, obj):
+        user = self.get_user()
+        if user is None:
             return {'user_count': 0, 'total_count': 0}
-        
-        user = request.user
-        # 수정된 부분: UserRoutine에서 routine__celebrity를 참조하도록 변경
-        user_routines_count = UserRoutine.objects.filter(routine__celebrity=obj, user=user).values_list('routine_id', flat=True).distinct().count()
-        # 총 루틴 수
-        total_routines_count = Routine.objects.filter(celebrity=obj).count()
-        
+
+        if hasattr(obj, 'user_routines_count'):
+            return {
+                'user_count': obj.user_routines_count,
+                'total_count': obj.routine_count
+            }
+
         return {
-            'user_count': user_routines_count,
-            'total_count': total_routines_count
+            'user_count': get_user_progress(obj, user).adopted_count,
+            'total_count': obj.routine_count
         }
 
     def get_routines_added_count(self, obj):
@@ -45,27 +110,11 @@ class CelebSerializer(serializers.ModelSerializer):
         
         user = request.user
 
-        user_routines = UserRoutine.objects.filter(
-            routine__celebrity=obj,
-            user=user,
-        )
+        if hasattr(obj, 'fully_completed_count'):
+            return obj.fully_completed_count
 
-        routines_added_count = 0
-
-        for user_routine in user_routines:
-            routine_dates = [user_routine.start_date + timedelta(days=i) for i in range((user_routine.end_date - user_routine.start_date).days + 1)]
-            
-            completed_dates = UserRoutineCompletion.objects.filter(
-                user=user,
-                routine=user_routine,
-                date__in=routine_dates,
-                completed=True
-            ).values_list('date', flat=True)
-            
-            if set(routine_dates) == set(completed_dates):
-                routines_added_count += 1
-        
-        return routines_added_count
+        # 기간의 모든 날짜를 완료한 루틴 수 (UserCelebProgress 가 완료 체크마다 갱신)
+        return get_user_progress(obj, user).fully_completed_count
         
         # [2번 경우의 수] : 기간 중 체킹한게 존재하기만 하면 횟수 증가
         '''
@@ -79,38 +128,44 @@ class CelebSerializer(serializers.ModelSerializer):
         '''
 
     def get_scores(self, obj):
-        request = self.context.get('request', None)
-        if request is None or not request.user.is_authenticated:
+        user = self.get_user()
+        if user is None:
             return []
         
-        user = request.user
-        scores = CelebScore.objects.filter(celeb=obj, user=user)
+        scores = getattr(obj, 'user_scores', None)
+        if scores is None:
+            scores = CelebScore.objects.filter(celeb=obj, user=user)
         return CelebScoreSerializer(scores, many=True).data
 
     def get_routines(self, obj):
-        # Routine에서 celebrity 필드를 참조하여 필터링
-        routines = Routine.objects.filter(celebrity=obj)
-        return RoutineSerializer(routines, many=True).data
+        # 루틴 카드는 catalog_version 별로 캐시 (목록은 CelebListSerializer 가 한 번에 채워 둠)
+        catalog.load_routine_cards([obj])
+        return obj.routine_cards
 
-class MypageCelebSerializer(serializers.ModelSerializer):
+class MypageCelebSerializer(EagerLoadingSerializerMixin, serializers.ModelSerializer):
     routines_added_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Celeb
         fields = ['id', 'name', 'profession', 'photo', 'routines_added_count']
 
+    def setup_eager_loading(self, queryset):
+        queryset = super().setup_eager_loading(queryset)
+        request = self.context.get('request', None)
+        if request is None or not request.user.is_authenticated:
+            return queryset
+
+        return annotate_user_progress(queryset, request.user).annotate(
+            checked_routines_count=Coalesce(F('user_progress__checked_count'), 0),
+        )
+
     def get_routines_added_count(self, obj):
         request = self.context.get('request', None)
         if request is None or not request.user.is_authenticated:
             return 0
 
-        user = request.user
-
-        # 수정된 부분: UserRoutine에서 routine__celebrity를 참조하도록 변경
-        routines_added_count = UserRoutine.objects.filter(
-            routine__celebrity=obj,
-            user=user,
-            completions__completed=True,
-        ).distinct().count()
+        if hasattr(obj, 'checked_routines_count'):
+            return obj.checked_routines_count
 
-        return routines_added_count
\ No newline at end of file
+        # 완료 체크를 한 번이라도 한 루틴 수
+        return get_user_progress(obj, request.user).checked_count
\ No newline at end of file
@@ -0,0 +1,67 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from routine.models import Routine, RoutineCategory
+from search.models import Theme
+from calen.models import UserRoutine
+from .models import Celeb
+from . import catalog
+
+
+# 루틴 / 셀럽 / 테마 / 카테고리가 바뀌면 관련 셀럽의 카탈로그 집계와 루틴 카드 캐시 버전을 갱신
+@receiver(post_save, sender=Routine)
+def refresh_routine_celebs(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # 셀럽을 옮긴 경우 이전 셀럽도 같이
+    catalog.refresh_on_commit([instance.celebrity_id, getattr(instance, '_loaded_celebrity_id', None)])
+    instance._loaded_celebrity_id = instance.celebrity_id
+
+
+@receiver(post_save, sender=UserRoutine)
+def count_routine_adoption(sender, instance, created, raw=False, **kwargs):
+    # UserRoutine.save() 가 Routine.popular 를 UPDATE 로 올리므로 셀럽의 담은 횟수도 차이만큼
+    if raw or not created:
+        return
+    catalog.count_adoption(instance.routine.celebrity_id)
+
+
+@receiver(post_delete, sender=Routine)
+def refresh_deleted_routine_celeb(sender, instance, **kwargs):
+    catalog.refresh_on_commit([instance.celebrity_id])
+
+
+@receiver(m2m_changed, sender=Routine.theme.through)
+@receiver(m2m_changed, sender=Routine.category.through)
+def refresh_routine_links(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        catalog.refresh_on_commit([instance.celebrity_id])
+    elif pk_set:
+        # theme.routine_set.add(...) 처럼 테마 / 카테고리 쪽에서 바꾼 경우
+        catalog.refresh_on_commit(Routine.objects.filter(pk__in=pk_set).values_list('celebrity_id', flat=True))
+
+
+@receiver(post_save, sender=Celeb)
+def refresh_celeb(sender, instance, created, raw=False, **kwargs):
+    # 루틴 카드에 셀럽 이름이 들어가므로 버전을 올리고, 저장하면서 덮어쓴 집계도 다시 셈
+    if raw or created:
+        return
+    catalog.refresh_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Theme)
+@receiver(pre_delete, sender=Theme)
+def refresh_theme_celebs(sender, instance, raw=False, **kwargs):
+    # 루틴 카드에 테마 제목이 들어감 (지울 때는 연결이 사라지기 전에 셀럽을 모아 둠)
+    if raw:
+        return
+    catalog.refresh_on_commit(Routine.objects.filter(theme=instance).values_list('celebrity_id', flat=True))
+
+
+@receiver(post_save, sender=RoutineCategory)
+@receiver(pre_delete, sender=RoutineCategory)
+def refresh_category_celebs(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    catalog.refresh_on_commit(Routine.objects.filter(category=instance).values_list('celebrity_id', flat=True))
@@ -1,3 +1,203 @@
+import datetime
+import time
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from calen.models import UserRoutine
+from rank.models import CelebScore
+from routine.models import Routine
+from project import cache as response_cache
+from .models import Celeb
+from . import catalog
+
+
+class CelebTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = datetime.date.today()
+        self.user = User.objects.create(email='user@example.com', username='user', nickname='유저')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_celeb(self, name='셀럽', routines=2):
+        with self.captureOnCommitCallbacks(execute=True):
+            celeb = Celeb.objects.create(name=name, profession='가수')
+            for i in range(routines):
+                Routine.objects.create(title=f'{name} 루틴{i}', sub_title='sub', content='content', celebrity=celeb, create_at=self.today)
+        return celeb
+
+    def adopt(self, routine):
+        with self.captureOnCommitCallbacks(execute=True):
+            return UserRoutine.objects.create(user=self.user, routine=routine, start_date=self.today, end_date=self.today)
+
+
+class CelebListTests(CelebTestCase):
+    def test_list_query_count_does_not_grow_with_celebs(self):
+        celeb = self.make_celeb('가수1')
+        CelebScore.objects.create(user=self.user, celeb=celeb, score=4)
+        self.adopt(celeb.routine_set.first())
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get('/api/celeb/')
+        first = response.data['results'][0]
+        self.assertEqual(first['scores'][0]['score'], 4)
+        self.assertEqual(first['routines_count'], {'user_count': 1, 'total_count': 2})
+        self.assertEqual(len(first['routines']), 2)
+
+        for i in range(4):
+            other = self.make_celeb(f'배우{i}')
+            CelebScore.objects.create(user=self.user, celeb=other, score=2)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/celeb/')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(few), len(many))
+
+
+class CelebProgressCounterTests(CelebTestCase):
+    def setUp(self):
+        super().setUp()
+        self.celeb = self.make_celeb('가수1', routines=3)
+        self.routines = list(self.celeb.routine_set.order_by('id'))
+
+    def counters(self):
+        cache.clear()
+        response = self.client.get(f'/api/celeb/{self.celeb.pk}/?fields=id,routines_count,routines_added_count')
+        return response.data['routines_count'], response.data['routines_added_count']
+
+    def complete(self, user_routine):
+        with self.captureOnCommitCallbacks(execute=True):
+            for completion in user_routine.completions.all():
+                completion.completed = True
+                completion.save()
+
+    def test_counters(self):
+        self.assertEqual(self.counters(), ({'user_count': 0, 'total_count': 3}, 0))
+        first = self.adopt(self.routines[0])
+        self.adopt(self.routines[0])  # 같은 루틴을 다시 담아도 담은 루틴 수는 1
+        self.adopt(self.routines[1])
+        self.assertEqual(self.counters(), ({'user_count': 2, 'total_count': 3}, 0))
+        self.complete(first)
+        self.assertEqual(self.counters(), ({'user_count': 2, 'total_count': 3}, 1))
+
+    def test_other_users_do_not_count(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        with self.captureOnCommitCallbacks(execute=True):
+            user_routine = UserRoutine.objects.create(user=other, routine=self.routines[0], start_date=self.today, end_date=self.today)
+        self.complete(user_routine)
+        self.assertEqual(self.counters(), ({'user_count': 0, 'total_count': 3}, 0))
+
+    def test_counters_only_request_is_one_query(self):
+        self.adopt(self.routines[0])
+        with self.assertNumQueries(1):
+            self.counters()
+
+
+class CatalogAggregateTests(CelebTestCase):
+    def counts(self, celeb):
+        celeb.refresh_from_db()
+        return celeb.routine_count, celeb.adoption_count
+
+    def test_counts_follow_routine_changes(self):
+        first = self.make_celeb('가수1', routines=2)
+        second = self.make_celeb('가수2', routines=0)
+        routine = first.routine_set.first()
+        self.adopt(routine)
+        self.adopt(routine)
+        self.assertEqual(self.counts(first), (2, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            routine.celebrity = second
+            routine.save()
+        self.assertEqual(self.counts(first), (1, 0))
+        self.assertEqual(self.counts(second), (1, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            routine.delete()
+        self.assertEqual(self.counts(second), (0, 0))
+
+    def test_aggregate_columns_are_not_exposed(self):
+        celeb = self.make_celeb('가수1', routines=2)
+        data = self.client.get(f'/api/celeb/{celeb.pk}/').data
+        self.assertFalse({'routine_count', 'adoption_count', 'score_sum', 'score_count', 'catalog_version'} & set(data))
+        self.assertEqual(data['routines_count']['total_count'], 2)
+
+    def test_routine_cards_are_cached_per_catalog_version(self):
+        celeb = self.make_celeb('가수1', routines=2)
+        catalog.load_routine_cards([Celeb.objects.get(pk=celeb.pk)])
+        fresh = Celeb.objects.get(pk=celeb.pk)
+        with self.assertNumQueries(0):
+            catalog.load_routine_cards([fresh])
+        self.assertEqual([card['title'] for card in fresh.routine_cards], ['가수1 루틴0', '가수1 루틴1'])
+
+        routine = celeb.routine_set.order_by('id').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            routine.title = '새 루틴'
+            routine.save()
+        response = self.client.get(f'/api/celeb/{celeb.pk}/')
+        self.assertEqual([card['title'] for card in response.data['routines']], ['새 루틴', '가수1 루틴1'])
+
+    def test_adoption_refreshes_card_popularity(self):
+        celeb = self.make_celeb('가수1', routines=1)
+        url = f'/api/celeb/{celeb.pk}/?fields=id,routines'
+        self.assertEqual(self.client.get(url).data['routines'][0]['popular'], 0)
+        self.adopt(celeb.routine_set.first())
+        response = self.client.get(url)
+        self.assertEqual(response.data['routines'][0]['popular'], 1)
+
+
+class ResponseCacheTests(CelebTestCase):
+    def setUp(self):
+        super().setUp()
+        self.celeb = self.make_celeb('가수1', routines=1)
+
+    def source(self, client=None, url='/api/celeb/'):
+        return (client or self.client).get(url)['X-Cache']
+
+    def test_hit_after_miss_and_per_query(self):
+        self.assertEqual(self.source(), 'MISS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.source(), 'HIT')
+        self.assertEqual(self.source(url='/api/celeb/?fields=id'), 'MISS')
+        self.assertEqual(self.source(url=f'/api/celeb/{self.celeb.pk}/'), 'MISS')
+
+    def test_user_and_catalog_versions(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        client = APIClient()
+        client.force_authenticate(other)
+        self.source()
+        self.assertEqual(self.source(client), 'MISS')  # 유저마다 따로
+
+        response_cache.bump_user(self.user.pk)
+        self.assertEqual((self.source(), self.source(client)), ('MISS', 'HIT'))
+
+        self.make_celeb('가수2', routines=0)  # 카탈로그 버전이 오르면 모두 새로
+        self.assertEqual((self.source(), self.source(client)), ('MISS', 'MISS'))
+        self.assertEqual(len(self.client.get('/api/celeb/').data['results']), 2)
+
+    def test_expired_entry_is_served_stale_while_one_request_recomputes(self):
+        key = 'response:test'
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return Response({'n': len(calls)})
+
+        self.assertEqual(response_cache.fetch(key, compute, timeout=60), (({'n': 1}, 200), 'miss'))
+        self.assertEqual(response_cache.fetch(key, compute, timeout=60), (({'n': 1}, 200), 'hit'))
+        cache.set(key, ({'n': 1}, 200, time.time() - 1))
+        cache.add(f'{key}:lock', 1)  # 다른 요청이 다시 계산하는 중
+        self.assertEqual(response_cache.fetch(key, compute, timeout=60), (({'n': 1}, 200), 'stale'))
+        cache.delete(f'{key}:lock')
+        self.assertEqual(response_cache.fetch(key, compute, timeout=60), (({'n': 2}, 200), 'miss'))
+        self.assertEqual(len(calls), 2)
 
-# Create your tests here.
+    def test_errors_are_not_cached(self):
+        compute = lambda: Response({'detail': 'error'}, status=503)
+        for _ in range(2):
+            self.assertEqual(response_cache.fetch('response:error', compute, timeout=60), (({'detail': 'error'}, 503), 'miss'))
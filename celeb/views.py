@@ -2,8 +2,22 @@ from rest_framework import viewsets
 from .models import Celeb
 from .serializers import CelebSerializer
 from rest_framework.permissions import IsAuthenticated
-class CelebViewSet(viewsets.ReadOnlyModelViewSet):
+from project.mixins import SparseFieldsViewSetMixin, EagerLoadingViewSetMixin
+from project.pagination import IdCursorPagination
+from project.cache import cached_response
+
+class CelebViewSet(SparseFieldsViewSetMixin, EagerLoadingViewSetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Celeb.objects.all()
     serializer_class = CelebSerializer
     permission_classes = [IsAuthenticated]
-    
\ No newline at end of file
+    pagination_class = IdCursorPagination
+    
+
+    # 진행 현황이 유저마다 다르므로 유저별로 캐시
+    @cached_response()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -5,12 +5,35 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+Run with: gunicorn project.asgi:application -k uvicorn.workers.UvicornWorker
+(or uvicorn project.asgi:application for local runs)
 """
 
 import os
 
+from asgiref.sync import sync_to_async
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from accounts import oauth  # noqa: E402 (앱 로딩 뒤에)
+from search import suggest  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Django 는 lifespan 이벤트를 처리하지 않으므로 여기서 받아서,
+    # 시작할 때 검색 자동완성 인덱스를 만들고 종료할 때 소셜 로그인 클라이언트를 닫는다
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await sync_to_async(suggest.warm_up)()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await oauth.close_pool()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -0,0 +1,124 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from project import versions, singleflight
+
+# API 응답 캐시
+# 뷰셋 액션에 @cached_response(...) 를 붙이면 GET 응답 데이터를 CACHES 백엔드(locmem / 파일 / Redis)에 저장한다.
+# 키는 뷰셋 + 액션 + 경로 + 정렬한 query param + 유저 + 버전 번호로 만든다.
+# 데이터가 바뀌면 키를 지우지 않고 버전만 올려서 (project.versions 의 카탈로그 / 유저별 번호, 워커끼리 공유) 새 키를 쓰게 한다.
+# 캐시 스탬피드 방지:
+#   - 만료(timeout)된 응답은 RESPONSE_CACHE_STALE_GRACE 동안 더 남겨 두고, cache.add 로 잠금을 잡은 요청 하나만 다시 계산하는 동안
+#     다른 요청에는 그 응답을 준다.
+#   - 아예 없는 키는 project.singleflight 로 같은 키의 동시 요청을 합쳐서 한 번만 계산한다.
+#     SINGLEFLIGHT_LOCK_DIR 를 설정하고 워커끼리 공유하는 백엔드(file / redis)를 쓰면 워커끼리도 합쳐진다.
+
+stats = {'hits': 0, 'misses': 0, 'stale': 0, 'coalesced': 0}
+responses = singleflight.group('responses')
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+
+def user_version(user_id):
+    return [versions.get(versions.USERS), versions.get_user(user_id)]
+
+
+def bump_user(user_id):
+    # 유저 한 명의 응답 캐시를 버린다 (선호 카테고리, 담은 루틴, 닉네임 등이 바뀌었을 때)
+    versions.bump_user(user_id)
+
+
+def response_key(view, request, per_user, version_names):
+    parts = {
+        'path': request.path,
+        'query': sorted(request.query_params.lists()),
+        'versions': [versions.get(name) for name in version_names],
+    }
+    if per_user:
+        user = request.user
+        parts['user'] = [user.pk, user_version(user.pk)] if user.is_authenticated else None
+    digest = hashlib.blake2b(json.dumps(parts, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+    return f'response:{view.__class__.__name__}:{view.action}:{digest}'
+
+
+def fresh_entry(cache, key):
+    entry = cache.get(key)  # (데이터, 상태 코드, 새로 계산해야 하는 시각)
+    if entry is not None and entry[2] > time.time():
+        return entry
+    return None
+
+
+def compute_and_store(cache, key, compute, timeout):
+    response = compute()
+    if response.status_code == 200:
+        grace = getattr(settings, 'RESPONSE_CACHE_STALE_GRACE', 30)
+        cache.set(key, (response.data, response.status_code, time.time() + timeout), timeout + grace)
+    return (response.data, response.status_code, None)  # 세 번째 값: 캐시에서 읽었을 때만 만료 시각
+
+
+def fetch(key, compute, timeout):
+    # ((데이터, 상태 코드), 어디서 왔는지) — 'hit' / 'stale' / 'coalesced' / 'miss'
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is not None and entry[2] > time.time():
+        count('hits')
+        return entry[:2], 'hit'
+
+    if entry is not None:
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, 1, timeout=getattr(settings, 'RESPONSE_CACHE_LOCK_TIMEOUT', 30)):
+            # 다른 요청이 다시 계산하는 중이므로 만료된 응답을 그대로
+            count('stale')
+            return entry[:2], 'stale'
+        try:
+            count('misses')
+            return compute_and_store(cache, key, compute, timeout)[:2], 'miss'
+        finally:
+            cache.delete(lock_key)
+
+    result, shared = responses.do(
+        key,
+        lambda: compute_and_store(cache, key, compute, timeout),
+        recheck=lambda: fresh_entry(cache, key),
+    )
+    if shared or result[2] is not None:
+        # 같은 워커의 리더 결과를 받았거나, 다른 워커가 채운 캐시를 받음
+        count('coalesced')
+        return result[:2], 'coalesced'
+    count('misses')
+    return result[:2], 'miss'
+
+
+def cached_response(timeout=None, per_user=True, version_names=(versions.CATALOG,)):
+    '''
+    DRF 뷰셋 액션 응답 캐시.
+    per_user: 유저마다 따로 저장 (유저 버전 번호 포함), version_names: 키에 넣을 project.versions 이름들.
+    '''
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET':
+                return method(self, request, *args, **kwargs)
+            key = response_key(self, request, per_user, version_names)
+            (data, status), source = fetch(
+                key,
+                lambda: method(self, request, *args, **kwargs),
+                timeout if timeout is not None else getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60),
+            )
+            return Response(data, status=status, headers={'X-Cache': source.upper()})
+        return wrapper
+    return decorator
@@ -0,0 +1,99 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.permissions import SAFE_METHODS
+
+
+def requested_fields(request):
+    # ?fields=id,title -> {'id', 'title'}
+    if request is None:
+        return None
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsSerializerMixin:
+    # fields=[...] 로 넘긴 필드만 직렬화
+    def __init__(self, *args, **kwargs):
+        self._sparse_fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self._sparse_fields:
+            for name in list(fields):
+                if name not in self._sparse_fields:
+                    fields.pop(name)
+        return fields
+
+
+class EagerLoadingSerializerMixin:
+    '''
+    직렬화에 필요한 select_related / prefetch_related / annotate 를 시리얼라이저가 직접 선언한다.
+    경로의 첫 구간이 실제로 직렬화되는 필드(이름 또는 source)일 때만 적용된다.
+    메서드 필드가 쓰는 Prefetch / annotate 는 setup_eager_loading 을 오버라이드해서 추가한다.
+    '''
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def rendered_fields(self):
+        rendered = set(self.fields)
+        for field in self.fields.values():
+            rendered.add(field.source.split('.')[0])
+        return rendered
+
+    def setup_eager_loading(self, queryset):
+        rendered = self.rendered_fields()
+        select = [path for path in self.select_related_fields if path.split('__')[0] in rendered]
+        prefetch = [path for path in self.prefetch_related_fields if path.split('__')[0] in rendered]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+class EagerLoadingViewSetMixin:
+    # 시리얼라이저가 선언한 eager loading 을 queryset 에 자동으로 적용
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer = self.get_serializer()
+        if isinstance(serializer, EagerLoadingSerializerMixin):
+            queryset = serializer.setup_eager_loading(queryset)
+        return queryset
+
+
+class SparseFieldsViewSetMixin:
+    # ?fields= 로 요청한 필드만 직렬화하고, SQL도 해당 컬럼만 읽도록 only() 를 건다.
+    # 메서드 필드가 읽는 컬럼은 시리얼라이저의 method_field_columns = {'필드': ('컬럼', ...)} 로 선언한다.
+
+    def get_sparse_fields(self):
+        if self.request.method not in SAFE_METHODS:
+            return None
+        return requested_fields(self.request)
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields and issubclass(self.get_serializer_class(), SparseFieldsSerializerMixin):
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.get_sparse_fields():
+            return queryset
+
+        opts = queryset.model._meta
+        columns = {opts.pk.name}
+        serializer = self.get_serializer()
+        method_field_columns = getattr(serializer, 'method_field_columns', {})
+        for field_name, field in serializer.fields.items():
+            columns.update(method_field_columns.get(field_name, ()))
+            name = field.source.split('.')[0]
+            try:
+                model_field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if getattr(model_field, 'column', None):
+                columns.add(name)
+        return queryset.only(*columns)
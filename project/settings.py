@@ -238,7 +238,7 @@ REST_AUTH = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'dj_rest_auth.jwt_auth.JWTCookieAuthentication' # 실 사용 코드
+        'accounts.authentication.CachedJWTCookieAuthentication' # 실 사용 코드 (JWTCookieAuthentication + 유저 캐시)
     ],
     '''유저 인증 구현 뒤, 수정할 것'''
     'DEFAULT_PERMISSION_CLASSES': [
@@ -247,6 +247,64 @@ REST_FRAMEWORK = {
     ],
 }
 
+# 검색 자동완성 메모리 인덱스 (search/suggest.py)
+SUGGEST_INDEX_MAX_BYTES = 8 * 1024 * 1024  # 워커당 인덱스 메모리 상한
+SUGGEST_CACHE_SIZE = 1024  # prefix 결과 LRU 개수
+SUGGEST_REBUILD_INTERVAL = 60  # 다른 워커가 카탈로그를 바꿨을 때 인덱스를 다시 만드는 최소 간격 (초)
+SUGGEST_BUILD_ON_START = True  # 워커가 뜰 때 인덱스를 미리 만들기 (첫 요청이 만들지 않도록)
+
+# 검색 결과 캐시 (search/cache.py)
+SEARCH_CACHE_SIZE = 512  # 워커당 캐시할 검색 응답 개수 (LRU)
+
+# 인기 검색어 (search/trending.py)
+SEARCH_TRENDING_SIZE = 100  # 추적할 상위 검색어 개수
+SEARCH_TRENDING_HALF_LIFE = 6 * 60 * 60  # 검색 횟수가 절반으로 줄어드는 시간 (초)
+SEARCH_TRENDING_FLUSH_INTERVAL = 5 * 60  # DB 스냅샷 저장 주기 (초)
+
+# 셀럽 상세 루틴 카드 캐시 (celeb/catalog.py, 키에 catalog_version 이 들어가므로 만료는 메모리 정리용)
+CELEB_ROUTINES_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 셀럽 전체 랭킹 (rank/leaderboard.py): 평가 수가 적은 셀럽을 전체 평균 쪽으로 당기는 가상 평가 수
+LEADERBOARD_PRIOR_WEIGHT = 5
+
+# JWT 인증 유저 캐시 (accounts/authentication.py): 워커당 유저 수, 캐시에 둘 최대 시간 (초)
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60
+
+# 캐시 무효화 버전 번호를 같은 서버의 워커끼리 공유하는 파일 (project/versions.py, 응답 캐시가 locmem 일 때만. file / redis 면 번호도 그 캐시에)
+VERSIONS_FILE = env('VERSIONS_FILE', default=os.path.join(BASE_DIR, 'run', 'versions.bin'))
+
+# 캐시 백엔드: CACHE_BACKEND=locmem(기본, 워커별) / file(같은 서버의 워커끼리 공유) / redis(REDIS_URL, redis 패키지 필요)
+CACHE_BACKEND = env('CACHE_BACKEND', default='locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': env('REDIS_URL', default='redis://127.0.0.1:6379/0')}}
+elif CACHE_BACKEND == 'file':
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': env('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache'))}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'OPTIONS': {'MAX_ENTRIES': 10000}}}
+
+# API 응답 캐시 (project/cache.py)
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 60  # 응답을 새로 만드는 주기 (초)
+RESPONSE_CACHE_STALE_GRACE = 30  # 새로 만드는 동안 다른 요청에 만료된 응답을 줄 수 있는 시간 (초)
+RESPONSE_CACHE_LOCK_TIMEOUT = 30  # 다시 계산하는 요청의 잠금 유지 시간 (초)
+
+# 같은 계산 합치기 (project/singleflight.py): 잠금 파일 디렉터리를 주면 워커끼리도 합친다 (None 이면 워커 안에서만)
+SINGLEFLIGHT_LOCK_DIR = env('SINGLEFLIGHT_LOCK_DIR', default=None)
+SINGLEFLIGHT_LOCK_WAIT = 5  # 다른 워커의 계산을 기다리는 최대 시간 (초)
+
+# 소셜 로그인 제공자 요청 (accounts/oauth.py)
+SOCIAL_LOGIN_HTTP_TIMEOUT = 5  # 요청 하나의 타임아웃 (초)
+SOCIAL_LOGIN_MAX_CONCURRENCY = 20  # ASGI 워커(이벤트 루프)당 동시에 보내는 제공자 요청 수
+SOCIAL_LOGIN_QUEUE_TIMEOUT = 2  # 자리가 날 때까지 기다리는 최대 시간 (초), 넘으면 503
+# 제공자 주소 바꾸기 (로컬 가짜 제공자 등): {'kakao': {'token': url, 'profile': url}}
+SOCIAL_LOGIN_PROVIDER_URLS = {}
+
+# 비슷한 유저 / 추천 셀럽 인덱스 (build_similarity_index 로 생성)
+SIMILARITY_INDEX_DIR = BASE_DIR / 'similarity_index'
+SIMILARITY_INDEX_KEEP = 2  # 남겨 둘 버전 수 (현재 + 바로 전 버전, 교체 중에 읽던 워커용)
+SIMILARITY_INDEX_CHECK_INTERVAL = 1  # API 워커가 CURRENT 가 바뀌었는지 확인하는 간격 (초)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
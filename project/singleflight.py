@@ -0,0 +1,184 @@
+import copy
+import hashlib
+import os
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: 워커 안에서만 합침
+    fcntl = None
+
+# 같은 계산 합치기 (single-flight)
+# 배포 직후 / 캐시를 비운 직후에 같은 요청이 한꺼번에 들어오면, 같은 키의 계산은 한 요청(리더)만 하고
+# 나머지는 리더가 끝날 때까지 기다렸다가 같은 결과를 받는다.
+# SINGLEFLIGHT_LOCK_DIR 를 설정하면 워커끼리도 잠금 파일(flock)로 리더를 한 명으로 줄인다.
+# 잠금 파일은 키마다 하나라서 (키의 128비트 해시) 다른 키의 계산을 기다리는 일은 없고, 리더가 끝나면 파일을 지운다.
+# 다른 워커의 결과는 메모리로 받을 수 없으므로, 잠금을 얻은 뒤 recheck() 로 공유 캐시를 먼저 확인한다.
+# 리더가 예외로 끝나면 기다린 요청들은 같은 종류의 새 예외를 받는다 (원래 예외는 __cause__ 로).
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    def __init__(self, name):
+        self.name = name
+        self.leaders = 0  # 직접 계산한 요청
+        self.coalesced = 0  # 같은 워커의 리더 결과를 받은 요청
+        self.lock_waits = 0  # 다른 워커가 계산 중이라 잠금 파일에서 기다린 요청
+        self.lock_hits = 0  # 기다린 뒤 다른 워커의 결과를 캐시에서 받은 요청
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, recheck=None):
+        '''
+        key 가 같은 동시 호출은 fn() 을 한 번만 실행하고 결과(또는 예외)를 나눠 받는다.
+        recheck: 다른 워커를 기다린 뒤 부를 함수. None 이 아닌 값을 돌려주면 fn() 대신 그 값을 쓴다.
+        (결과, 다른 요청의 결과를 받았는지) 를 돌려준다.
+        '''
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                # 예외 객체 하나를 여러 스레드에서 raise 하면 traceback 이 섞이므로 요청마다 새로
+                raise follower_error(call.error) from call.error
+            return call.result, True
+
+        try:
+            call.result = self.run(key, fn, recheck)
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def run(self, key, fn, recheck):
+        path = lock_path(self.name, key)
+        fd, held = hold(path)
+        if fd is None:
+            return fn()
+        try:
+            if not held:
+                # 다른 워커가 계산 중: 끝날 때까지 (최대 SINGLEFLIGHT_LOCK_WAIT) 기다린 뒤 결과가 있으면 그것을 씀
+                with self._lock:
+                    self.lock_waits += 1
+                # 리더가 끝나면서 파일을 지웠으면 잠금을 얻어도 지금 파일의 주인이 아님
+                held = wait_for(fd) and same_file(fd, path)
+                if recheck is not None:
+                    result = recheck()
+                    if result is not None:
+                        with self._lock:
+                            self.lock_hits += 1
+                        return result
+            return fn()
+        finally:
+            if held:
+                # 잠금을 쥔 채로 지워야 다음 리더가 새 파일을 만든다
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            os.close(fd)  # 닫으면 잠금도 풀림
+
+    def stats(self):
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'lock_waits': self.lock_waits,
+                'lock_hits': self.lock_hits,
+                'in_flight': len(self._calls),
+            }
+
+
+def follower_error(error):
+    try:
+        return copy.copy(error)
+    except Exception:
+        return RuntimeError(f'single-flight leader failed: {error!r}')
+
+
+def lock_path(name, key):
+    directory = getattr(settings, 'SINGLEFLIGHT_LOCK_DIR', None)
+    if not directory or fcntl is None:
+        return None
+    digest = hashlib.blake2b(f'{name}:{key}'.encode(), digest_size=16).hexdigest()
+    return os.path.join(str(directory), f'{name}-{digest}.lock')
+
+
+def hold(path):
+    # (fd, 잠금을 얻었는지). 잠금 파일을 쓸 수 없으면 (None, False)
+    if path is None:
+        return None, False
+    while True:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            return None, False
+        if not acquire(fd):
+            return fd, False
+        if same_file(fd, path):
+            return fd, True
+        # 연 뒤 잠금을 얻기 전에 이전 리더가 파일을 지움: 새 파일로 다시
+        os.close(fd)
+
+
+def same_file(fd, path):
+    try:
+        return os.path.samestat(os.fstat(fd), os.stat(path))
+    except OSError:
+        return False
+
+
+def acquire(fd):
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+def wait_for(fd):
+    # 잠금을 얻을 때까지 (리더가 계산을 마칠 때까지) 기다린다. 너무 오래 걸리면 그냥 진행
+    deadline = time.monotonic() + getattr(settings, 'SINGLEFLIGHT_LOCK_WAIT', 5)
+    while time.monotonic() < deadline:
+        if acquire(fd):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def group(name):
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = Group(name)
+        return _groups[name]
+
+
+def stats():
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
@@ -0,0 +1,263 @@
+import datetime
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.cache import cache, caches
+from django.test import TestCase
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from celeb.models import Celeb
+from rank.models import CelebScore
+from routine.models import Routine
+from search import cache as search_cache
+from project import singleflight, versions
+
+
+def bump_many(name, count):
+    for _ in range(count):
+        versions.bump(name)
+
+
+def bump_user_on_other_host(versions_file, user_id):
+    # 다른 서버: 버전 파일이 따로 (새 파일)
+    from django.test.utils import override_settings
+    with override_settings(VERSIONS_FILE=versions_file):
+        versions.reset()
+        versions.bump_user(user_id)
+
+
+class VersionsTestCase(TestCase):
+    # 버전 번호를 워커(프로세스)끼리 공유하는지: fork 한 프로세스로 확인
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.versions_file = os.path.join(self.directory, 'versions.bin')
+        override = self.settings(VERSIONS_FILE=self.versions_file, **self.extra_settings())
+        override.enable()
+        self.addCleanup(versions.reset)
+        self.addCleanup(override.disable)
+        versions.reset()
+        cache.clear()
+        search_cache.results.clear()
+        self.processes = multiprocessing.get_context('fork')
+        self.user = User.objects.create(email='user@example.com', username='user', nickname='유저')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def extra_settings(self):
+        return {}
+
+    def run_in_processes(self, target, *args, count=1):
+        workers = [self.processes.Process(target=target, args=args) for _ in range(count)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=60)
+            self.assertEqual(worker.exitcode, 0)
+
+    def celeb_list(self):
+        response = self.client.get('/api/celeb/?fields=id,scores')
+        return response['X-Cache'], [[s['score'] for s in item['scores']] for item in response.data['results']]
+
+    def rate(self, celeb, score):
+        with self.captureOnCommitCallbacks(execute=True):
+            CelebScore.objects.update_or_create(user=self.user, celeb=celeb, defaults={'score': score})
+
+
+class FileVersionsTests(VersionsTestCase):
+    # 응답 캐시가 locmem (기본): 번호는 같은 서버의 워커끼리 VERSIONS_FILE 로
+    def test_concurrent_bumps_from_processes_add_up(self):
+        versions.bump(versions.CATALOG)  # 부모가 먼저 파일을 열어 둔 상태에서 fork
+        self.run_in_processes(bump_many, versions.CATALOG, 500, count=4)
+        self.assertEqual(versions.get(versions.CATALOG), 1 + 4 * 500)
+        self.assertEqual(versions.get(versions.LEADERBOARD), 0)
+
+    def test_bump_in_another_process_invalidates_search_cache(self):
+        Routine.objects.create(title='아침 요가', sub_title='sub', content='content', create_at=datetime.date.today(),
+                               celebrity=Celeb.objects.create(name='아이유', profession='가수'))
+        search = lambda: [item['title'] for item in self.client.get('/api/search', {'data': '요가'}).data['루틴']]
+        before = search_cache.results.stats()['hits']
+        search()
+        search()
+        self.assertEqual(search_cache.results.stats()['hits'], before + 1)
+
+        # 다른 워커에서 카탈로그가 바뀜 (이 프로세스의 signal 은 돌지 않음)
+        Routine.objects.filter(title='아침 요가').update(title='저녁 요가')
+        self.run_in_processes(versions.bump, versions.CATALOG)
+        self.assertEqual(search(), ['저녁 요가'])
+        self.assertEqual(search_cache.results.stats()['hits'], before + 1)
+
+    def test_user_bump_in_another_process_invalidates_response_cache(self):
+        self.assertEqual(self.celeb_list()[0], 'MISS')
+        self.assertEqual(self.celeb_list()[0], 'HIT')
+        self.run_in_processes(versions.bump_user, self.user.pk)
+        self.assertEqual(self.celeb_list()[0], 'MISS')
+
+
+class SharedCacheVersionsTests(VersionsTestCase):
+    # 응답 캐시가 워커 / 서버끼리 공유하는 file 백엔드: 번호도 그 캐시에
+    def extra_settings(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        return {'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}}
+
+    def setUp(self):
+        super().setUp()
+        self.celeb = Celeb.objects.create(name='아이유', profession='가수')
+
+    def test_counters_live_in_the_cache(self):
+        version = versions.bump(versions.CATALOG)
+        self.assertEqual(versions.get(versions.CATALOG), version)
+        self.assertEqual(caches['default'].get(f'versions:{versions.CATALOG}'), version)
+        self.assertFalse(os.path.exists(self.versions_file))
+
+    def test_reset_versions_file_does_not_bring_back_stale_responses(self):
+        self.rate(self.celeb, 1)
+        self.assertEqual(self.celeb_list(), ('MISS', [[1]]))
+        self.rate(self.celeb, 5)
+        self.assertEqual(self.celeb_list(), ('MISS', [[5]]))
+
+        # 버전 파일이 지워짐 (서버 재배포 등): 공유 캐시에는 [[1]] / [[5]] 응답이 그대로 남아 있음
+        versions.reset()
+        if os.path.exists(self.versions_file):
+            os.remove(self.versions_file)
+        self.assertEqual(self.celeb_list(), ('HIT', [[5]]))
+
+        # 캐시에서 번호 키만 지워져도 (eviction) 예전 번호로 돌아가지 않음
+        caches['default'].delete(f'versions:user:{self.user.pk}')
+        self.assertEqual(self.celeb_list(), ('MISS', [[5]]))
+
+    def test_bump_on_another_host_invalidates(self):
+        self.assertEqual(self.celeb_list()[0], 'MISS')
+        self.assertEqual(self.celeb_list()[0], 'HIT')
+        self.run_in_processes(bump_user_on_other_host, os.path.join(self.directory, 'other-host.bin'), self.user.pk)
+        self.assertEqual(self.celeb_list()[0], 'MISS')
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        self.group = singleflight.Group('test')
+
+    def run_threads(self, count, target):
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def run(i):
+            barrier.wait()
+            try:
+                results[i] = target()
+            except Exception as e:
+                results[i] = e
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        return results
+
+    def slow(self, value, calls, release):
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return value
+        return compute
+
+    def test_concurrent_calls_with_same_key_run_once(self):
+        calls, release = [], threading.Event()
+        threading.Timer(0.2, release.set).start()
+        results = self.run_threads(5, lambda: self.group.do('key', self.slow('value', calls, release)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+        self.assertEqual({value for value, _ in results}, {'value'})
+        self.assertEqual(self.group.stats(), {'leaders': 1, 'coalesced': 4, 'lock_waits': 0, 'lock_hits': 0, 'in_flight': 0})
+
+    def test_followers_get_fresh_chained_errors(self):
+        release = threading.Event()
+        threading.Timer(0.2, release.set).start()
+        leader_error = ValidationError({'data': ['bad']})
+
+        def compute():
+            release.wait(5)
+            raise leader_error
+        errors = self.run_threads(3, lambda: self.group.do('key', compute))
+        self.assertEqual(sum(error is leader_error for error in errors), 1)
+        followers = [error for error in errors if error is not leader_error]
+        self.assertEqual(len(followers), 2)
+        self.assertIsNot(followers[0], followers[1])
+        for error in followers:
+            self.assertIsInstance(error, ValidationError)
+            self.assertEqual(error.detail, leader_error.detail)
+            self.assertIs(error.__cause__, leader_error)
+        # 끝난 키는 다음 호출에서 다시 계산
+        self.assertEqual(self.group.do('key', lambda: 'ok'), ('ok', False))
+
+    def test_distinct_keys_run_in_parallel(self):
+        calls, release = [], threading.Event()
+        threading.Timer(0.2, release.set).start()
+        results = self.run_threads(4, lambda: self.group.do(threading.get_ident(), self.slow('value', calls, release)))
+        self.assertEqual(len(calls), 4)
+        self.assertEqual([shared for _, shared in results], [False] * 4)
+
+    def test_module_stats_by_group_name(self):
+        group = singleflight.group('test-stats')
+        self.assertIs(singleflight.group('test-stats'), group)
+        group.do('key', lambda: 1)
+        self.assertEqual(singleflight.stats()['test-stats']['leaders'], 1)
+
+
+class SingleFlightLockFileTests(TestCase):
+    # 워커끼리 합치기: 같은 이름의 Group 두 개(워커 두 개 역할)가 잠금 파일로만 만난다
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = self.settings(SINGLEFLIGHT_LOCK_DIR=directory, SINGLEFLIGHT_LOCK_WAIT=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.directory = directory
+        self.worker, self.other_worker = singleflight.Group('test'), singleflight.Group('test')
+
+    def lead_in_background(self, key, started, release, store=None):
+        def compute():
+            started.set()
+            release.wait(5)
+            if store is not None:
+                store[key] = 'from other worker'
+            return 'value'
+        thread = threading.Thread(target=self.other_worker.do, args=(key, compute))
+        thread.start()
+        self.addCleanup(thread.join, 10)
+        self.addCleanup(release.set)
+        self.assertTrue(started.wait(5))
+        return thread
+
+    def test_waiting_worker_reads_leaders_result(self):
+        store, started, release = {}, threading.Event(), threading.Event()
+        self.lead_in_background('key', started, release, store)
+        threading.Timer(0.2, release.set).start()
+        result = self.worker.do('key', lambda: 'recomputed', recheck=lambda: store.get('key'))
+        self.assertEqual(result, ('from other worker', False))
+        self.assertEqual((self.worker.stats()['lock_waits'], self.worker.stats()['lock_hits']), (1, 1))
+        self.assertEqual(os.listdir(self.directory), [])  # 끝난 리더는 잠금 파일을 지움
+
+    def test_distinct_keys_do_not_wait_for_each_other(self):
+        started, release = threading.Event(), threading.Event()
+        self.lead_in_background('busy', started, release)
+        started_at = time.monotonic()
+        # 잠금 파일을 나눠 쓰면 (예: 256개) 이 중 일부는 'busy' 와 같은 파일에 걸린다
+        for i in range(1000):
+            self.assertEqual(self.worker.do(f'key-{i}', lambda: i), (i, False))
+        self.assertLess(time.monotonic() - started_at, 2)
+        self.assertEqual(self.worker.stats()['lock_waits'], 0)
+
+    def test_gives_up_waiting_after_lock_wait(self):
+        started, release = threading.Event(), threading.Event()
+        self.lead_in_background('key', started, release)
+        with self.settings(SINGLEFLIGHT_LOCK_WAIT=0.1):
+            self.assertEqual(self.worker.do('key', lambda: 'computed anyway', recheck=lambda: None), ('computed anyway', False))
+        self.assertEqual((self.worker.stats()['lock_waits'], self.worker.stats()['lock_hits']), (1, 0))
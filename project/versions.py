@@ -0,0 +1,168 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+try:
+    import fcntl
+except ImportError:  # Windows: 파일 잠금 없이 워커 안에서만 공유
+    fcntl = None
+
+# 캐시 무효화용 버전 번호
+# 데이터가 바뀔 때 bump() 로 올리고, 캐시는 저장할 때의 버전과 지금 버전이 다르면 버린다.
+# 번호는 같은 서버의 모든 워커가 mmap 으로 여는 작은 파일(VERSIONS_FILE)에 8바이트 칸으로 저장한다.
+# 읽기는 메모리 읽기 한 번이고, 올릴 때만 파일 잠금(flock)을 잡으므로 다른 워커에서 바꾼 것도 바로 보인다.
+# 파일을 쓸 수 없는 환경(fcntl 없음 등)에서는 워커 메모리 안에서만 센다.
+# 응답 캐시 백엔드가 locmem 이 아니면 (file / redis: 서버끼리 또는 재시작 뒤에도 남는 캐시) 번호도 그 캐시에 둔다.
+# 서버마다 있는 파일의 번호는 다른 서버 / 파일을 지운 뒤에 같은 번호가 다시 나와서 남아 있는 옛 응답을 돌려주기 때문.
+# 캐시의 번호는 처음 만들 때 현재 시각(ns)에서 시작하므로 키가 지워져서 다시 만들어도 예전 번호와 겹치지 않는다.
+
+CATALOG = 'catalog'  # 셀럽 / 루틴 / 테마
+LEADERBOARD = 'leaderboard'  # 셀럽 점수 (rank/leaderboard.py)
+USERS = 'users'  # 유저 전체 (여러 유저를 한 번에 바꿨을 때)
+
+SLOTS = {CATALOG: 0, LEADERBOARD: 1, USERS: 2}
+NAMED_SLOTS = 16
+# 유저별 번호는 user_id 를 나눈 나머지 칸에 (같은 칸의 다른 유저 캐시도 같이 버려질 뿐 틀리지는 않음)
+USER_SLOTS = 4096
+SLOT = struct.Struct('<Q')
+FILE_SIZE = (NAMED_SLOTS + USER_SLOTS) * SLOT.size
+
+# 워커마다 따로인 캐시 (이 백엔드면 번호는 mmap 파일에)
+LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+_lock = threading.Lock()
+_file = None  # (pid, fd, mmap)
+_local = {}
+
+
+def _open():
+    # 워커(프로세스)마다 따로 연다: fork 로 물려받은 fd 는 flock 이 부모와 공유되기 때문
+    global _file
+    pid = os.getpid()
+    if _file is not None and _file[0] == pid:
+        return _file
+    with _lock:
+        if _file is not None and _file[0] == pid:
+            return _file
+        if fcntl is None:
+            return None
+        path = str(getattr(settings, 'VERSIONS_FILE', None) or '')
+        if not path:
+            return None
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < FILE_SIZE:
+                    os.ftruncate(fd, FILE_SIZE)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            _file = (pid, fd, mmap.mmap(fd, FILE_SIZE))
+        except OSError:
+            return None
+        return _file
+
+
+def _slot(name):
+    return SLOTS[name]
+
+
+def _read(slot):
+    opened = _open()
+    if opened is None:
+        return _local.get(slot, 0)
+    return SLOT.unpack_from(opened[2], slot * SLOT.size)[0]
+
+
+def _bump(slot):
+    opened = _open()
+    if opened is None:
+        with _lock:
+            _local[slot] = _local.get(slot, 0) + 1
+            return _local[slot]
+    _, fd, memory = opened
+    with _lock:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            value = SLOT.unpack_from(memory, slot * SLOT.size)[0] + 1
+            SLOT.pack_into(memory, slot * SLOT.size, value)
+            return value
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def shared_cache():
+    # 번호를 둘 공유 캐시 (응답 캐시가 locmem 이면 None -> mmap 파일)
+    alias = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')
+    if settings.CACHES[alias]['BACKEND'] in LOCAL_BACKENDS:
+        return None
+    return caches[alias]
+
+
+def _cache_read(cache, key):
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def _cache_bump(cache, key):
+    try:
+        return cache.incr(key)
+    except ValueError:  # 아직 없거나 지워진 키
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.incr(key)
+
+
+def get(name):
+    cache = shared_cache()
+    if cache is not None:
+        return _cache_read(cache, f'versions:{name}')
+    return _read(_slot(name))
+
+
+def bump(name):
+    cache = shared_cache()
+    if cache is not None:
+        return _cache_bump(cache, f'versions:{name}')
+    return _bump(_slot(name))
+
+
+def user_slot(user_id):
+    return NAMED_SLOTS + int(user_id) % USER_SLOTS
+
+
+def get_user(user_id):
+    # 유저 한 명의 데이터 버전 (유저 전체 버전과 함께 비교할 것)
+    cache = shared_cache()
+    if cache is not None:
+        return _cache_read(cache, f'versions:user:{int(user_id)}')
+    return _read(user_slot(user_id))
+
+
+def bump_user(user_id):
+    cache = shared_cache()
+    if cache is not None:
+        return _cache_bump(cache, f'versions:user:{int(user_id)}')
+    return _bump(user_slot(user_id))
+
+
+def reset():
+    # 열어 둔 파일을 닫고 다음 호출에서 VERSIONS_FILE 을 다시 연다 (테스트에서 설정을 바꿨을 때)
+    global _file
+    with _lock:
+        if _file is not None and _file[0] == os.getpid():
+            _file[2].close()
+            os.close(_file[1])
+        _file = None
+        _local.clear()
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 
 application = get_wsgi_application()
+
+# 워커가 뜰 때 검색 자동완성 인덱스를 미리 만든다
+from search import suggest  # noqa: E402
+
+suggest.warm_up()
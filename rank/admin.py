@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import CelebScore
+from .models import CelebScore, CelebScoreBucket
 # Register your models here.
 
-admin.site.register(CelebScore)
\ No newline at end of file
+admin.site.register(CelebScore)
+admin.site.register(CelebScoreBucket)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RankConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rank'
+
+    def ready(self):
+        from . import signals  # noqa: F401
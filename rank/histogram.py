@@ -0,0 +1,90 @@
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+# 셀럽별 점수 분포 (CelebScoreBucket)
+# 점수는 작은 정수라서 셀럽마다 (점수, 인원) 몇 줄만 있으면 된다.
+# 점수가 추가 / 변경 / 삭제되면 해당 칸만 +1 / -1 하고,
+# 백분위 / 중앙값 / 분포는 CelebScore 를 세지 않고 이 몇 줄만 읽어서 계산한다.
+
+
+def bucket_model(celebs_or_model):
+    Celeb = getattr(celebs_or_model, 'model', celebs_or_model)
+    return Celeb._meta.get_field('score_buckets').related_model
+
+
+def record_many(changes):
+    # [(celeb_id, 이전 점수, 새 점수)] -> 칸별 차이를 모아서 (빈 칸 INSERT, UPDATE) 두 번으로 반영
+    from celeb.models import Celeb
+    deltas = {}
+    for celeb_id, old_score, new_score in changes:
+        if old_score == new_score:
+            continue
+        if old_score is not None:
+            deltas[(celeb_id, old_score)] = deltas.get((celeb_id, old_score), 0) - 1
+        if new_score is not None:
+            deltas[(celeb_id, new_score)] = deltas.get((celeb_id, new_score), 0) + 1
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    Bucket = bucket_model(Celeb)
+    Bucket.objects.bulk_create(
+        [Bucket(celeb_id=celeb_id, score=score) for (celeb_id, score), delta in deltas.items() if delta > 0],
+        ignore_conflicts=True,
+    )
+    whens = [When(celeb_id=celeb_id, score=score, then=Value(delta)) for (celeb_id, score), delta in deltas.items()]
+    Bucket.objects.filter(
+        celeb_id__in={celeb_id for celeb_id, _ in deltas},
+        score__in={score for _, score in deltas},
+    ).update(count=F('count') + Case(*whens, default=Value(0), output_field=IntegerField()))
+
+
+def rebuild(celebs):
+    # 셀럽 queryset 의 분포를 CelebScore 에서 다시 센다
+    Bucket = bucket_model(celebs)
+    CelebScore = celebs.model._meta.get_field('celebscore').related_model
+    Bucket.objects.filter(celeb__in=celebs).delete()
+    rows = CelebScore.objects.filter(celeb__in=celebs).values('celeb_id', 'score').annotate(n=Count('pk')).order_by()
+    Bucket.objects.bulk_create([Bucket(celeb_id=row['celeb_id'], score=row['score'], count=row['n']) for row in rows])
+
+
+def distribution(celeb_id):
+    # [(점수, 인원)] 점수 오름차순, 인원이 0 인 칸은 뺀다
+    from celeb.models import Celeb
+    Bucket = bucket_model(Celeb)
+    return list(Bucket.objects.filter(celeb_id=celeb_id, count__gt=0).order_by('score').values_list('score', 'count'))
+
+
+def summary(buckets, score=None):
+    # 분포 -> 평가 수 / 평균 / 중앙값 / (score 가 있으면) score 보다 낮게 준 비율(%)
+    total = sum(count for _, count in buckets)
+    result = {
+        'count': total,
+        'average': round(sum(s * count for s, count in buckets) / total, 2) if total else None,
+        'median': median(buckets, total),
+        'distribution': [{'score': s, 'count': count} for s, count in buckets],
+    }
+    if score is not None:
+        result['percentile'] = percentile(buckets, total, score)
+    return result
+
+
+def percentile(buckets, total, score):
+    if not total:
+        return None
+    below = sum(count for s, count in buckets if s < score)
+    return round(below * 100 / total, 1)
+
+
+def median(buckets, total):
+    if not total:
+        return None
+    # 가운데 두 값(짝수면)의 평균
+    positions = [(total - 1) // 2, total // 2]
+    values = []
+    seen = 0
+    for s, count in buckets:
+        while positions and positions[0] < seen + count:
+            values.append(s)
+            positions.pop(0)
+        seen += count
+    return sum(values) / len(values)
@@ -0,0 +1,176 @@
+import bisect
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from project import versions
+
+# 셀럽 전체 랭킹
+# 셀럽별 점수 합 / 평가 수는 Celeb.score_sum / score_count 에 누적하고 (점수가 바뀔 때 차이만큼 F() 로 더함),
+# 워커 메모리에는 베이지안 보정 점수 순으로 정렬된 배열을 둔다.
+#   보정 점수 = (C * m + 점수 합) / (C + 평가 수)   (m: 전체 평균, C: LEADERBOARD_PRIOR_WEIGHT)
+# 평가가 적은 셀럽은 전체 평균 쪽으로 당겨져서, 한두 명이 준 만점으로 1등이 되지 않는다.
+# 상위 k 개는 배열 앞에서 바로 (O(k)), 셀럽 순위는 bisect 로 (O(log n)) 찾는다.
+# 다른 워커의 점수 변경은 versions.LEADERBOARD 가 바뀐 것을 보고 DB 에서 다시 읽는다.
+
+# 전체 평균이 이만큼 움직이면 보정 점수를 다시 계산해서 정렬
+PRIOR_MEAN_TOLERANCE = 0.05
+
+
+def refresh(celebs):
+    # 셀럽 queryset 의 점수 합 / 평가 수를 CelebScore 에서 다시 센다 (UPDATE 한 번)
+    CelebScore = celebs.model._meta.get_field('celebscore').related_model
+    scores = CelebScore.objects.filter(celeb=OuterRef('pk')).order_by().values('celeb')
+    return celebs.update(
+        score_sum=Coalesce(Subquery(scores.annotate(total=Sum('score')).values('total')), 0),
+        score_count=Coalesce(Subquery(scores.annotate(n=Count('pk')).values('n')), 0),
+    )
+
+
+class Leaderboard:
+    def __init__(self, prior_weight):
+        self.prior_weight = prior_weight
+        self.prior_mean = 0.0
+        self.version = None
+        self._keys = []     # 정렬된 (-보정 점수, celeb_id)
+        self._totals = {}   # celeb_id -> (점수 합, 평가 수)
+        self._sum = 0
+        self._count = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._totals)
+
+    def adjusted(self, total, count):
+        return (self.prior_weight * self.prior_mean + total) / (self.prior_weight + count)
+
+    def _key(self, celeb_id):
+        total, count = self._totals[celeb_id]
+        return (-self.adjusted(total, count), celeb_id)
+
+    def _resort(self):
+        self.prior_mean = self._sum / self._count if self._count else 0.0
+        self._keys = sorted(self._key(celeb_id) for celeb_id in self._totals)
+
+    def load(self, rows, version=None):
+        # (celeb_id, 점수 합, 평가 수) 목록으로 처음부터 채운다
+        with self._lock:
+            self._totals = {celeb_id: (total, count) for celeb_id, total, count in rows if count}
+            self._sum = sum(total for total, _ in self._totals.values())
+            self._count = sum(count for _, count in self._totals.values())
+            self._resort()
+            self.version = version
+
+    def update(self, celeb_id, delta_sum, delta_count):
+        with self._lock:
+            if celeb_id in self._totals:
+                del self._keys[bisect.bisect_left(self._keys, self._key(celeb_id))]
+                total, count = self._totals.pop(celeb_id)
+            else:
+                total, count = 0, 0
+            total, count = total + delta_sum, count + delta_count
+            self._sum += delta_sum
+            self._count += delta_count
+            if count > 0:
+                self._totals[celeb_id] = (total, count)
+                bisect.insort(self._keys, self._key(celeb_id))
+
+            mean = self._sum / self._count if self._count else 0.0
+            if abs(mean - self.prior_mean) > PRIOR_MEAN_TOLERANCE:
+                self._resort()
+
+    def entry(self, celeb_id, rank):
+        total, count = self._totals[celeb_id]
+        return {
+            'rank': rank,
+            'celeb_id': celeb_id,
+            'average': round(total / count, 2),
+            'raters': count,
+            'adjusted_score': round(self.adjusted(total, count), 3),
+        }
+
+    def top(self, k):
+        with self._lock:
+            return [self.entry(celeb_id, rank) for rank, (_, celeb_id) in enumerate(self._keys[:k], start=1)]
+
+    def rank_of(self, celeb_id):
+        # 평가가 없는 셀럽은 None
+        with self._lock:
+            if celeb_id not in self._totals:
+                return None
+            return self.entry(celeb_id, bisect.bisect_left(self._keys, self._key(celeb_id)) + 1)
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_leaderboard():
+    # 워커마다 첫 사용 때, 그리고 다른 워커가 점수를 바꾼 뒤에는 Celeb 컬럼에서 다시 채운다
+    from celeb.models import Celeb
+    global _leaderboard
+    version = versions.get(versions.LEADERBOARD)
+    if _leaderboard is None or _leaderboard.version != version:
+        with _leaderboard_lock:
+            if _leaderboard is None or _leaderboard.version != version:
+                leaderboard = Leaderboard(getattr(settings, 'LEADERBOARD_PRIOR_WEIGHT', 5))
+                rows = Celeb.objects.filter(score_count__gt=0).values_list('id', 'score_sum', 'score_count')
+                leaderboard.load(rows, version)
+                _leaderboard = leaderboard
+    return _leaderboard
+
+
+def reset():
+    global _leaderboard
+    _leaderboard = None
+
+
+def record(celeb_id, old_score, new_score):
+    # 점수 추가(old_score=None) / 변경 / 삭제(new_score=None) 를 Celeb 누적값과 메모리 랭킹에 반영
+    record_many([(celeb_id, old_score, new_score)])
+
+
+def record_many(changes):
+    # [(celeb_id, 이전 점수, 새 점수)] 를 셀럽별 차이로 모아서 UPDATE 한 번으로 반영
+    from celeb.models import Celeb
+    deltas = {}
+    for celeb_id, old_score, new_score in changes:
+        delta_sum, delta_count = deltas.get(celeb_id, (0, 0))
+        deltas[celeb_id] = (
+            delta_sum + (new_score or 0) - (old_score or 0),
+            delta_count + (new_score is not None) - (old_score is not None),
+        )
+    deltas = {celeb_id: delta for celeb_id, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    def by_celeb(index):
+        whens = [When(pk=celeb_id, then=Value(delta[index])) for celeb_id, delta in deltas.items()]
+        return Case(*whens, default=Value(0), output_field=IntegerField())
+
+    Celeb.objects.filter(pk__in=list(deltas)).update(
+        score_sum=F('score_sum') + by_celeb(0),
+        score_count=F('score_count') + by_celeb(1),
+    )
+    transaction.on_commit(lambda: apply_in_memory(deltas))
+
+
+def apply_in_memory(deltas):
+    version = versions.bump(versions.LEADERBOARD)
+    leaderboard = _leaderboard
+    if leaderboard is None:
+        return
+    with leaderboard._lock:
+        # 그 사이 다른 변경이 없었을 때만 메모리에서 바로 고치고, 아니면 다음 조회 때 DB 에서 새로 읽음
+        if leaderboard.version == version - 1:
+            for celeb_id, (delta_sum, delta_count) in deltas.items():
+                leaderboard.update(celeb_id, delta_sum, delta_count)
+            leaderboard.version = version
+
+
+def invalidate(celebs):
+    # 누적값을 CelebScore 에서 다시 세고 메모리 랭킹은 다시 읽게 함
+    refresh(celebs)
+    transaction.on_commit(lambda: versions.bump(versions.LEADERBOARD))
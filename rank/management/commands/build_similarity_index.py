@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rank.models import CelebScore
+from rank import similarity
+
+
+class Command(BaseCommand):
+    help = '셀럽 점수로 비슷한 유저 / 추천 셀럽 인덱스를 만들어 SIMILARITY_INDEX_DIR 에 저장한다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=20, help='유저마다 저장할 비슷한 유저 / 추천 셀럽 수')
+        parser.add_argument('--block-size', type=int, default=1024, help='유사도를 한 번에 계산할 유저 수 (메모리 = 블록 x 전체 유저)')
+
+    def handle(self, *args, **options):
+        if options['k'] < 1 or options['block_size'] < 1:
+            raise CommandError('--k 와 --block-size 는 1 이상이어야 합니다.')
+
+        started = time.perf_counter()
+        triples = list(CelebScore.objects.values_list('user_id', 'celeb_id', 'score').iterator())
+        if not triples:
+            raise CommandError('셀럽 점수가 없습니다.')
+
+        arrays = similarity.build(triples, k=options['k'], block_size=options['block_size'])
+        path = similarity.save(arrays)
+        self.stdout.write(self.style.SUCCESS(
+            f'유저 {len(arrays["user_ids"])}명, 점수 {len(triples)}개로 인덱스를 만들었습니다: {path} '
+            f'({time.perf_counter() - started:.2f}s)'
+        ))
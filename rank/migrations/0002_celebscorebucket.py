@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-20 00:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_buckets(apps, schema_editor):
+    # rank/histogram.py rebuild
+    CelebScore = apps.get_model('rank', 'CelebScore')
+    Bucket = apps.get_model('rank', 'CelebScoreBucket')
+    Bucket.objects.all().delete()
+    rows = CelebScore.objects.values('celeb_id', 'score').annotate(n=Count('pk')).order_by()
+    Bucket.objects.bulk_create([Bucket(celeb_id=row['celeb_id'], score=row['score'], count=row['n']) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('celeb', '0006_celeb_score_totals'),
+        ('rank', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CelebScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('celeb', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='celeb.celeb')),
+            ],
+            options={
+                'ordering': ['celeb', 'score'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='celebscorebucket',
+            constraint=models.UniqueConstraint(fields=('celeb', 'score'), name='unique_celeb_score_bucket'),
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+    ]
@@ -16,3 +16,26 @@ class CelebScore(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.celeb.name} - {self.score}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 점수를 바꿀 때 이전 점수만큼 빼 줄 수 있도록 불러온 값을 기억 (rank/signals.py)
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+
+class CelebScoreBucket(models.Model):
+    # 셀럽별 점수 분포: 점수 하나당 행 하나 (CelebScore 가 바뀔 때 rank/histogram.py 에서 차이만큼 더함)
+    celeb = models.ForeignKey(Celeb, on_delete=models.CASCADE, related_name='score_buckets')
+    score = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['celeb', 'score'], name='unique_celeb_score_bucket')
+        ]
+        ordering = ['celeb', 'score']
+
+    def __str__(self):
+        return f"{self.celeb_id} - {self.score}: {self.count}"
@@ -1,14 +1,51 @@
 from rest_framework import serializers
 from .models import CelebScore
-from celeb.serializers import CelebSerializer,MypageCelebSerializer
+from celeb.serializers import CelebSerializer, CelebSummarySerializer, MypageCelebSerializer
+from celeb.models import Celeb
+from celeb import catalog
+from django.db import models
+from django.db.models import Prefetch
+from project.mixins import SparseFieldsSerializerMixin, EagerLoadingSerializerMixin
 
 
-class CelebScoreSerializer(serializers.ModelSerializer):
-    celeb = CelebSerializer()
+class CelebScoreSerializer(SparseFieldsSerializerMixin, EagerLoadingSerializerMixin, serializers.ModelSerializer):
+    # 기본 표현: 셀럽은 id / 이름 / 사진만 (셀럽 join 한 번)
+    celeb = CelebSummarySerializer()
+
+    select_related_fields = ('celeb',)
+
     class Meta:
         model = CelebScore
         fields = ['id','score','celeb']
 
+
+class CelebScoreDetailListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # 점수마다 중첩된 셀럽의 루틴 카드를 캐시 조회 한 번으로 채워 둠
+        scores = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        celeb_field = self.child.fields.get('celeb')
+        if celeb_field is not None and 'routines' in celeb_field.fields:
+            catalog.load_routine_cards([score.celeb for score in scores])
+        return super().to_representation(scores)
+
+
+class CelebScoreDetailSerializer(CelebScoreSerializer):
+    # ?expand=celeb: 셀럽 전체 표현 (루틴 카드, 유저 진행 현황 포함)
+    celeb = CelebSerializer()
+
+    select_related_fields = ()
+
+    class Meta(CelebScoreSerializer.Meta):
+        list_serializer_class = CelebScoreDetailListSerializer
+
+    def setup_eager_loading(self, queryset):
+        queryset = super().setup_eager_loading(queryset)
+        if 'celeb' in self.fields:
+            # 중첩 CelebSerializer 가 필요로 하는 prefetch/annotation 까지 한 번에
+            celebs = self.fields['celeb'].setup_eager_loading(Celeb.objects.all())
+            queryset = queryset.prefetch_related(Prefetch('celeb', queryset=celebs))
+        return queryset
+
 # class MypageSocreSerizalizer(serializers.ModelSerializer):
 #     celeb = MypageCelebSerializer()
 #     class Meta:
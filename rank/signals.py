@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from celeb.models import Celeb
+from project import cache as response_cache
+from .models import CelebScore
+from . import leaderboard, histogram
+
+
+# 점수가 추가 / 변경 / 삭제되면 셀럽 누적 점수, 전체 랭킹, 점수 분포에 차이만큼 반영
+# 셀럽 목록 / 상세 응답에 내 점수(scores)가 들어가므로 커밋 뒤에 그 유저의 응답 캐시도 버림
+@receiver(post_save, sender=CelebScore)
+def record_score(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(lambda: response_cache.bump_user(instance.user_id))
+    if created:
+        record(instance.celeb_id, None, instance.score)
+    elif hasattr(instance, '_loaded_score'):
+        record(instance.celeb_id, instance._loaded_score, instance.score)
+    else:
+        # 이전 점수를 모르는 경우 (DB 에서 읽지 않은 객체를 저장)
+        celebs = Celeb.objects.filter(pk=instance.celeb_id)
+        leaderboard.invalidate(celebs)
+        histogram.rebuild(celebs)
+    instance._loaded_score = instance.score
+
+
+@receiver(post_delete, sender=CelebScore)
+def remove_score(sender, instance, **kwargs):
+    transaction.on_commit(lambda: response_cache.bump_user(instance.user_id))
+    record(instance.celeb_id, getattr(instance, '_loaded_score', instance.score), None)
+
+
+def record(celeb_id, old_score, new_score):
+    leaderboard.record(celeb_id, old_score, new_score)
+    histogram.record_many([(celeb_id, old_score, new_score)])
+
+
+@receiver(post_save, sender=Celeb)
+def refresh_celeb_scores(sender, instance, created, raw=False, **kwargs):
+    # 관리자 화면 등에서 셀럽을 저장하면 읽어 둔 누적값으로 덮어쓰므로 다시 셈
+    if raw or created:
+        return
+    leaderboard.invalidate(Celeb.objects.filter(pk=instance.pk))
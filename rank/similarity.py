@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+# 취향이 비슷한 유저 / 취향 기반 셀럽 추천 인덱스
+# build_similarity_index 명령이 CelebScore 를 유저 x 셀럽 희소 행렬로 만들고,
+#   1) 유저별 평균을 빼고 (점수를 후하게 / 짜게 주는 성향 제거) 행 길이를 1로 맞춘 뒤
+#   2) 유저 블록 단위로 코사인 유사도를 계산해서 유저마다 상위 k 명만 남기고
+#   3) 그 이웃들의 점수를 유사도로 가중합해서, 아직 평가하지 않은 셀럽 상위 k 개를 추천으로 남긴다.
+# 결과는 .npy 파일로 저장하고 API 워커는 mmap 으로 열어서 (워커끼리 같은 페이지 캐시를 공유) 유저 id 로 바로 찾는다.
+# 새 인덱스는 새 디렉터리에 다 쓴 다음 CURRENT 파일만 바꿔서, 읽는 쪽이 반쯤 쓴 파일을 보지 않게 한다.
+
+ARRAYS = ('user_rows', 'user_ids', 'similar_users', 'similar_user_scores', 'recommended_celebs', 'recommended_celeb_scores')
+CURRENT = 'CURRENT'
+
+
+def index_dir():
+    return settings.SIMILARITY_INDEX_DIR
+
+
+class ScoreMatrix:
+    # CSR(유저 행) / CSC(셀럽 열) 두 방향으로 들고 있는 희소 행렬
+    def __init__(self, user_ids, celeb_ids, rows, cols, values):
+        self.user_ids = user_ids
+        self.celeb_ids = celeb_ids
+        self.shape = (len(user_ids), len(celeb_ids))
+
+        order = np.lexsort((cols, rows))
+        self.row_ptr = np.searchsorted(rows[order], np.arange(self.shape[0] + 1))
+        self.row_cols = cols[order]
+        self.row_values = values[order]
+
+        order = np.lexsort((rows, cols))
+        self.col_ptr = np.searchsorted(cols[order], np.arange(self.shape[1] + 1))
+        self.col_rows = rows[order]
+        self.col_values = values[order]
+
+    @classmethod
+    def from_triples(cls, triples):
+        # [(user_id, celeb_id, score)] -> 유저별 평균을 빼고 행 길이를 1로 맞춘 행렬
+        data = np.asarray(triples, dtype=np.int64).reshape(-1, 3)
+        user_ids, rows = np.unique(data[:, 0], return_inverse=True)
+        celeb_ids, cols = np.unique(data[:, 1], return_inverse=True)
+        values = data[:, 2].astype(np.float32)
+
+        counts = np.bincount(rows, minlength=len(user_ids))
+        means = np.bincount(rows, weights=values, minlength=len(user_ids)) / np.maximum(counts, 1)
+        values = values - means[rows].astype(np.float32)
+        norms = np.sqrt(np.bincount(rows, weights=values.astype(np.float64) ** 2, minlength=len(user_ids)))
+        # 모든 셀럽에 같은 점수를 준 유저는 방향이 없으므로 0 벡터로 둔다 (이웃 없음)
+        values = np.where(norms[rows] > 0, values / np.maximum(norms[rows], 1e-12), 0).astype(np.float32)
+        return cls(user_ids, celeb_ids, rows, cols, values)
+
+    def dense_rows(self, rows):
+        out = np.zeros((len(rows), self.shape[1]), dtype=np.float32)
+        for i, row in enumerate(rows):
+            start, end = self.row_ptr[row], self.row_ptr[row + 1]
+            out[i, self.row_cols[start:end]] = self.row_values[start:end]
+        return out
+
+    def similarities(self, block):
+        # (블록 유저 dense 행) x 전체 유저 -> 코사인 유사도 (셀럽 열마다 그 셀럽을 평가한 유저에게만 더함)
+        sims = np.zeros((block.shape[0], self.shape[0]), dtype=np.float32)
+        for col in np.flatnonzero(block.any(axis=0)):
+            start, end = self.col_ptr[col], self.col_ptr[col + 1]
+            if start == end:
+                continue
+            sims[:, self.col_rows[start:end]] += block[:, col:col + 1] * self.col_values[start:end]
+        return sims
+
+
+def top_k(values, k):
+    # 행마다 값이 큰 k 개의 (열 번호, 값), 값 내림차순. 후보가 모자라면 -1 / 0 으로 채운다
+    k = min(k, values.shape[1])
+    if k == 0:
+        return np.empty((values.shape[0], 0), dtype=np.int32), np.empty((values.shape[0], 0), dtype=np.float32)
+    index = np.argpartition(-values, k - 1, axis=1)[:, :k]
+    picked = np.take_along_axis(values, index, axis=1)
+    order = np.argsort(-picked, axis=1, kind='stable')
+    index = np.take_along_axis(index, order, axis=1)
+    picked = np.take_along_axis(picked, order, axis=1)
+    valid = np.isfinite(picked) & (picked > 0)
+    return np.where(valid, index, -1).astype(np.int32), np.where(valid, picked, 0).astype(np.float32)
+
+
+def build(triples, k=20, block_size=1024):
+    # CelebScore (user_id, celeb_id, score) 목록 -> 저장할 배열 dict
+    matrix = ScoreMatrix.from_triples(triples)
+    n_users = matrix.shape[0]
+    similar_users = np.full((n_users, k), -1, dtype=np.int32)
+    similar_user_scores = np.zeros((n_users, k), dtype=np.float32)
+    recommended_celebs = np.full((n_users, k), -1, dtype=np.int32)
+    recommended_celeb_scores = np.zeros((n_users, k), dtype=np.float32)
+
+    for start in range(0, n_users, block_size):
+        rows = np.arange(start, min(start + block_size, n_users))
+        block = matrix.dense_rows(rows)
+
+        sims = matrix.similarities(block)
+        sims[np.arange(len(rows)), rows] = -np.inf  # 자기 자신 제외
+        neighbors, neighbor_scores = top_k(sims, k)
+        width = neighbors.shape[1]
+        similar_users[rows, :width] = np.where(neighbors >= 0, matrix.user_ids[neighbors], -1)
+        similar_user_scores[rows, :width] = neighbor_scores
+
+        # 이웃 점수의 유사도 가중합, 이미 평가한 셀럽은 제외
+        predicted = np.zeros_like(block)
+        for j in range(width):
+            has_neighbor = neighbors[:, j] >= 0
+            if has_neighbor.any():
+                predicted[has_neighbor] += neighbor_scores[has_neighbor, j:j + 1] * matrix.dense_rows(neighbors[has_neighbor, j])
+        rated = np.zeros_like(block, dtype=bool)
+        for i, row in enumerate(rows):
+            rated[i, matrix.row_cols[matrix.row_ptr[row]:matrix.row_ptr[row + 1]]] = True
+        predicted[rated] = -np.inf
+        celebs, celeb_scores = top_k(predicted, k)
+        width = celebs.shape[1]
+        recommended_celebs[rows, :width] = np.where(celebs >= 0, matrix.celeb_ids[celebs], -1)
+        recommended_celeb_scores[rows, :width] = celeb_scores
+
+    # user_id -> 행 번호 (없으면 -1), 유저 id 로 바로 찾기 위한 배열
+    user_rows = np.full(int(matrix.user_ids.max()) + 1 if n_users else 0, -1, dtype=np.int32)
+    user_rows[matrix.user_ids] = np.arange(n_users, dtype=np.int32)
+    return {
+        'user_rows': user_rows,
+        'user_ids': matrix.user_ids.astype(np.int64),
+        'similar_users': similar_users,
+        'similar_user_scores': similar_user_scores,
+        'recommended_celebs': recommended_celebs,
+        'recommended_celeb_scores': recommended_celeb_scores,
+    }
+
+
+def save(arrays, directory=None):
+    # 새 버전 디렉터리에 쓰고 CURRENT 를 원자적으로 교체, 최근 SIMILARITY_INDEX_KEEP 개 버전만 남긴다
+    directory = str(directory or index_dir())
+    os.makedirs(directory, exist_ok=True)
+    version = str(time.time_ns())
+    target = os.path.join(directory, version)
+    os.makedirs(target)
+    for name in ARRAYS:
+        np.save(os.path.join(target, f'{name}.npy'), arrays[name])
+    pointer = os.path.join(directory, f'{CURRENT}.tmp')
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT))
+
+    # 바로 전 버전은 남겨 둔다: 교체 직전에 CURRENT 를 읽은 워커가 아직 그 버전을 열고 있을 수 있다
+    versions = sorted(
+        (name for name in os.listdir(directory) if name.isdigit() and os.path.isdir(os.path.join(directory, name))),
+        key=int,
+    )
+    keep = max(getattr(settings, 'SIMILARITY_INDEX_KEEP', 2), 1)
+    for name in versions[:-keep]:
+        path = os.path.join(directory, name)
+        # 열어 둔 워커의 mmap 은 파일을 지워도 그대로 유효하다 (POSIX)
+        for file_name in os.listdir(path):
+            os.remove(os.path.join(path, file_name))
+        os.rmdir(path)
+    return target
+
+
+class SimilarityIndex:
+    def __init__(self, directory, version):
+        self.directory = directory
+        self.version = version
+        path = os.path.join(directory, version)
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+
+    def row(self, user_id):
+        if user_id < 0 or user_id >= len(self.user_rows):
+            return None
+        row = int(self.user_rows[user_id])
+        return row if row >= 0 else None
+
+    def _pairs(self, ids, scores, user_id, limit):
+        row = self.row(user_id)
+        if row is None:
+            return []
+        return [(int(i), float(s)) for i, s in zip(ids[row, :limit], scores[row, :limit]) if i >= 0]
+
+    def neighbors(self, user_id, limit=10):
+        # [(user_id, 유사도)]
+        return self._pairs(self.similar_users, self.similar_user_scores, user_id, limit)
+
+    def recommendations(self, user_id, limit=10):
+        # [(celeb_id, 예상 선호도)]
+        return self._pairs(self.recommended_celebs, self.recommended_celeb_scores, user_id, limit)
+
+
+_index = None
+_index_lock = threading.Lock()
+_pointer = None  # 마지막으로 연 CURRENT 파일의 (디렉터리, inode, mtime)
+_checked_at = 0.0
+OPEN_RETRIES = 3
+
+
+def current_version(directory):
+    try:
+        with open(os.path.join(directory, CURRENT)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def pointer_key(directory):
+    # CURRENT 는 os.replace 로 바뀌므로 inode / mtime 만 보면 다시 읽을지 알 수 있다
+    try:
+        stat = os.stat(os.path.join(directory, CURRENT))
+    except FileNotFoundError:
+        return None
+    return directory, stat.st_ino, stat.st_mtime_ns
+
+
+def open_current(directory):
+    # CURRENT 를 읽고 여는 사이에 저장이 두 번 더 일어나면 그 버전이 지워졌을 수 있으므로 CURRENT 부터 다시
+    for _ in range(OPEN_RETRIES):
+        version = current_version(directory)
+        if version is None:
+            return None
+        try:
+            return SimilarityIndex(directory, version)
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def get_index():
+    # CURRENT 가 바뀌었으면 새 버전을 다시 연다 (확인은 SIMILARITY_INDEX_CHECK_INTERVAL 초에 한 번). 아직 만든 적이 없으면 None
+    global _index, _pointer, _checked_at
+    directory = str(index_dir())
+    now = time.monotonic()
+    current = _index if _index is not None and _index.directory == directory else None
+    if current is not None and now - _checked_at < getattr(settings, 'SIMILARITY_INDEX_CHECK_INTERVAL', 1):
+        return current
+    key = pointer_key(directory)
+    if key is None:
+        return None
+    if current is None or key != _pointer:
+        with _index_lock:
+            if _index is None or key != _pointer:
+                index = open_current(directory)
+                if index is not None:
+                    _index, _pointer = index, key
+                # 열지 못했으면 (계속 지워지는 중) 이전 인덱스를 그대로 쓰고 다음 요청에 다시 시도
+    _checked_at = now
+    return _index if _index is not None and _index.directory == directory else None
@@ -1,3 +1,386 @@
+import datetime
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from celeb.models import Celeb
+from routine.models import Routine
+from project import versions
+from .models import CelebScore, CelebScoreBucket
+from . import leaderboard, histogram, similarity
+
+
+class RankTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user@example.com', username='user', nickname='유저')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.celebs = [Celeb.objects.create(name=f'셀럽{i}', profession='가수') for i in range(3)]
+
+
+class CelebScoreViewSetTests(RankTestCase):
+    def test_list_is_paginated_and_supports_fields(self):
+        for celeb in self.celebs:
+            CelebScore.objects.create(user=self.user, celeb=celeb, score=3)
+        response = self.client.get('/api/celeb-score/?fields=id,score&page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([set(item) for item in response.data['results']], [{'id', 'score'}] * 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_create_and_update_are_not_exposed(self):
+        score = CelebScore.objects.create(user=self.user, celeb=self.celebs[0], score=3)
+        self.assertEqual(self.client.post('/api/celeb-score/', {'score': 5, 'celeb': self.celebs[1].pk}).status_code, 405)
+        self.assertEqual(self.client.put(f'/api/celeb-score/{score.pk}/', {'score': 5}).status_code, 405)
+        self.assertEqual(self.client.patch(f'/api/celeb-score/{score.pk}/', {'score': 5}).status_code, 405)
+
+    def test_delete_own_score(self):
+        score = CelebScore.objects.create(user=self.user, celeb=self.celebs[0], score=3)
+        self.assertEqual(self.client.delete(f'/api/celeb-score/{score.pk}/').status_code, 204)
+        self.assertFalse(CelebScore.objects.filter(pk=score.pk).exists())
+
+    def test_other_users_scores_are_hidden(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        score = CelebScore.objects.create(user=other, celeb=self.celebs[0], score=3)
+        self.assertEqual(self.client.get(f'/api/celeb-score/{score.pk}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/celeb-score/').data['results'], [])
+
+
+class CelebScoreRepresentationTests(RankTestCase):
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        for celeb in self.celebs:
+            for i in range(2):
+                Routine.objects.create(title=f'{celeb.name} 루틴{i}', sub_title='sub', content='content', celebrity=celeb, create_at=today)
+            CelebScore.objects.create(user=self.user, celeb=celeb, score=4)
+
+    def test_default_is_compact(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/celeb-score/celeb_scores/')
+        self.assertEqual(set(response.data[0]), {'id', 'score', 'celeb'})
+        self.assertEqual(set(response.data[0]['celeb']), {'id', 'name', 'photo'})
+
+    def test_expand_celeb(self):
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get('/api/celeb-score/celeb_scores/?expand=celeb')
+        celeb = response.data[0]['celeb']
+        self.assertEqual(len(celeb['routines']), 2)
+        self.assertEqual(celeb['scores'][0]['score'], 4)
+        self.assertIn('routines_count', celeb)
+
+        for i in range(3, 8):
+            CelebScore.objects.create(user=self.user, celeb=Celeb.objects.create(name=f'셀럽{i}', profession='가수'), score=1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/celeb-score/celeb_scores/?expand=celeb')
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(len(few), len(many))
+
+
+class LeaderboardTests(RankTestCase):
+    def setUp(self):
+        super().setUp()
+        leaderboard.reset()
+        self.raters = [User.objects.create(email=f'rater{i}@example.com', username=f'rater{i}') for i in range(6)]
+
+    def rate(self, user, celeb, score):
+        with self.captureOnCommitCallbacks(execute=True):
+            CelebScore.objects.update_or_create(user=user, celeb=celeb, defaults={'score': score})
+
+    def ranking(self):
+        response = self.client.get('/api/celeb-score/leaderboard/')
+        self.assertEqual(response.status_code, 200)
+        return [entry['celeb']['name'] for entry in response.data]
+
+    def test_few_ratings_are_pulled_to_the_mean(self):
+        # 셀럽0: 한 명이 5점, 셀럽1: 여섯 명이 평균 4.5점
+        self.rate(self.raters[0], self.celebs[0], 5)
+        for i, user in enumerate(self.raters):
+            self.rate(user, self.celebs[1], 4 + i % 2)
+        self.rate(self.user, self.celebs[2], 1)
+        self.assertEqual(self.ranking(), ['셀럽1', '셀럽0', '셀럽2'])
+        entry = self.client.get(f'/api/celeb-score/{self.celebs[0].pk}/rank/').data
+        self.assertEqual((entry['rank'], entry['average'], entry['raters']), (2, 5.0, 1))
+
+    def test_incremental_updates_match_a_reload(self):
+        for i, user in enumerate(self.raters):
+            self.rate(user, self.celebs[i % 3], i + 1)
+        self.ranking()  # 메모리 랭킹을 만든 뒤 차이만 반영
+        self.rate(self.raters[0], self.celebs[0], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            CelebScore.objects.get(user=self.raters[5]).delete()
+        self.rate(self.user, self.celebs[2], 2)
+        incremental = self.client.get('/api/celeb-score/leaderboard/').data
+
+        leaderboard.reset()
+        self.assertEqual(self.client.get('/api/celeb-score/leaderboard/').data, incremental)
+        for celeb in self.celebs:
+            celeb.refresh_from_db()
+            scores = list(CelebScore.objects.filter(celeb=celeb).values_list('score', flat=True))
+            self.assertEqual((celeb.score_sum, celeb.score_count), (sum(scores), len(scores)))
+
+    def test_reloads_when_another_worker_changed_scores(self):
+        self.rate(self.user, self.celebs[0], 3)
+        self.assertEqual(self.ranking(), ['셀럽0'])
+        # 다른 워커에서 바꾼 것처럼: 컬럼만 바꾸고 공유 버전을 올림
+        Celeb.objects.filter(pk=self.celebs[1].pk).update(score_sum=5, score_count=1)
+        versions.bump(versions.LEADERBOARD)
+        self.assertEqual(self.ranking(), ['셀럽1', '셀럽0'])
+
+    def test_unrated_celeb_has_no_rank(self):
+        self.assertEqual(self.client.get(f'/api/celeb-score/{self.celebs[0].pk}/rank/').status_code, 404)
+        self.assertEqual(self.client.get('/api/celeb-score/leaderboard/?limit=x').status_code, 400)
+
+
+class BulkSetScoreTests(RankTestCase):
+    url = '/api/celeb-score/bulk_set_score/'
+
+    def test_creates_and_updates_in_one_request(self):
+        CelebScore.objects.create(user=self.user, celeb=self.celebs[0], score=1)
+        payload = {str(self.celebs[0].pk): 5, str(self.celebs[1].pk): '3'}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.data, {'saved': 2, 'created': 1, 'updated': 1})
+        self.assertEqual(
+            dict(CelebScore.objects.filter(user=self.user).values_list('celeb_id', 'score')),
+            {self.celebs[0].pk: 5, self.celebs[1].pk: 3},
+        )
+        self.celebs[0].refresh_from_db()
+        self.assertEqual((self.celebs[0].score_sum, self.celebs[0].score_count), (5, 1))
+
+    def test_rejects_invalid_payloads_without_saving(self):
+        cases = [
+            [],
+            {},
+            {'x': 1},
+            {str(self.celebs[0].pk): 'five'},
+            {str(self.celebs[0].pk): 0},
+            {str(self.celebs[0].pk): 5, str(self.celebs[1].pk): 6},
+            {str(self.celebs[0].pk): 5, '999999': 4},
+            {str(i): 1 for i in range(201)},
+        ]
+        for payload in cases:
+            with self.subTest(payload=str(payload)[:40]):
+                self.assertEqual(self.client.post(self.url, payload, format='json').status_code, 400)
+        self.assertFalse(CelebScore.objects.exists())
+        response = self.client.post(self.url, {str(self.celebs[0].pk): 5, '999999': 4}, format='json')
+        self.assertEqual(response.data['celeb_ids'], [999999])
+
+
+class HistogramTests(RankTestCase):
+    def setUp(self):
+        super().setUp()
+        self.celeb = self.celebs[0]
+        self.fans = [User.objects.create(email=f'fan{i}@example.com', username=f'fan{i}') for i in range(4)]
+
+    def rate(self, scores):
+        for fan, score in zip(self.fans, scores):
+            CelebScore.objects.create(user=fan, celeb=self.celeb, score=score)
+
+    def test_summary(self):
+        self.assertEqual(histogram.summary([]), {'count': 0, 'average': None, 'median': None, 'distribution': []})
+        buckets = [(1, 1), (3, 2), (5, 1)]
+        summary = histogram.summary(buckets, score=3)
+        self.assertEqual((summary['count'], summary['average'], summary['median'], summary['percentile']), (4, 3.0, 3.0, 25.0))
+        self.assertEqual(histogram.median([(2, 1), (4, 1)], 2), 3.0)
+        self.assertEqual(histogram.percentile(buckets, 4, 1), 0.0)
+        self.assertEqual(histogram.percentile(buckets, 4, 6), 100.0)
+
+    def test_buckets_follow_score_changes(self):
+        self.rate([5, 3, 3])
+        self.assertEqual(histogram.distribution(self.celeb.pk), [(3, 2), (5, 1)])
+        score = CelebScore.objects.get(user=self.fans[0], celeb=self.celeb)
+        score.score = 3
+        score.save()
+        self.assertEqual(histogram.distribution(self.celeb.pk), [(3, 3)])
+        score.delete()
+        self.assertEqual(histogram.distribution(self.celeb.pk), [(3, 2)])
+
+    def test_set_score_returns_percentile(self):
+        self.rate([1, 2, 5])
+        response = self.client.post(f'/api/celeb-score/{self.celeb.pk}/set_score/', {'score': '4'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['score'], 4)
+        self.assertEqual(response.data['percentile'], 50.0)
+        for score in ('x', 0, 6, 100000):
+            self.assertEqual(self.client.post(f'/api/celeb-score/{self.celeb.pk}/set_score/', {'score': score}).status_code, 400)
+        self.assertEqual([score for score, _ in histogram.distribution(self.celeb.pk)], [1, 2, 4, 5])
+
+    def test_distribution_action(self):
+        self.rate([2, 4])
+        url = f'/api/celeb-score/{self.celeb.pk}/distribution/'
+        response = self.client.get(url)
+        self.assertEqual(response.data['my_score'], None)
+        self.assertNotIn('percentile', response.data)
+        self.assertEqual(response.data['distribution'], [{'score': 2, 'count': 1}, {'score': 4, 'count': 1}])
+        CelebScore.objects.create(user=self.user, celeb=self.celeb, score=4)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual((response.data['my_score'], response.data['median'], response.data['percentile']), (4, 4.0, 33.3))
+
+    def test_bulk_set_score_updates_buckets(self):
+        self.rate([3])
+        CelebScore.objects.create(user=self.user, celeb=self.celeb, score=3)
+        payload = {str(self.celeb.pk): 5, str(self.celebs[1].pk): 2}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/celeb-score/bulk_set_score/', payload, format='json')
+        self.assertEqual(histogram.distribution(self.celeb.pk), [(3, 1), (5, 1)])
+        self.assertEqual(histogram.distribution(self.celebs[1].pk), [(2, 1)])
+
+    def test_rebuild_matches_incremental_counts(self):
+        self.rate([5, 1, 5, 2])
+        before = histogram.distribution(self.celeb.pk)
+        CelebScoreBucket.objects.update(count=0)
+        histogram.rebuild(Celeb.objects.all())
+        self.assertEqual(histogram.distribution(self.celeb.pk), before)
+
+
+class SimilarityIndexTests(RankTestCase):
+    # 유저 1, 2 는 취향이 같고 3 은 반대
+    triples = [
+        (1, 10, 5), (1, 11, 1), (1, 12, 4),
+        (2, 10, 4), (2, 11, 1), (2, 12, 5), (2, 13, 5),
+        (3, 10, 1), (3, 11, 5), (3, 14, 5),
+        (4, 10, 3), (4, 11, 3),  # 모두 같은 점수: 방향이 없어서 이웃 없음
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_override = self.settings(SIMILARITY_INDEX_DIR=self.directory, SIMILARITY_INDEX_CHECK_INTERVAL=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def brute_force(self, user_id):
+        users = sorted({u for u, _, _ in self.triples})
+        celebs = sorted({c for _, c, _ in self.triples})
+        dense = np.zeros((len(users), len(celebs)))
+        mask = np.zeros_like(dense, dtype=bool)
+        for u, c, s in self.triples:
+            dense[users.index(u), celebs.index(c)] = s
+            mask[users.index(u), celebs.index(c)] = True
+        means = dense.sum(1) / mask.sum(1)
+        centred = np.where(mask, dense - means[:, None], 0)
+        norms = np.linalg.norm(centred, axis=1)
+        unit = centred / np.where(norms > 0, norms, 1)[:, None]
+        sims = unit @ unit[users.index(user_id)]
+        return {users[i]: sims[i] for i in range(len(users)) if users[i] != user_id and sims[i] > 0}
+
+    def test_neighbors_match_brute_force_cosine(self):
+        for block_size in (1, 2, 1024):
+            with self.subTest(block_size=block_size):
+                similarity.save(similarity.build(self.triples, k=3, block_size=block_size))
+                index = similarity.get_index()
+                for user_id in (1, 2, 3):
+                    expected = self.brute_force(user_id)
+                    pairs = index.neighbors(user_id)
+                    self.assertEqual([u for u, _ in pairs], sorted(expected, key=expected.get, reverse=True))
+                    for u, value in pairs:
+                        self.assertAlmostEqual(value, expected[u], places=5)
+                self.assertEqual(index.neighbors(4), [])
+                self.assertEqual(index.neighbors(999), [])
+
+    def test_recommends_unrated_celebs_of_neighbors(self):
+        similarity.save(similarity.build(self.triples, k=3))
+        index = similarity.get_index()
+        self.assertEqual([celeb for celeb, _ in index.recommendations(1)], [13])
+        self.assertNotIn(10, [celeb for celeb, _ in index.recommendations(3)])
+
+    def test_save_swaps_current_version_and_keeps_the_previous_one(self):
+        self.assertIsNone(similarity.get_index())
+        first = similarity.save(similarity.build(self.triples, k=2))
+        old = similarity.get_index()
+        second = similarity.save(similarity.build(self.triples[:3] + self.triples[3:7], k=2))
+        # 교체 직전에 CURRENT 를 읽은 워커가 열 수 있도록 바로 전 버전은 남긴다
+        self.assertTrue(os.path.exists(first))
+        self.assertIsNot(similarity.get_index(), old)
+        self.assertEqual(similarity.get_index().neighbors(3), [])
+        third = similarity.save(similarity.build(self.triples, k=2))
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second) and os.path.exists(third))
+
+    def test_reads_current_again_when_its_version_was_removed(self):
+        similarity.save(similarity.build(self.triples, k=2))
+        version = similarity.current_version(self.directory)
+        with mock.patch.object(similarity, 'current_version', side_effect=['1', version]) as current_version:
+            index = similarity.get_index()
+        self.assertEqual(index.version, version)
+        self.assertEqual(current_version.call_count, 2)
+
+    def test_current_is_read_only_when_it_changes(self):
+        similarity.save(similarity.build(self.triples, k=2))
+        index = similarity.get_index()
+        with mock.patch.object(similarity, 'current_version', wraps=similarity.current_version) as current_version:
+            for _ in range(3):
+                self.assertIs(similarity.get_index(), index)
+            self.assertEqual(current_version.call_count, 0)
+
+            # 확인 간격 안에서는 stat 도 하지 않는다
+            with self.settings(SIMILARITY_INDEX_CHECK_INTERVAL=60):
+                similarity.save(similarity.build(self.triples, k=2))
+                self.assertIs(similarity.get_index(), index)
+            self.assertIsNot(similarity.get_index(), index)
+            self.assertEqual(current_version.call_count, 1)
+
+    def test_endpoints(self):
+        self.assertEqual(self.client.get('/api/celeb-score/similar_users/').status_code, 503)
+        other = User.objects.create(email='other@example.com', username='other', nickname='비슷한 유저')
+        for celeb, mine, theirs in zip(self.celebs, (5, 1, 4), (4, 1, 5)):
+            CelebScore.objects.create(user=self.user, celeb=celeb, score=mine)
+            CelebScore.objects.create(user=other, celeb=celeb, score=theirs)
+        extra = Celeb.objects.create(name='추천 셀럽', profession='배우')
+        CelebScore.objects.create(user=other, celeb=extra, score=5)
+        call_command('build_similarity_index', '--k', '5', stdout=StringIO())
+
+        response = self.client.get('/api/celeb-score/similar_users/')
+        self.assertEqual([(item['id'], item['nickname']) for item in response.data], [(other.pk, '비슷한 유저')])
+        response = self.client.get('/api/celeb-score/recommended_celebs/')
+        self.assertEqual([item['celeb']['name'] for item in response.data], ['추천 셀럽'])
+
+
+class ScoreResponseCacheTests(RankTestCase):
+    def my_scores(self):
+        response = self.client.get('/api/celeb/?fields=id,scores')
+        return response['X-Cache'], {item['id']: [s['score'] for s in item['scores']] for item in response.data['results']}
+
+    def test_score_writes_invalidate_cached_celeb_list(self):
+        celeb = self.celebs[0]
+        self.assertEqual(self.my_scores()[1][celeb.pk], [])
+        self.assertEqual(self.my_scores()[0], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/celeb-score/{celeb.pk}/set_score/', {'score': 4})
+        source, scores = self.my_scores()
+        self.assertEqual((source, scores[celeb.pk]), ('MISS', [4]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/celeb-score/bulk_set_score/', {str(celeb.pk): 2}, format='json')
+        self.assertEqual(self.my_scores()[1][celeb.pk], [2])
+
+        score = CelebScore.objects.get(user=self.user, celeb=celeb)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/celeb-score/{score.pk}/')
+        self.assertEqual(self.my_scores()[1][celeb.pk], [])
 
-# Create your tests here.
+    def test_other_users_cache_is_kept(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        client = APIClient()
+        client.force_authenticate(other)
+        client.get('/api/celeb/?fields=id,scores')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/celeb-score/{self.celebs[0].pk}/set_score/', {'score': 4})
+        self.assertEqual(client.get('/api/celeb/?fields=id,scores')['X-Cache'], 'HIT')
@@ -1,4 +1,10 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import CelebScoreViewSet
 
-# 셀럽의 점수에 대한 url은 따로 필요치 않음
-urlpatterns = []
+router = DefaultRouter()
+router.register(r'celeb-score', CelebScoreViewSet, basename='celeb-score')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
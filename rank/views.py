@@ -1,39 +1,194 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import CelebScore
-from .serializers import CelebScoreSerializer
+from .serializers import CelebScoreSerializer, CelebScoreDetailSerializer
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from celeb.models import Celeb
 from rest_framework.permissions import IsAuthenticated
+from project.mixins import SparseFieldsViewSetMixin, EagerLoadingViewSetMixin
+from project.pagination import IdCursorPagination
+from celeb.serializers import CelebSummarySerializer
+from . import leaderboard, similarity, histogram
+from accounts.models import User
+from project import cache as response_cache
 
-class CelebScoreViewSet(viewsets.ModelViewSet):
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+BULK_SCORE_MAX = 200  # 한 번에 저장할 수 있는 점수 수
+SCORE_MIN, SCORE_MAX = 1, 5  # 점수 범위 (점수 분포는 점수 하나당 행 하나)
+SIMILAR_DEFAULT_LIMIT = 10
+
+
+def lock_scores(user):
+    # 유저 한 명의 점수 저장을 차례로 (아직 없는 점수 행은 잠글 수 없으므로 유저 행을 잠근다)
+    list(User.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+
+
+class CelebScoreViewSet(SparseFieldsViewSetMixin, EagerLoadingViewSetMixin, mixins.ListModelMixin,
+                        mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    # 점수 저장은 set_score / bulk_set_score 로만 (중첩된 celeb 은 쓰기용이 아니므로 create / update 는 열지 않음)
     queryset = CelebScore.objects.all()
     serializer_class = CelebScoreSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         user = self.request.user
-        return CelebScore.objects.filter(user=user)
+        return super().get_queryset().filter(user=user)
+
+    def get_serializer_class(self):
+        # 기본은 가벼운 표현, ?expand=celeb 이면 셀럽 전체 표현
+        if self.request.query_params.get('expand') == 'celeb':
+            return CelebScoreDetailSerializer
+        return CelebScoreSerializer
 
     @action(detail=False, methods=['get'])
     def celeb_scores(self, request):
-        user = request.user
-        scores = CelebScore.objects.filter(user=user)
-        serializer = CelebScoreSerializer(scores, many=True)
+        scores = self.get_queryset()
+        serializer = self.get_serializer(scores, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def set_score(self, request, pk=None):
         user = request.user
         celeb = get_object_or_404(Celeb, pk=pk)
-        score = request.data.get('score')
+        try:
+            # 폼으로 들어온 '5' 도 정수로 (랭킹 / 점수 분포는 정수 점수로 계산)
+            score = int(request.data.get('score'))
+        except (TypeError, ValueError):
+            return Response({"detail": "score must be an integer."}, status=400)
+        if not SCORE_MIN <= score <= SCORE_MAX:
+            return Response({"detail": f"score must be between {SCORE_MIN} and {SCORE_MAX}."}, status=400)
+
+        with transaction.atomic():
+            lock_scores(user)
+            celeb_score, created = CelebScore.objects.update_or_create(
+                user=user,
+                celeb=celeb,
+                defaults={'score': score}
+            )
+
+        serializer = self.get_serializer(celeb_score)
+        data = dict(serializer.data)
+        # "팬 중 N% 보다 높게 평가했어요"
+        buckets = histogram.distribution(celeb.pk)
+        data['percentile'] = histogram.percentile(buckets, sum(count for _, count in buckets), celeb_score.score)
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def distribution(self, request, pk=None):
+        # 셀럽 하나의 점수 분포 / 평균 / 중앙값, 내가 평가했다면 내 점수의 백분위
+        celeb = get_object_or_404(Celeb, pk=pk)
+        my_score = CelebScore.objects.filter(user=request.user, celeb=celeb).values_list('score', flat=True).first()
+        data = histogram.summary(histogram.distribution(celeb.pk), my_score)
+        data['my_score'] = my_score
+        return Response(data)
+
+    @action(detail=False, methods=['post'])
+    def bulk_set_score(self, request):
+        # 온보딩 평가 화면: {celeb_id: score, ...} 를 한 번에 저장하고 개수만 돌려줌
+        user = request.user
+        data = request.data
+        if not isinstance(data, dict) or not data:
+            return Response({"detail": "Expected a non-empty {celeb_id: score} object."}, status=400)
+        if len(data) > BULK_SCORE_MAX:
+            return Response({"detail": f"At most {BULK_SCORE_MAX} scores per request."}, status=400)
+        try:
+            scores = {int(celeb_id): int(score) for celeb_id, score in data.items()}
+        except (TypeError, ValueError):
+            return Response({"detail": "Celeb ids and scores must be integers."}, status=400)
+        if not all(SCORE_MIN <= score <= SCORE_MAX for score in scores.values()):
+            return Response({"detail": f"Scores must be between {SCORE_MIN} and {SCORE_MAX}."}, status=400)
+
+        # 셀럽 id 는 쿼리 한 번으로 확인 (하나라도 없으면 아무것도 저장하지 않음)
+        known = set(Celeb.objects.filter(pk__in=list(scores)).values_list('id', flat=True))
+        unknown = sorted(set(scores) - known)
+        if unknown:
+            return Response({"detail": "Unknown celeb ids.", "celeb_ids": unknown}, status=400)
+
+        with transaction.atomic():
+            # 이전 점수를 읽은 뒤 저장할 때까지 같은 유저의 다른 점수 저장이 끼어들면 랭킹 / 분포에 두 번 반영되므로 잠근다
+            lock_scores(user)
+            previous = dict(
+                CelebScore.objects.select_for_update().filter(user=user, celeb_id__in=list(scores)).values_list('celeb_id', 'score')
+            )
+            CelebScore.objects.bulk_create(
+                [CelebScore(user=user, celeb_id=celeb_id, score=score) for celeb_id, score in scores.items()],
+                update_conflicts=True,
+                unique_fields=['user', 'celeb'],
+                update_fields=['score'],
+            )
+            # bulk_create 는 signal 을 보내지 않으므로 랭킹 / 점수 분포는 직접 반영
+            changes = [(celeb_id, previous.get(celeb_id), score) for celeb_id, score in scores.items()]
+            leaderboard.record_many(changes)
+            histogram.record_many(changes)
+            transaction.on_commit(lambda: response_cache.bump_user(user.pk))
+
+        return Response({
+            "saved": len(scores),
+            "created": len(scores) - len(previous),
+            "updated": len(previous),
+        })
+
+    @action(detail=False, methods=['get'])
+    def leaderboard(self, request):
+        # 전체 셀럽 랭킹 상위 k 개 (베이지안 보정 점수 순, 메모리에서 바로)
+        try:
+            limit = min(max(int(request.query_params.get('limit', LEADERBOARD_DEFAULT_LIMIT)), 1), LEADERBOARD_MAX_LIMIT)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=400)
+        entries = leaderboard.get_leaderboard().top(limit)
+        celebs = Celeb.objects.in_bulk([entry['celeb_id'] for entry in entries])
+        return Response([self.leaderboard_entry(entry, celebs.get(entry['celeb_id'])) for entry in entries])
+
+    @action(detail=True, methods=['get'])
+    def rank(self, request, pk=None):
+        # 셀럽 하나의 전체 순위
+        celeb = get_object_or_404(Celeb, pk=pk)
+        entry = leaderboard.get_leaderboard().rank_of(celeb.pk)
+        if entry is None:
+            return Response({"detail": "This celeb has no scores yet."}, status=404)
+        return Response(self.leaderboard_entry(entry, celeb))
+
+    @action(detail=False, methods=['get'])
+    def similar_users(self, request):
+        # 점수를 비슷하게 준 유저 (미리 만든 인덱스에서 바로 읽음)
+        pairs = self.similarity_pairs(request, 'neighbors')
+        if isinstance(pairs, Response):
+            return pairs
+        users = User.objects.only('id', 'nickname').in_bulk([user_id for user_id, _ in pairs])
+        return Response([
+            {"id": user_id, "nickname": users[user_id].nickname, "similarity": round(value, 4)}
+            for user_id, value in pairs if user_id in users
+        ])
+
+    @action(detail=False, methods=['get'])
+    def recommended_celebs(self, request):
+        # 비슷한 유저들이 높게 평가했지만 아직 평가하지 않은 셀럽
+        pairs = self.similarity_pairs(request, 'recommendations')
+        if isinstance(pairs, Response):
+            return pairs
+        celebs = Celeb.objects.in_bulk([celeb_id for celeb_id, _ in pairs])
+        return Response([
+            {"celeb": CelebSummarySerializer(celebs[celeb_id]).data, "score": round(value, 4)}
+            for celeb_id, value in pairs if celeb_id in celebs
+        ])
+
+    def similarity_pairs(self, request, kind):
+        try:
+            limit = min(max(int(request.query_params.get('limit', SIMILAR_DEFAULT_LIMIT)), 1), LEADERBOARD_MAX_LIMIT)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=400)
+        index = similarity.get_index()
+        if index is None:
+            return Response({"detail": "Similarity index has not been built yet."}, status=503)
+        return getattr(index, kind)(request.user.pk, limit)
 
-        celeb_score, created = CelebScore.objects.update_or_create(
-            user=user,
-            celeb=celeb,
-            defaults={'score': score}
-        )
+    def leaderboard_entry(self, entry, celeb):
+        entry = dict(entry)
+        entry.pop('celeb_id')
+        entry['celeb'] = CelebSummarySerializer(celeb).data if celeb is not None else None
+        return entry
 
-        serializer = CelebScoreSerializer(celeb_score)
-        return Response(serializer.data)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from django.db import models
+from search.hangul import choseong
 
 
 class RoutineCategory(models.Model):
@@ -17,12 +18,27 @@ class Routine(models.Model):
     theme = models.ManyToManyField('search.Theme',blank=True)  # use ManyToManyField
     popular =models.IntegerField(default=0)
     create_at = models.DateField(null = True)
+    title_choseong = models.CharField(max_length=100, blank=True, editable=False, db_index=True)  # 초성 검색용
     
     
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.title_choseong = choseong(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'title_choseong'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 셀럽을 옮겼을 때 이전 셀럽의 집계도 갱신할 수 있도록 불러온 값을 기억 (celeb/signals.py)
+        instance._loaded_celebrity_id = instance.__dict__.get('celebrity_id')
+        return instance
+
     def get_celebrity(self):
         from celeb.models import Celeb
         return Celeb.objects.filter(routines=self)
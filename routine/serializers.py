@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Routine, RoutineCategory
+from project.mixins import SparseFieldsSerializerMixin, EagerLoadingSerializerMixin
 
 
 class RoutineCategorySerializer(serializers.ModelSerializer):
@@ -8,7 +9,7 @@ class RoutineCategorySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class RoutineSerializer(serializers.ModelSerializer):
+class RoutineSerializer(SparseFieldsSerializerMixin, EagerLoadingSerializerMixin, serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
         many=True,
         read_only=True,
@@ -24,12 +25,14 @@ class RoutineSerializer(serializers.ModelSerializer):
         slug_field='title'
     )
 
+    select_related_fields = ('celebrity',)
+    prefetch_related_fields = ('category', 'theme')
 
     class Meta:
         model = Routine
         fields = ['id', 'title', 'sub_title', 'content', 'image', 'video_url', 'category', 'celebrity', 'theme', 'popular']
 
-class RoutineDiceSerializer(serializers.ModelSerializer):
+class RoutineDiceSerializer(EagerLoadingSerializerMixin, serializers.ModelSerializer):
     celebrity = serializers.SlugRelatedField(
         read_only=True,
         slug_field='name'
@@ -37,6 +40,8 @@ class RoutineDiceSerializer(serializers.ModelSerializer):
 
     image = serializers.SerializerMethodField()
 
+    select_related_fields = ('celebrity',)
+
     class Meta:
         model = Routine
         fields = ['id', 'title', 'sub_title', 'content', 'celebrity', 'image']   #['video_url', 'category', 'theme', 'popular']
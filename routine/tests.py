@@ -1,3 +1,61 @@
+import datetime
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from celeb.models import Celeb
+from .models import Routine, RoutineCategory
+
+
+def make_routines(celeb, count, **kwargs):
+    return [
+        Routine.objects.create(
+            title=f'루틴 {celeb.pk}-{i}', sub_title='sub', content='content', celebrity=celeb,
+            create_at=datetime.date.today(), **kwargs
+        )
+        for i in range(count)
+    ]
+
+
+class RoutineListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user@example.com', username='user', nickname='유저')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.celeb = Celeb.objects.create(name='셀럽', profession='가수')
+        self.category = RoutineCategory.objects.create(name='운동')
+        self.routines = make_routines(self.celeb, 5)
+        for routine in self.routines:
+            routine.category.add(self.category)
+
+    def test_cursor_pagination_walks_every_routine_once(self):
+        response = self.client.get('/api/routine?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        seen = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen.extend(item['id'] for item in response.data['results'])
+        self.assertEqual(seen, [routine.pk for routine in self.routines])
+
+    def test_fields_limits_output_and_selected_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/routine?fields=id,title')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        select = [query['sql'] for query in queries if 'routine_routine' in query['sql']][-1]
+        self.assertIn('"title"', select)
+        self.assertNotIn('"content"', select)
 
-# Create your tests here.
+    def test_relation_fields_cost_a_fixed_number_of_queries(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/routine?fields=id,category,celebrity')
+        make_routines(self.celeb, 10)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/routine?fields=id,category,celebrity')
+        self.assertEqual(response.data['results'][0]['category'], ['운동'])
+        self.assertEqual(len(few), len(many))
@@ -12,11 +12,20 @@ from accounts.models import User
 from accounts.serializers import NicknameSerializer
 import random
 from django.db.models import F, Subquery
+from project.mixins import SparseFieldsViewSetMixin, EagerLoadingViewSetMixin
+from project.pagination import IdCursorPagination
+from project.cache import cached_response
 
-class RoutineViewSet(viewsets.ModelViewSet):
+class RoutineViewSet(SparseFieldsViewSetMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Routine.objects.all()
     serializer_class = RoutineSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
+
+    def get_serializer_class(self):
+        if self.action == 'recommend':
+            return RoutineDiceSerializer
+        return super().get_serializer_class()
 
     @action(methods=['GET'], detail=False)
     def recommend(self, request):
@@ -24,13 +33,14 @@ class RoutineViewSet(viewsets.ModelViewSet):
         if not ran_routine:
             return Response({"detail": "No routines available"}, status=404)
         
-        ran_routine_serializer = RoutineDiceSerializer(ran_routine)
+        ran_routine_serializer = self.get_serializer(ran_routine)
         return Response(ran_routine_serializer.data)
     
 
 class MainPageViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
+    @cached_response()  # 유저별, 카탈로그 / 유저 버전이 바뀌면 새로 만듦
     def list(self, request):
         user = request.user
         user_routines = []  # 초기화 # 유저 인증 해결 되면 반환 됨
@@ -38,19 +48,19 @@ class MainPageViewSet(viewsets.ViewSet):
         if user.is_authenticated:
             user_categories = user.preferred_routine_categories.all()
             if user_categories.exists():
-                user_routines = Routine.objects.filter(category__in=user_categories).distinct()
+                user_routines = Routine.objects.filter(category__in=user_categories).select_related('celebrity').distinct()
             else:
-                user_routines = Routine.objects.all().order_by("?")[:10]
+                user_routines = Routine.objects.select_related('celebrity').order_by("?")[:10]
                 print("유저가 선택한 맞춤형 루틴이 없습니다!!!!!")
         else:
             print("유저가 선택한 맞춤형 루틴이 없습니다!!!!!")  # 일단 무작위
-            user_routines = Routine.objects.all().order_by("?")[:10]
+            user_routines = Routine.objects.select_related('celebrity').order_by("?")[:10]
             
-        hot_routines = Routine.objects.order_by('-popular')[:10]
-        latest_routines = Routine.objects.order_by('-create_at')[:10]
+        hot_routines = Routine.objects.select_related('celebrity').order_by('-popular')[:10]
+        latest_routines = Routine.objects.select_related('celebrity').order_by('-create_at')[:10]
         themes = Theme.objects.all()
 
-        challenges = UserRoutine.objects.filter(user=user).distinct()
+        challenges = UserRoutine.objects.filter(user=user).select_related('routine__celebrity').distinct()
 
         challenge_data = []
         for challenge in challenges:
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Theme
+from .models import Theme, TrendingTerm
 
 # Register your models here.
 
-admin.site.register(Theme)
\ No newline at end of file
+admin.site.register(Theme)
+admin.site.register(TrendingTerm)
\ No newline at end of file
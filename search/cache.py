@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from project import versions
+
+# 검색 결과 캐시
+# 검색어는 일부 셀럽 이름 / 단어에 몰리므로 같은 요청의 응답을 워커 메모리에 LRU 로 기억해 둔다.
+# 키는 정규화한 검색어 + 카테고리 / limit / cursor, 셀럽 / 루틴 / 테마가 바뀌면 카탈로그 버전이 올라가서 전부 버린다.
+
+
+class ResultCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._version = versions.get(versions.CATALOG)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._cache:
+                self.invalidations += 1
+            self._cache.clear()
+            self._version = version
+
+    def get(self, key):
+        with self._lock:
+            self._check_version(versions.get(versions.CATALOG))
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version):
+        # version: 결과를 계산하기 전에 읽은 버전. 계산하는 사이에 데이터가 바뀌었으면 저장하지 않는다
+        with self._lock:
+            self._check_version(versions.get(versions.CATALOG))
+            if version != self._version:
+                return
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._cache),
+            'max_size': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'version': self._version,
+        }
+
+
+results = ResultCache(getattr(settings, 'SEARCH_CACHE_SIZE', 512))
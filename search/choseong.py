@@ -0,0 +1,53 @@
+from django.db.models import Q
+
+from .hangul import word_keys, prefix_filter
+from .index import KINDS, model_label
+from .models import ChoseongKey
+
+# 초성 검색 (DB)
+# 자동완성과 같이 제목의 아무 단어부터 찾되, 두 쪽 모두 인덱스 범위 탐색으로:
+#   - 제목 처음부터: 모델의 초성 컬럼 (name_choseong / title_choseong, db_index)
+#   - 두 번째 단어부터: ChoseongKey 의 (kind, key) 인덱스
+# 키는 셀럽 / 루틴 / 테마를 저장 / 삭제할 때 search/signals.py 에서 갱신한다.
+
+CHOSEONG_FIELDS = {
+    'celeb.celeb': ('name', 'name_choseong'),
+    'routine.routine': ('title', 'title_choseong'),
+    'search.theme': ('title', 'title_choseong'),
+}
+
+
+def choseong_field(model):
+    return CHOSEONG_FIELDS[model_label(model)][1]
+
+
+def later_keys(instance):
+    label = model_label(instance.__class__)
+    kind = KINDS[label]
+    text = getattr(instance, CHOSEONG_FIELDS[label][0])
+    return [ChoseongKey(kind=kind, object_id=instance.pk, key=key) for key in word_keys(text)[1:]]
+
+
+def update(instance):
+    remove(instance)
+    ChoseongKey.objects.bulk_create(later_keys(instance))
+
+
+def remove(instance):
+    ChoseongKey.objects.filter(kind=KINDS[model_label(instance.__class__)], object_id=instance.pk).delete()
+
+
+def rebuild(*querysets):
+    # 모델 queryset 들의 키를 처음부터 다시 채운다 (rebuild_search_index 명령에서 사용)
+    for queryset in querysets:
+        label = model_label(queryset.model)
+        ChoseongKey.objects.filter(kind=KINDS[label]).delete()
+        keys = [key for instance in queryset.only('pk', CHOSEONG_FIELDS[label][0]).iterator() for key in later_keys(instance)]
+        ChoseongKey.objects.bulk_create(keys, batch_size=1000)
+
+
+def search(queryset, query):
+    # 초성 검색어가 제목의 아무 단어부터 이어지는 행
+    kind = KINDS[model_label(queryset.model)]
+    later = ChoseongKey.objects.filter(kind=kind, **prefix_filter('key', query)).values('object_id')
+    return queryset.filter(Q(**prefix_filter(choseong_field(queryset.model), query)) | Q(pk__in=later))
@@ -0,0 +1,44 @@
+# 한글 초성 검색용 키 ('요가 루틴' -> 'ㅇㄱㄹㅌ')
+# 완성형 한글(가~힣)은 초성으로 바꾸고, 공백은 빼고, 나머지 글자는 소문자로 그대로 둔다.
+# 초성 검색은 검색창 자동완성(search/suggest.py)과 같은 규칙으로 찾는다:
+#   제목의 아무 단어에서 시작해서 뒤 단어로 이어지는 초성 prefix ('아침 요가 루틴' 은 'ㅇㅊ', 'ㅇㄱ', 'ㅇㄱㄹㅌ', 'ㄹ' 모두 일치)
+# 단어마다 word_keys 로 키를 만들어서, 자동완성은 메모리 인덱스에, DB 검색은 ChoseongKey 테이블(search/choseong.py)에 넣고
+# prefix_filter 의 범위 조건(인덱스 탐색)으로 찾는다.
+
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+HANGUL_START = 0xAC00
+HANGUL_END = 0xD7A3
+SYLLABLES_PER_CHOSEONG = 21 * 28
+
+
+def choseong(text):
+    result = []
+    for char in text or '':
+        code = ord(char)
+        if HANGUL_START <= code <= HANGUL_END:
+            result.append(CHOSEONG[(code - HANGUL_START) // SYLLABLES_PER_CHOSEONG])
+        elif not char.isspace():
+            result.append(char.lower())
+    return ''.join(result)
+
+
+def word_keys(text):
+    # 단어마다 그 단어부터 끝까지의 초성 키 ('아침 요가' -> ['ㅇㅊㅇㄱ', 'ㅇㄱ'])
+    words = [choseong(word) for word in (text or '').split()]
+    return [''.join(words[i:]) for i in range(len(words))]
+
+
+def is_choseong_query(text):
+    # 'ㅇㄱ', 'ㅇㅊ ㅇㄱ' 처럼 초성만 입력한 검색어인지
+    letters = ''.join((text or '').split())
+    return bool(letters) and all(char in CHOSEONG for char in letters)
+
+
+def prefix_range(prefix):
+    # key >= prefix AND key < upper 로 바꿔서 인덱스 범위 탐색이 되도록
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def prefix_filter(field, query):
+    lower, upper = prefix_range(choseong(query))
+    return {f'{field}__gte': lower, f'{field}__lt': upper}
@@ -0,0 +1,127 @@
+import re
+
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 기반 검색 인덱스
+# 한글은 띄어쓰기 단위 토크나이저로는 부분 검색이 안 되므로, 단어를 글자(uni) / 2글자(bi) 단위로 잘라서 넣는다.
+#   '아침요가' -> uni: '아 침 요 가', bi: '아침 침요 요가'
+# 검색어도 같은 방식으로 잘라서 1글자 단어는 uni 토큰, 2글자 이상 단어는 연속된 bi 토큰(구문 검색)으로 찾는다.
+# 인덱스는 후보만 좁히고, 최종 결과는 기존 icontains 조건으로 한 번 더 거른다.
+
+FTS_TABLE = 'search_fts'
+
+# rowid = pk * KIND_COUNT + kind  (모델별 pk 로 바로 찾아서 갱신/삭제할 수 있도록)
+KIND_COUNT = 4
+KINDS = {
+    'celeb.celeb': 1,
+    'routine.routine': 2,
+    'search.theme': 3,
+}
+INDEXED_FIELDS = {
+    'celeb.celeb': ('name', 'profession'),
+    'routine.routine': ('title', 'content'),
+    'search.theme': ('title', 'content'),
+}
+
+WORD_RE = re.compile(r'\w+')
+
+_available = None
+
+
+def words(text):
+    return WORD_RE.findall((text or '').lower())
+
+
+def unigrams(text):
+    return ' '.join(char for word in words(text) for char in word)
+
+
+def bigrams(text):
+    grams = []
+    for word in words(text):
+        grams.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return ' '.join(grams)
+
+
+def match_expression(query):
+    # 검색어 -> FTS5 MATCH 식. 검색할 단어가 없으면 None
+    terms = []
+    for word in words(query):
+        if len(word) == 1:
+            terms.append(f'uni : "{word}"')
+        else:
+            terms.append('bi : "{}"'.format(bigrams(word)))
+    return ' AND '.join(terms) or None
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def is_indexed(model):
+    return model_label(model) in KINDS
+
+
+def is_available():
+    global _available
+    if _available is None:
+        _available = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _available
+
+
+def reset():
+    global _available
+    _available = None
+
+
+def create_table(schema_editor):
+    schema_editor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(uni, bi, tokenize='unicode61')")
+
+
+def drop_table(schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def document(instance):
+    label = model_label(instance.__class__)
+    text = ' '.join(getattr(instance, field) or '' for field in INDEXED_FIELDS[label])
+    return instance.pk * KIND_COUNT + KINDS[label], unigrams(text), bigrams(text)
+
+
+def index_instance(instance):
+    rowid, uni, bi = document(instance)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, uni, bi) VALUES (%s, %s, %s)', [rowid, uni, bi])
+
+
+def remove_instance(instance):
+    label = model_label(instance.__class__)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [instance.pk * KIND_COUNT + KINDS[label]])
+
+
+def rebuild(*querysets, using='default'):
+    # 모델 queryset 들로 인덱스를 처음부터 다시 채운다 (마이그레이션 / rebuild_search_index 명령에서 사용)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        for queryset in querysets:
+            fields = INDEXED_FIELDS[model_label(queryset.model)]
+            rows = [document(instance) for instance in queryset.using(using).only('pk', *fields).iterator()]
+            cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, uni, bi) VALUES (%s, %s, %s)', rows)
+    reset()
+
+
+def search(queryset, query):
+    # 인덱스로 후보 pk 만 남긴 queryset (인덱스를 쓸 수 없으면 그대로 반환)
+    expression = match_expression(query)
+    if expression is None or not is_available() or not is_indexed(queryset.model):
+        return queryset
+
+    kind = KINDS[model_label(queryset.model)]
+    candidates = RawSQL(
+        f'SELECT rowid / {KIND_COUNT} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid %% {KIND_COUNT} = %s',
+        [expression, kind],
+    )
+    return queryset.filter(pk__in=candidates)
@@ -0,0 +1,152 @@
+import json
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from rest_framework.test import APIRequestFactory, force_authenticate
+from celeb.models import Celeb
+from routine.models import Routine
+from search.models import Theme
+from search import index as search_index
+from search import choseong as choseong_keys
+from search import cache as search_cache
+from search.hangul import choseong
+from search.views import SearchViewSet
+
+WORDS = [
+    '아침', '요가', '명상', '스트레칭', '러닝', '독서', '물', '마시기', '일기', '산책',
+    '필라테스', '홈트', '식단', '수면', '감사', '루틴', '플랭크', '스쿼트', '영어', '공부',
+]
+QUERIES = ['요', '요가', '아침 요가', '스트레칭', '필라테스', '명상 루틴', '없는검색어']
+# 결과가 가장 많이 나오는 짧은 검색어 (응답 크기 / 지연 시간 측정용)
+SHORT_QUERIES = ['요', '가', '아침', 'ㅇ', 'ㅇㄱ']
+
+
+class Command(BaseCommand):
+    help = '테스트 DB에 루틴을 채운 뒤 LIKE 검색과 검색 인덱스(FTS5) 검색 시간을 비교한다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--routines', type=int, default=100_000)
+        parser.add_argument('--celebs', type=int, default=1_000)
+        parser.add_argument('--themes', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=100, help='검색 API 지연 시간 측정 요청 수')
+
+    def handle(self, *args, **options):
+        # 실제 DB를 건드리지 않도록 테스트 DB를 만들어서 측정
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.seed(options)
+            self.run(options['repeat'])
+            self.run_api(options['requests'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def sentence(self, rng, size):
+        # 흔한 단어 조금 + 임의로 만든 한글 단어 위주
+        return ' '.join(rng.choice(WORDS) if rng.random() < 0.05 else rng.choice(self.vocabulary) for _ in range(size))
+
+    def seed(self, options):
+        rng = random.Random(0)
+        self.vocabulary = [
+            ''.join(chr(rng.randrange(0xAC00, 0xD7A4)) for _ in range(rng.randint(2, 4)))
+            for _ in range(20_000)
+        ]
+        started = time.perf_counter()
+        # bulk_create 는 save() 를 거치지 않으므로 초성 키도 직접 채운다
+        names = [self.sentence(rng, 1) + str(i) for i in range(options['celebs'])]
+        Celeb.objects.bulk_create(
+            Celeb(name=name, name_choseong=choseong(name), profession=rng.choice(['가수', '배우', '운동선수']))
+            for name in names
+        )
+        celeb_ids = list(Celeb.objects.values_list('id', flat=True))
+        titles = (self.sentence(rng, 3) for _ in range(options['routines']))
+        Routine.objects.bulk_create(
+            (
+                Routine(
+                    title=title,
+                    title_choseong=choseong(title),
+                    sub_title=self.sentence(rng, 2),
+                    content=self.sentence(rng, 30),
+                    celebrity_id=rng.choice(celeb_ids),
+                    popular=rng.randrange(1000),
+                )
+                for title in titles
+            ),
+            batch_size=5_000,
+        )
+        theme_titles = [self.sentence(rng, 2) for _ in range(options['themes'])]
+        Theme.objects.bulk_create(
+            Theme(title=title, title_choseong=choseong(title), content=self.sentence(rng, 20)) for title in theme_titles
+        )
+        search_index.rebuild(Celeb.objects.all(), Routine.objects.all(), Theme.objects.all())
+        choseong_keys.rebuild(Celeb.objects.all(), Routine.objects.all(), Theme.objects.all())
+        self.stdout.write(f"seed: routines={options['routines']} ({time.perf_counter() - started:.1f}s)")
+
+    def like_ids(self, query):
+        return (
+            set(Celeb.objects.filter(Q(name__icontains=query) | Q(profession__icontains=query)).values_list('id', flat=True)),
+            set(Routine.objects.filter(Q(title__icontains=query) | Q(content__icontains=query)).values_list('id', flat=True)),
+            set(Theme.objects.filter(Q(title__icontains=query) | Q(content__icontains=query)).values_list('id', flat=True)),
+        )
+
+    def index_ids(self, query):
+        return (
+            set(search_index.search(Celeb.objects.all(), query).filter(Q(name__icontains=query) | Q(profession__icontains=query)).values_list('id', flat=True)),
+            set(search_index.search(Routine.objects.all(), query).filter(Q(title__icontains=query) | Q(content__icontains=query)).values_list('id', flat=True)),
+            set(search_index.search(Theme.objects.all(), query).filter(Q(title__icontains=query) | Q(content__icontains=query)).values_list('id', flat=True)),
+        )
+
+    def measure(self, func, query, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
+
+    def run(self, repeat):
+        self.stdout.write(f"{'query':<12}{'hits':>8}{'LIKE ms':>10}{'FTS ms':>10}  same")
+        for query in QUERIES:
+            like_result, like_ms = self.measure(self.like_ids, query, repeat)
+            index_result, index_ms = self.measure(self.index_ids, query, repeat)
+            hits = sum(len(ids) for ids in like_result)
+            self.stdout.write(f'{query:<12}{hits:>8}{like_ms:>10.1f}{index_ms:>10.1f}  {like_result == index_result}')
+
+    def run_api(self, requests):
+        # 검색 API 전체(정렬 + 페이지 + 직렬화)의 응답 크기와 p50 / p99
+        # cold: 요청마다 검색 결과 캐시를 비우고 (검색 자체), warm: 캐시에서 (search/cache.py)
+        user = get_user_model().objects.create(email='bench@example.com', username='bench', nickname='bench')
+        factory = APIRequestFactory()
+        view = SearchViewSet.as_view({'get': 'list'})
+        self.stdout.write(f"{'query':<12}{'items':>8}{'bytes':>10}{'cold p50':>10}{'cold p99':>10}{'warm p50':>10}{'warm p99':>10}")
+        for query in SHORT_QUERIES:
+            cold = []
+            warm = []
+            for _ in range(requests):
+                search_cache.results.clear()
+                response, elapsed = self.request(view, factory, user, query)
+                cold.append(elapsed)
+                response, elapsed = self.request(view, factory, user, query)
+                warm.append(elapsed)
+            body = json.loads(response.content)
+            items = sum(len(body[name]) for name in body if name != 'next')
+            self.stdout.write(
+                f'{query:<12}{items:>8}{len(response.content):>10}'
+                f'{statistics.median(cold):>10.1f}{self.p99(cold):>10.1f}{statistics.median(warm):>10.1f}{self.p99(warm):>10.1f}'
+            )
+
+    def request(self, view, factory, user, query):
+        request = factory.get('/api/search', {'data': query})
+        force_authenticate(request, user=user)
+        started = time.perf_counter()
+        response = view(request)
+        response.render()
+        return response, (time.perf_counter() - started) * 1000
+
+    def p99(self, timings):
+        return statistics.quantiles(timings, n=100)[98] if len(timings) > 1 else timings[0]
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from celeb.models import Celeb
+from routine.models import Routine
+from search.models import Theme
+from search import index as search_index
+from search import choseong
+
+
+class Command(BaseCommand):
+    help = '셀럽 / 루틴 / 테마 검색 인덱스(FTS5)와 초성 키를 처음부터 다시 만든다.'
+
+    def handle(self, *args, **options):
+        search_index.reset()
+        if not search_index.is_available():
+            raise CommandError('검색 인덱스 테이블이 없습니다. migrate 를 먼저 실행하세요. (SQLite 전용)')
+
+        search_index.rebuild(Celeb.objects.all(), Routine.objects.all(), Theme.objects.all())
+        choseong.rebuild(Celeb.objects.all(), Routine.objects.all(), Theme.objects.all())
+        self.stdout.write(self.style.SUCCESS('검색 인덱스를 다시 만들었습니다.'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_alter_theme_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='theme',
+            name='sub_title',
+            field=models.CharField(default='기본값', max_length=200),
+        ),
+    ]
@@ -0,0 +1,63 @@
+import re
+
+from django.db import migrations
+
+# 마이그레이션 시점의 search/index.py 를 그대로 옮겨 둔 것 (앱 코드가 바뀌어도 이 마이그레이션은 바뀌지 않도록)
+FTS_TABLE = 'search_fts'
+KIND_COUNT = 4
+INDEXED = (
+    ('celeb', 'Celeb', 1, ('name', 'profession')),
+    ('routine', 'Routine', 2, ('title', 'content')),
+    ('search', 'Theme', 3, ('title', 'content')),
+)
+WORD_RE = re.compile(r'\w+')
+
+
+def words(text):
+    return WORD_RE.findall((text or '').lower())
+
+
+def unigrams(text):
+    return ' '.join(char for word in words(text) for char in word)
+
+
+def bigrams(text):
+    grams = []
+    for word in words(text):
+        grams.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return ' '.join(grams)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(uni, bi, tokenize='unicode61')")
+    alias = schema_editor.connection.alias
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        for app_label, model_name, kind, fields in INDEXED:
+            model = apps.get_model(app_label, model_name)
+            rows = []
+            for obj in model.objects.using(alias).only('pk', *fields).iterator():
+                text = ' '.join(getattr(obj, field) or '' for field in fields)
+                rows.append((obj.pk * KIND_COUNT + kind, unigrams(text), bigrams(text)))
+            cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, uni, bi) VALUES (%s, %s, %s)', rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0003_theme_sub_title'),
+        ('celeb', '0003_alter_celeb_photo'),
+        ('routine', '0003_alter_routine_category'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.7 on 2026-10-20 00:04
+
+from django.db import migrations, models
+
+# search/hangul.py choseong
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+
+
+def choseong(text):
+    result = []
+    for char in text or '':
+        code = ord(char)
+        if 0xAC00 <= code <= 0xD7A3:
+            result.append(CHOSEONG[(code - 0xAC00) // (21 * 28)])
+        elif not char.isspace():
+            result.append(char.lower())
+    return ''.join(result)
+
+
+def fill_title_choseong(apps, schema_editor):
+    Theme = apps.get_model('search', 'Theme')
+    objs = list(Theme.objects.only('id', 'title'))
+    for obj in objs:
+        obj.title_choseong = choseong(obj.title)
+    Theme.objects.bulk_update(objs, ['title_choseong'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0004_search_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='theme',
+            name='title_choseong',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_title_choseong, migrations.RunPython.noop),
+    ]
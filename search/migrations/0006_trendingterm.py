@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-20 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0005_theme_title_choseong'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, unique=True)),
+                ('score', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+    ]
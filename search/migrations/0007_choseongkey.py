@@ -0,0 +1,53 @@
+# Generated by Django 5.0.7 on 2026-10-20 01:09
+
+from django.db import migrations, models
+
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+
+
+def choseong(text):
+    result = []
+    for char in text or '':
+        code = ord(char)
+        if 0xAC00 <= code <= 0xD7A3:
+            result.append(CHOSEONG[(code - 0xAC00) // (21 * 28)])
+        elif not char.isspace():
+            result.append(char.lower())
+    return ''.join(result)
+
+
+def fill_keys(apps, schema_editor):
+    # 두 번째 단어부터의 초성 키 ('아침 요가 루틴' -> 'ㅇㄱㄹㅌ', 'ㄹㅌ'), kind 는 search/index.py KINDS
+    ChoseongKey = apps.get_model('search', 'ChoseongKey')
+    sources = [(1, 'celeb', 'Celeb', 'name'), (2, 'routine', 'Routine', 'title'), (3, 'search', 'Theme', 'title')]
+    keys = []
+    for kind, app_label, model_name, field in sources:
+        for pk, text in apps.get_model(app_label, model_name).objects.values_list('pk', field).iterator():
+            words = [choseong(word) for word in (text or '').split()]
+            keys.extend(ChoseongKey(kind=kind, object_id=pk, key=''.join(words[i:])) for i in range(1, len(words)))
+    ChoseongKey.objects.bulk_create(keys, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0006_trendingterm'),
+        ('celeb', '0006_celeb_score_totals'),
+        ('routine', '0004_routine_title_choseong'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChoseongKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField()),
+                ('object_id', models.IntegerField()),
+                ('key', models.CharField(max_length=100)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'key'], name='choseong_key_lookup'), models.Index(fields=['kind', 'object_id'], name='choseong_key_object')],
+            },
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,44 @@
 from django.db import models
 from rest_framework import serializers
+from .hangul import choseong
 
 class Theme(models.Model):
     title = models.CharField(max_length=100)
     sub_title=models.CharField(max_length=200,default='기본값')
     content = models.TextField()
     image = models.URLField(max_length=500,null=True, blank=True,default='https://cdn.pixabay.com/photo/2020/08/22/12/36/yoga-5508336_1280.png')
+    title_choseong = models.CharField(max_length=100, blank=True, editable=False, db_index=True)  # 초성 검색용
 
     def __str__(self):
         return self.title
-    
+
+    def save(self, *args, **kwargs):
+        self.title_choseong = choseong(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'title_choseong'}
+        super().save(*args, **kwargs)
+
+
+class ChoseongKey(models.Model):
+    # 초성 검색용 두 번째 단어부터의 키 (search/choseong.py 가 셀럽 / 루틴 / 테마를 저장할 때 갱신)
+    # 제목 처음부터의 키는 모델의 초성 컬럼에 있고, '아침 요가 루틴' 은 여기에 'ㅇㄱㄹㅌ', 'ㄹㅌ' 두 줄
+    kind = models.PositiveSmallIntegerField()  # search/index.py KINDS
+    object_id = models.IntegerField()
+    key = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'key'], name='choseong_key_lookup'),
+            models.Index(fields=['kind', 'object_id'], name='choseong_key_object'),
+        ]
+
+
+class TrendingTerm(models.Model):
+    # 인기 검색어 스냅샷 (search/trending.py 가 워커마다 주기적으로 늘어난 만큼 더함)
+    term = models.CharField(max_length=100, unique=True)
+    score = models.FloatField(default=0)  # updated_at 시점의 감쇠된 검색 횟수 (모든 워커 합)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.term
@@ -0,0 +1,86 @@
+import base64
+import json
+
+from django.db.models import Case, When, Value, IntegerField, F, Q, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from routine.models import Routine
+from . import hangul
+
+# 검색 결과 정렬 / 페이지네이션
+# 점수는 SQL 에서 계산한다: 제목(이름) 일치 3 > 제목 prefix 2 > 제목 부분 일치 1 > 다른 필드(내용, 직업)만 일치 0
+# 같은 점수 안에서는 인기도(루틴 popular, 셀럽 / 테마는 소속 루틴 popular 합) 순, 마지막은 id 순.
+# 카테고리마다 limit 개만 돌려주고, 더 보기는 마지막 항목의 (점수, 인기도, id) 를 담은 cursor 로 이어서 가져온다.
+
+EXACT, PREFIX, CONTAINS, OTHER = 3, 2, 1, 0
+
+
+def match_score(field, query):
+    if hangul.is_choseong_query(query):
+        # 전체 일치 > 제목 처음부터 > 다른 단어부터 (search/choseong.py 로 찾은 행)
+        return Case(
+            When(**{field: hangul.choseong(query)}, then=Value(EXACT)),
+            When(**hangul.prefix_filter(field, query), then=Value(PREFIX)),
+            default=Value(CONTAINS),
+            output_field=IntegerField(),
+        )
+    return Case(
+        When(**{f'{field}__iexact': query}, then=Value(EXACT)),
+        When(**{f'{field}__istartswith': query}, then=Value(PREFIX)),
+        When(**{f'{field}__icontains': query}, then=Value(CONTAINS)),
+        default=Value(OTHER),
+        output_field=IntegerField(),
+    )
+
+
+def routine_popularity(relation):
+    # 셀럽 / 테마에 속한 루틴 popular 합 (서브쿼리)
+    routines = Routine.objects.filter(**{relation: OuterRef('pk')}).order_by().values(relation)
+    return Coalesce(Subquery(routines.annotate(total=Sum('popular')).values('total')), 0)
+
+
+def rank(queryset, field, query, popularity):
+    return queryset.annotate(match_score=match_score(field, query), popularity=popularity).order_by('-match_score', '-popularity', 'id')
+
+
+def rank_celebs(queryset, query):
+    field = 'name_choseong' if hangul.is_choseong_query(query) else 'name'
+    return rank(queryset, field, query, routine_popularity('celebrity'))
+
+
+def rank_routines(queryset, query):
+    field = 'title_choseong' if hangul.is_choseong_query(query) else 'title'
+    return rank(queryset, field, query, F('popular'))
+
+
+def rank_themes(queryset, query):
+    field = 'title_choseong' if hangul.is_choseong_query(query) else 'title'
+    return rank(queryset, field, query, routine_popularity('theme'))
+
+
+def encode_cursor(obj):
+    position = [obj.match_score, obj.popularity, obj.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        score, popularity, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(score), int(popularity), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def paginate(queryset, limit, cursor=None):
+    # (한 페이지 결과, 다음 cursor) — 정렬 순서 그대로 keyset 조건으로 이어서 가져온다
+    if cursor is not None:
+        score, popularity, pk = cursor
+        queryset = queryset.filter(
+            Q(match_score__lt=score)
+            | Q(match_score=score, popularity__lt=popularity)
+            | Q(match_score=score, popularity=popularity, id__gt=pk)
+        )
+    items = list(queryset[:limit + 1])
+    if len(items) > limit:
+        return items[:limit], encode_cursor(items[limit - 1])
+    return items, None
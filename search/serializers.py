@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import Theme
 from celeb.models import Celeb
 from routine.models import Routine
+from project.mixins import EagerLoadingSerializerMixin
 
 class ThemeSerializer(serializers.ModelSerializer):
     
@@ -15,7 +16,7 @@ class CelebritySerializer(serializers.ModelSerializer):
         model = Celeb
         fields = ['id', 'name', 'profession','image']
 
-class RoutineSerializer(serializers.ModelSerializer):
+class RoutineSerializer(EagerLoadingSerializerMixin, serializers.ModelSerializer):
     celeb = serializers.CharField(source='celebrity.name')
     
     category = serializers.SlugRelatedField(
@@ -29,6 +30,10 @@ class RoutineSerializer(serializers.ModelSerializer):
     read_only=True,
     slug_field='title'
     )
+
+    select_related_fields = ('celebrity',)
+    prefetch_related_fields = ('category', 'theme')
+
     class Meta:
         model = Routine
         fields = ['id', 'title', 'sub_title', 'content', 'category', 'celeb', 'image', 'video_url','theme']
@@ -0,0 +1,86 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from celeb.models import Celeb
+from routine.models import Routine
+from .models import Theme
+from . import index as search_index
+from . import choseong
+from . import suggest
+from project import versions
+
+# 검색 / 카탈로그 캐시에 보이지 않는 집계 컬럼 (이 컬럼만 저장하면 인덱스 갱신 / 버전 올림을 건너뜀)
+COUNTER_FIELDS = {
+    Celeb: {'routine_count', 'adoption_count', 'catalog_version', 'score_sum', 'score_count'},
+    Routine: {'popular'},
+    Theme: set(),
+}
+
+SUGGEST_KINDS = {
+    Celeb: suggest.CELEB,
+    Routine: suggest.ROUTINE,
+    Theme: suggest.THEME,
+}
+
+
+def counters_only(sender, update_fields):
+    return update_fields is not None and set(update_fields) <= COUNTER_FIELDS[sender]
+
+
+def update_suggest_index(instance):
+    index = suggest.get_index()
+    if isinstance(instance, Celeb):
+        index.add(suggest.CELEB, instance.pk, instance.name, suggest.celeb_weight(instance))
+    elif isinstance(instance, Routine):
+        index.add(suggest.ROUTINE, instance.pk, instance.title, instance.popular)
+    else:
+        index.add(suggest.THEME, instance.pk, instance.title, suggest.theme_weight(instance))
+
+
+# 셀럽 / 루틴 / 테마가 바뀌면 검색 인덱스, 초성 키, 자동완성 인덱스도 같이 갱신
+@receiver(post_save, sender=Celeb)
+@receiver(post_save, sender=Routine)
+@receiver(post_save, sender=Theme)
+def update_search_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or counters_only(sender, update_fields):
+        return
+    choseong.update(instance)
+    if search_index.is_available():
+        search_index.index_instance(instance)
+    if suggest.is_built():
+        update_suggest_index(instance)
+
+
+@receiver(post_delete, sender=Celeb)
+@receiver(post_delete, sender=Routine)
+@receiver(post_delete, sender=Theme)
+def remove_from_search_index(sender, instance, **kwargs):
+    choseong.remove(instance)
+    if search_index.is_available():
+        search_index.remove_instance(instance)
+    if suggest.is_built():
+        suggest.get_index().remove(SUGGEST_KINDS[sender], instance.pk)
+
+
+# 검색 결과 캐시(search/cache.py) 등 카탈로그 캐시 무효화
+# 루틴을 담을 때 오르는 popular 처럼 집계 컬럼만 바뀐 경우는 올리지 않음 (유저가 루틴을 담을 때마다 모든 캐시가 비워지지 않도록)
+@receiver(post_save, sender=Celeb)
+@receiver(post_save, sender=Routine)
+@receiver(post_save, sender=Theme)
+def bump_catalog_version_on_save(sender, raw=False, update_fields=None, **kwargs):
+    if raw or counters_only(sender, update_fields):
+        return
+    suggest.adopt_version(versions.bump(versions.CATALOG))
+
+
+@receiver(post_delete, sender=Celeb)
+@receiver(post_delete, sender=Routine)
+@receiver(post_delete, sender=Theme)
+def bump_catalog_version(sender, **kwargs):
+    suggest.adopt_version(versions.bump(versions.CATALOG))
+
+
+@receiver(m2m_changed, sender=Routine.theme.through)
+@receiver(m2m_changed, sender=Routine.category.through)
+def bump_catalog_version_on_m2m(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        suggest.adopt_version(versions.bump(versions.CATALOG))
@@ -0,0 +1,277 @@
+import bisect
+import heapq
+import logging
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from project import versions
+from .hangul import word_keys, is_choseong_query
+
+# 검색창 자동완성용 메모리 prefix 인덱스
+# 셀럽 이름 / 루틴 제목 / 테마 제목을 정규화한 키로 정렬된 배열에 넣고 bisect 로 prefix 범위를 찾는다.
+# '아침 요가 루틴' 은 '아침 요가 루틴', '요가 루틴', '루틴' 세 개의 키로 들어가서 단어 중간부터 입력해도 찾을 수 있다.
+# 초성 키('ㅇㅊㅇㄱㄹㅌ', 'ㅇㄱㄹㅌ', 'ㄹㅌ')도 같이 넣어서 초성만 입력해도 같은 방식으로 찾는다 (검색의 초성 조회와 같은 규칙).
+# 같은 prefix 결과는 LRU 로 기억해 두고, 인덱스가 바뀌면 비운다.
+# 한 글자 prefix('ㅇ', '요')는 걸리는 키가 너무 많아서, 글자마다 상위 MAX_LIMIT 개를 미리 골라 두고 (추가 / 삭제 때 고침) 그대로 돌려준다.
+# 인덱스는 워커가 뜰 때 (project/wsgi.py, project/asgi.py 의 lifespan) 미리 만든다.
+# 이 워커의 변경은 signal 로 바로 반영하고, 다른 워커의 변경은 카탈로그 버전이 바뀐 것을 보고
+# SUGGEST_REBUILD_INTERVAL 마다 최대 한 번 다시 만든다.
+
+CELEB = '인물'
+ROUTINE = '루틴'
+THEME = '테마'
+
+MAX_LIMIT = 50  # 한 번에 돌려주는 최대 개수 (한 글자 prefix 는 이만큼 미리 골라 둠)
+
+SPACE_RE = re.compile(r'\s+')
+
+# 키 하나당 대략적인 메모리 (문자열 + 튜플 + 리스트 슬롯)
+ENTRY_OVERHEAD = 120
+
+
+def normalize(text):
+    return SPACE_RE.sub(' ', (text or '').lower()).strip()
+
+
+def normalize_query(text):
+    if is_choseong_query(text):
+        return ''.join(text.split())
+    return normalize(text)
+
+
+def index_keys(label):
+    # 단어마다 그 단어부터 끝까지 (원문 + 초성, 초성 키는 DB 초성 검색과 같은 hangul.word_keys)
+    label = normalize(label)
+    words = label.split(' ')
+    keys = {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+    keys.update(word_keys(label))
+    return keys
+
+
+class PrefixIndex:
+    def __init__(self, max_bytes, cache_size=1024):
+        self.max_bytes = max_bytes
+        self.cache_size = cache_size
+        self._keys = []       # 정렬된 (key, kind, id)
+        self._entries = {}    # (kind, id) -> (label, weight, keys)
+        self._bytes = 0
+        self._cache = OrderedDict()
+        self._heads = {}         # 첫 글자 -> 그 글자로 시작하는 키가 있는 항목 상위 MAX_LIMIT 개의 정렬 키
+        self._stale_heads = set()  # 꽉 찬 상위 목록에서 빠진 항목이 있어서 다시 골라야 하는 글자
+        self._lock = threading.RLock()
+        self.version = None  # 만들 때의 카탈로그 버전
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def _cost(self, keys):
+        return sum(sys.getsizeof(key) + ENTRY_OVERHEAD for key in keys)
+
+    def _rank(self, kind, obj_id, weight=None):
+        # 정렬 키: 가중치 내림차순, 같으면 종류 / id 순
+        if weight is None:
+            weight = self._entries[(kind, obj_id)][1]
+        return -weight, kind, obj_id
+
+    def load(self, entries):
+        # (kind, id, label, weight) 목록으로 한 번에 채운다. 예산이 모자라면 가중치가 높은 항목부터 남긴다
+        with self._lock:
+            for kind, obj_id, label, weight in sorted(entries, key=lambda entry: entry[3], reverse=True):
+                keys = index_keys(label)
+                cost = self._cost(keys)
+                if self._bytes + cost > self.max_bytes:
+                    break
+                self._keys.extend((key, kind, obj_id) for key in keys)
+                self._entries[(kind, obj_id)] = (label, weight, keys)
+                self._bytes += cost
+            self._keys.sort()
+            self._cache.clear()
+
+            heads = {}
+            for (kind, obj_id), (_, weight, keys) in self._entries.items():
+                for head in {key[0] for key in keys}:
+                    heads.setdefault(head, []).append(self._rank(kind, obj_id, weight))
+            self._heads = {head: heapq.nsmallest(MAX_LIMIT, ranks) for head, ranks in heads.items()}
+            self._stale_heads.clear()
+
+    def add(self, kind, obj_id, label, weight=0):
+        keys = index_keys(label)
+        cost = self._cost(keys)
+        with self._lock:
+            self._remove(kind, obj_id)
+            # 예산을 넘으면 가중치가 낮은 항목부터 밀어낸다
+            while self._entries and self._bytes + cost > self.max_bytes:
+                lowest = min(self._entries, key=lambda entry: self._entries[entry][1])
+                if self._entries[lowest][1] >= weight:
+                    return False
+                self._remove(*lowest)
+            if self._bytes + cost > self.max_bytes:
+                return False
+
+            for key in keys:
+                bisect.insort(self._keys, (key, kind, obj_id))
+            self._entries[(kind, obj_id)] = (label, weight, keys)
+            self._bytes += cost
+            for head in {key[0] for key in keys}:
+                ranks = self._heads.setdefault(head, [])
+                bisect.insort(ranks, self._rank(kind, obj_id, weight))
+                del ranks[MAX_LIMIT:]
+            self._cache.clear()
+            return True
+
+    def remove(self, kind, obj_id):
+        with self._lock:
+            self._remove(kind, obj_id)
+            self._cache.clear()
+
+    def _remove(self, kind, obj_id):
+        entry = self._entries.pop((kind, obj_id), None)
+        if entry is None:
+            return
+        for key in entry[2]:
+            position = bisect.bisect_left(self._keys, (key, kind, obj_id))
+            del self._keys[position]
+        self._bytes -= self._cost(entry[2])
+        for head in {key[0] for key in entry[2]}:
+            ranks = self._heads.get(head, [])
+            rank = self._rank(kind, obj_id, entry[1])
+            position = bisect.bisect_left(ranks, rank)
+            if position < len(ranks) and ranks[position] == rank:
+                # 꽉 차 있었으면 목록 밖에 있던 다음 항목을 모르므로 다음 조회 때 다시 고른다
+                if len(ranks) >= MAX_LIMIT:
+                    self._stale_heads.add(head)
+                del ranks[position]
+
+    def _scan(self, prefix):
+        # prefix 로 시작하는 키가 있는 항목들
+        matches = set()
+        position = bisect.bisect_left(self._keys, (prefix,))
+        while position < len(self._keys) and self._keys[position][0].startswith(prefix):
+            _, kind, obj_id = self._keys[position]
+            matches.add((kind, obj_id))
+            position += 1
+        return matches
+
+    def _result(self, ranks):
+        return [{'type': kind, 'id': obj_id, 'title': self._entries[(kind, obj_id)][0]} for _, kind, obj_id in ranks]
+
+    def suggest(self, prefix, limit=10):
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+
+        with self._lock:
+            if len(prefix) == 1 and limit <= MAX_LIMIT:
+                if prefix in self._stale_heads:
+                    self._heads[prefix] = heapq.nsmallest(MAX_LIMIT, (self._rank(*match) for match in self._scan(prefix)))
+                    self._stale_heads.discard(prefix)
+                return self._result(self._heads.get(prefix, [])[:limit])
+
+            cached = self._cache.get((prefix, limit))
+            if cached is not None:
+                self._cache.move_to_end((prefix, limit))
+                return cached
+
+            result = self._result(heapq.nsmallest(limit, (self._rank(*match) for match in self._scan(prefix))))
+
+            self._cache[(prefix, limit)] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return result
+
+
+_index = None
+_index_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+
+def celeb_weight(celeb):
+    return celeb.routine_set.aggregate(total=Coalesce(Sum('popular'), 0))['total']
+
+
+def theme_weight(theme):
+    return theme.routine_set.aggregate(total=Coalesce(Sum('popular'), 0))['total']
+
+
+def build_index(version=None):
+    from celeb.models import Celeb
+    from routine.models import Routine
+    from .models import Theme
+
+    index = PrefixIndex(
+        max_bytes=getattr(settings, 'SUGGEST_INDEX_MAX_BYTES', 8 * 1024 * 1024),
+        cache_size=getattr(settings, 'SUGGEST_CACHE_SIZE', 1024),
+    )
+    entries = []
+    celebs = Celeb.objects.annotate(weight=Coalesce(Sum('routine__popular'), 0)).values_list('id', 'name', 'weight')
+    entries.extend((CELEB, obj_id, label, weight) for obj_id, label, weight in celebs)
+    routines = Routine.objects.values_list('id', 'title', 'popular')
+    entries.extend((ROUTINE, obj_id, label, weight) for obj_id, label, weight in routines)
+    themes = Theme.objects.annotate(weight=Coalesce(Sum('routine__popular'), 0)).values_list('id', 'title', 'weight')
+    entries.extend((THEME, obj_id, label, weight) for obj_id, label, weight in themes)
+
+    index.load(entries)
+    index.version = version
+    return index
+
+
+def is_stale(index, version):
+    interval = getattr(settings, 'SUGGEST_REBUILD_INTERVAL', 60)
+    return index.version != version and time.monotonic() - index.built_at >= interval
+
+
+def get_index():
+    # 보통은 warm_up 으로 워커가 뜰 때 만들어 두고, 그러지 못했으면 첫 요청 때
+    global _index
+    version = versions.get(versions.CATALOG)
+    if _index is None or is_stale(_index, version):
+        with _index_lock:
+            if _index is None or is_stale(_index, version):
+                _index = build_index(version)
+    return _index
+
+
+def warm_up():
+    # 워커 시작 시 (project/wsgi.py, project/asgi.py). migrate 전이라 테이블이 없으면 첫 요청 때 만든다
+    if not getattr(settings, 'SUGGEST_BUILD_ON_START', True):
+        return
+    try:
+        get_index()
+    except DatabaseError:
+        logger.warning('Could not build the suggest index on startup', exc_info=True)
+    finally:
+        # 미리 띄운(preload) 프로세스의 연결을 fork 한 워커들이 같이 쓰지 않도록 (트랜잭션 안이면 그대로 둠)
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def adopt_version(version):
+    # 이 워커에서 바꾼 것은 signal 로 이미 반영했으므로, 그 사이 다른 변경이 없었으면 새 버전을 그대로 씀
+    index = _index
+    if index is not None and index.version == version - 1:
+        index.version = version
+
+
+def is_built():
+    return _index is not None
+
+
+def reset():
+    global _index
+    _index = None
+
+
+def suggest(prefix, limit=10):
+    return get_index().suggest(prefix, limit)
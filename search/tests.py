@@ -1,3 +1,435 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from celeb.models import Celeb
+from routine.models import Routine
+from .models import ChoseongKey, Theme, TrendingTerm
+from . import index as search_index
+from . import cache as search_cache
+from . import trending
+from . import suggest
+from . import hangul
+from . import choseong
+from project import versions
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_index.reset()
+        search_cache.results.clear()
+        self.user = User.objects.create(email='user@example.com', username='user', nickname='유저')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.celeb = Celeb.objects.create(name='아이유', profession='가수')
+
+    def make_routine(self, title, content='content', celeb=None, **kwargs):
+        return Routine.objects.create(
+            title=title, sub_title='sub', content=content, celebrity=celeb or self.celeb,
+            create_at=datetime.date.today(), **kwargs
+        )
+
+    def search(self, query, **params):
+        response = self.client.get('/api/search', {'data': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def titles(self, data, category):
+        return [item['title'] for item in data[category]]
+
+
+class SearchIndexTests(SearchTestCase):
+    def test_tokens(self):
+        self.assertEqual(search_index.unigrams('아침요가'), '아 침 요 가')
+        self.assertEqual(search_index.bigrams('아침요가 루틴'), '아침 침요 요가 루틴')
+        self.assertEqual(search_index.match_expression('요가 밤'), 'bi : "요가" AND uni : "밤"')
+        self.assertIsNone(search_index.match_expression('!!'))
+
+    def test_finds_korean_substrings(self):
+        self.assertTrue(search_index.is_available())
+        self.make_routine('아침요가 스트레칭')
+        self.make_routine('저녁 산책', content='가볍게 요가')
+        self.make_routine('필라테스')
+        data = self.search('요가')
+        self.assertEqual(sorted(self.titles(data, '루틴')), ['아침요가 스트레칭', '저녁 산책'])
+
+    def test_index_follows_saves_and_deletes(self):
+        routine = self.make_routine('필라테스')
+        candidates = search_index.search(Routine.objects.all(), '요가')
+        self.assertFalse(candidates.exists())
+
+        routine.title = '요가 필라테스'
+        routine.save()
+        self.assertEqual(list(search_index.search(Routine.objects.all(), '요가')), [routine])
+
+        routine.delete()
+        with self.assertNumQueries(1):
+            self.assertFalse(search_index.search(Routine.objects.all(), '요가').exists())
+
+    def test_rebuild(self):
+        routine = self.make_routine('요가')
+        theme = Theme.objects.create(title='요가 테마', content='content')
+        search_index.rebuild(Celeb.objects.all(), Routine.objects.all(), Theme.objects.all())
+        self.assertEqual(list(search_index.search(Routine.objects.all(), '요가')), [routine])
+        self.assertEqual(list(search_index.search(Theme.objects.all(), '요가')), [theme])
+        self.assertEqual(list(search_index.search(Celeb.objects.all(), '유')), [self.celeb])
+
+
+class QueryCountTests(SearchTestCase):
+    # 테마 / 루틴 수와 상관없이 쿼리 수가 일정해야 함
+    def setUp(self):
+        super().setUp()
+        trending.reset()
+        trending.get_tracker()  # 스냅샷 읽는 쿼리는 첫 검색 전에
+
+    def make_theme(self, title, routines=2):
+        theme = Theme.objects.create(title=title, content='content')
+        for i in range(routines):
+            self.make_routine(f'{title} 루틴 {i}').theme.add(theme)
+        return theme
+
+    def test_search(self):
+        made = 0
+        for count in (1, 10, 100):
+            with self.subTest(themes=count):
+                while made < count:
+                    self.make_theme(f'요가 테마 {made}')
+                    made += 1
+                search_cache.results.clear()
+                # 셀럽 / 루틴 / 테마 한 페이지씩 + 테마별 루틴 제목 prefetch
+                with self.assertNumQueries(4):
+                    data = self.search('요가', limit=50)
+                self.assertEqual(len(data['테마']), min(count, 50))
+                self.assertEqual(len(data['테마'][0]['profession']), 2)
+
+    def test_theme_detail(self):
+        for count in (1, 10, 100):
+            with self.subTest(routines=count):
+                theme = self.make_theme(f'테마 {count}', routines=count)
+                # 테마 + 루틴(셀럽 join) + 카테고리 / 테마 prefetch
+                with self.assertNumQueries(4):
+                    response = self.client.get(f'/api/theme/{theme.pk}')
+                self.assertEqual(len(response.data['routine']), count)
+                self.assertEqual(response.data['routine'][0]['celeb'], self.celeb.name)
+
+
+class SuggestTests(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        suggest.reset()
+
+    def suggest(self, prefix, **params):
+        response = self.client.get('/api/suggest', {'q': prefix, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item['type'], item['title']) for item in response.data]
+
+    def test_prefix_at_any_word_ordered_by_weight(self):
+        self.make_routine('아침 요가 루틴', popular=1)
+        self.make_routine('요가 스트레칭', popular=5)
+        self.make_routine('저녁 산책', popular=9)
+        self.assertEqual(self.suggest('요'), [('루틴', '요가 스트레칭'), ('루틴', '아침 요가 루틴')])
+        self.assertEqual(self.suggest('아침  요'), [('루틴', '아침 요가 루틴')])
+        self.assertEqual(self.suggest('요', limit=1), [('루틴', '요가 스트레칭')])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_index_follows_catalog_changes(self):
+        self.assertEqual(self.suggest('아이'), [('인물', '아이유')])
+        theme = Theme.objects.create(title='아이돌 루틴', content='content')
+        self.assertEqual(self.suggest('아이돌'), [('테마', '아이돌 루틴')])
+        theme.delete()
+        self.celeb.name = '윤하'
+        self.celeb.save()
+        self.assertEqual(self.suggest('아이'), [])
+        self.assertEqual(self.suggest('윤'), [('인물', '윤하')])
+
+    def test_memory_budget_keeps_heaviest_entries(self):
+        index = suggest.PrefixIndex(max_bytes=1)
+        self.assertFalse(index.add(suggest.ROUTINE, 1, '요가', 1))
+        cost = index._cost(suggest.index_keys('요가'))
+        index = suggest.PrefixIndex(max_bytes=cost)
+        self.assertTrue(index.add(suggest.ROUTINE, 1, '요가', 1))
+        self.assertTrue(index.add(suggest.ROUTINE, 2, '요리', 5))
+        self.assertFalse(index.add(suggest.ROUTINE, 3, '요트', 2))
+        self.assertEqual(index.suggest('요'), [{'type': '루틴', 'id': 2, 'title': '요리'}])
+        self.assertLessEqual(index.size_bytes, cost)
+
+    def test_one_letter_prefix_uses_kept_top_entries(self):
+        def scan(index, prefix, limit):
+            # 전체 키를 훑어서 고른 결과
+            ranks = sorted(index._rank(*match) for match in index._scan(prefix))[:limit]
+            return index._result(ranks)
+
+        index = suggest.PrefixIndex(max_bytes=10 ** 8)
+        titles = ['요가', '요리', '아침 요가', '오늘의 운동', '영어 공부']
+        index.load([(suggest.ROUTINE, i, titles[i % len(titles)] + f' {i}', i % 7) for i in range(200)])
+        expected = {prefix: scan(index, prefix, suggest.MAX_LIMIT) for prefix in ('요', 'ㅇ', '아')}
+        with mock.patch.object(index, '_scan', side_effect=AssertionError('scanned')):
+            for prefix, result in expected.items():
+                self.assertEqual(index.suggest(prefix, suggest.MAX_LIMIT), result)
+            index.add(suggest.ROUTINE, 1000, '요가 매트', 100)
+            self.assertEqual(index.suggest('요', 1), [{'type': '루틴', 'id': 1000, 'title': '요가 매트'}])
+
+        # 상위 목록에 있던 항목이 빠지면 그 글자만 한 번 다시 고른다
+        for obj_id in (1000, 6, 13):
+            index.remove(suggest.ROUTINE, obj_id)
+        index.add(suggest.ROUTINE, 20, '요가', 0)
+        for prefix in ('요', 'ㅇ', '아', '영', 'ㅇㄱ'):
+            with self.subTest(prefix=prefix):
+                self.assertEqual(index.suggest(prefix, suggest.MAX_LIMIT), scan(index, prefix, suggest.MAX_LIMIT))
+                self.assertEqual(index.suggest(prefix, 3), scan(index, prefix, 3))
+
+    def test_warm_up_builds_the_index(self):
+        self.make_routine('요가 스트레칭')
+        suggest.warm_up()
+        self.assertTrue(suggest.is_built())
+        with self.settings(SUGGEST_BUILD_ON_START=False):
+            suggest.reset()
+            suggest.warm_up()
+            self.assertFalse(suggest.is_built())
+
+
+class ChoseongTests(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        suggest.reset()
+
+    def test_keys(self):
+        self.assertEqual(hangul.choseong('아침 요가 A'), 'ㅇㅊㅇㄱa')
+        self.assertEqual(hangul.word_keys(' 아침  요가 '), ['ㅇㅊㅇㄱ', 'ㅇㄱ'])
+        self.assertEqual(hangul.prefix_filter('key', 'ㅇㅊ ㅇㄱ'), {'key__gte': 'ㅇㅊㅇㄱ', 'key__lt': 'ㅇㅊㅇㄲ'})
+        self.assertEqual(hangul.word_keys('아침 요가 루틴'), ['ㅇㅊㅇㄱㄹㅌ', 'ㅇㄱㄹㅌ', 'ㄹㅌ'])
+        self.assertTrue(hangul.is_choseong_query('ㅇㅊ ㅇㄱ'))
+        self.assertFalse(hangul.is_choseong_query('ㅇ가'))
+
+    def keys(self, routine):
+        return list(ChoseongKey.objects.filter(object_id=routine.pk, kind=search_index.KINDS['routine.routine']).order_by('key').values_list('key', flat=True))
+
+    def test_column_and_keys_are_kept_on_save(self):
+        routine = self.make_routine('아침 요가 루틴')
+        self.assertEqual(Routine.objects.get(pk=routine.pk).title_choseong, 'ㅇㅊㅇㄱㄹㅌ')
+        self.assertEqual(self.keys(routine), ['ㄹㅌ', 'ㅇㄱㄹㅌ'])
+        routine.title = '저녁 산책'
+        routine.save(update_fields=['title'])
+        self.assertEqual(Routine.objects.get(pk=routine.pk).title_choseong, 'ㅈㄴㅅㅊ')
+        self.assertEqual(self.keys(routine), ['ㅅㅊ'])
+        routine.delete()
+        self.assertEqual(self.keys(routine), [])
+
+    def test_lookup_uses_indexes(self):
+        self.make_routine('아침 요가')
+        queryset = choseong.search(Routine.objects.all(), 'ㅇㄱ')
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + str(queryset.query.sql_with_params()[0]), queryset.query.sql_with_params()[1])
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('choseong_key_lookup', plan)
+        self.assertIn('title_choseong', plan)
+        self.assertNotIn('SCAN routine_routine', plan)
+
+    def test_rebuild_command(self):
+        routine = self.make_routine('아침 요가')
+        ChoseongKey.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.keys(routine), ['ㅇㄱ'])
+
+    def test_matches_at_any_word_start(self):
+        self.make_routine('아침 요가')
+        self.make_routine('요가 스트레칭')
+        self.make_routine('요리')
+        self.make_routine('오가닉 식단')  # 첫 단어 초성이 'ㅇㄱ' 으로 시작
+        self.assertEqual(self.titles(self.search('ㅇㄱ'), '루틴'), ['요가 스트레칭', '오가닉 식단', '아침 요가'])
+        self.assertEqual(self.titles(self.search('ㅇㅊ ㅇㄱ'), '루틴'), ['아침 요가'])
+        self.assertEqual(self.titles(self.search('ㅊㅇㄱ'), '루틴'), [])
+
+    def test_search_and_suggest_agree(self):
+        for title in ['아침 요가', '요가 스트레칭', '저녁 요가 루틴', '필라테스']:
+            self.make_routine(title)
+        for query in ['ㅇㄱ', 'ㅇㅊ', 'ㄹㅌ', 'ㅇㄱㄹ', 'ㅍㄹ', 'ㅅㅌ']:
+            with self.subTest(query=query):
+                searched = set(self.titles(self.search(query), '루틴'))
+                suggested = {item['title'] for item in suggest.suggest(query, 50) if item['type'] == suggest.ROUTINE}
+                self.assertEqual(searched, suggested)
+
+
+class RankingTests(SearchTestCase):
+    def test_order_by_match_then_popularity(self):
+        self.make_routine('스트레칭', content='요가 동작')  # 내용만 일치
+        self.make_routine('아침 요가', popular=9)  # 부분 일치
+        self.make_routine('요가 스트레칭', popular=1)  # prefix
+        self.make_routine('요가 매트', popular=5)  # prefix, 더 인기
+        self.make_routine('요가')  # 전체 일치
+        self.assertEqual(
+            self.titles(self.search('요가'), '루틴'),
+            ['요가', '요가 매트', '요가 스트레칭', '아침 요가', '스트레칭'],
+        )
+
+    def test_celeb_popularity_is_sum_of_routines(self):
+        quiet = Celeb.objects.create(name='요가 강사 A', profession='강사')
+        popular = Celeb.objects.create(name='요가 강사 B', profession='강사')
+        self.make_routine('루틴', celeb=popular, popular=3)
+        self.make_routine('루틴', celeb=popular, popular=4)
+        self.make_routine('루틴', celeb=quiet, popular=5)
+        self.assertEqual(self.titles(self.search('요가 강사'), '인물'), ['요가 강사 B', '요가 강사 A'])
+
+    def test_cursor_pages_one_category(self):
+        for i in range(5):
+            self.make_routine(f'요가 {i}', popular=i % 2)
+        first = self.search('요가', limit=2)
+        self.assertEqual(set(first), {'인물', '루틴', '테마', 'next'})
+        titles = self.titles(first, '루틴')
+        cursor = first['next']['루틴']
+        while cursor:
+            page = self.search('요가', limit=2, category='루틴', cursor=cursor)
+            self.assertEqual(set(page), {'루틴', 'next'})
+            titles.extend(self.titles(page, '루틴'))
+            cursor = page['next']['루틴']
+        self.assertEqual(titles, ['요가 1', '요가 3', '요가 0', '요가 2', '요가 4'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/search', {'data': '요가', 'category': '없음'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/search', {'data': '요가', 'cursor': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/search', {'data': '요가', 'category': '루틴', 'cursor': '!!'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/search', {'data': '요가', 'limit': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/search', {'data': '  '}).status_code, 400)
+
+
+class SearchCacheTests(SearchTestCase):
+    def test_repeated_search_is_served_from_cache(self):
+        self.make_routine('요가')
+        first = self.search('요가')
+        hits = search_cache.results.hits
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search(' 요가 '), first)
+        self.assertEqual(search_cache.results.hits, hits + 1)
+
+    def test_catalog_writes_invalidate(self):
+        routine = self.make_routine('요가')
+        self.search('요가')
+        routine.title = '필라테스'
+        routine.save()
+        self.assertEqual(self.titles(self.search('요가'), '루틴'), [])
+        Theme.objects.create(title='요가 테마', content='content')
+        self.assertEqual(self.titles(self.search('요가'), '테마'), ['요가 테마'])
+
+    def test_adopting_a_routine_keeps_catalog_caches(self):
+        from calen.models import UserRoutine
+        routine = self.make_routine('요가')
+        self.search('요가')
+        version = versions.get(versions.CATALOG)
+        with self.captureOnCommitCallbacks(execute=True):
+            today = datetime.date.today()
+            UserRoutine.objects.create(user=self.user, routine=routine, start_date=today, end_date=today)
+        self.assertEqual(versions.get(versions.CATALOG), version)
+        self.assertEqual(Routine.objects.get(pk=routine.pk).popular, 1)
+        self.assertEqual(Celeb.objects.get(pk=self.celeb.pk).adoption_count, 1)
+        with self.assertNumQueries(0):
+            self.search('요가')
+
+    def test_counter_only_saves_do_not_bump(self):
+        routine = self.make_routine('요가')
+        version = versions.get(versions.CATALOG)
+        routine.popular = 10
+        routine.save(update_fields=['popular'])
+        self.assertEqual(versions.get(versions.CATALOG), version)
+        routine.save()
+        self.assertEqual(versions.get(versions.CATALOG), version + 1)
+
+
+class TrendingTests(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        trending.reset()
+
+    def test_sketch_never_underestimates(self):
+        sketch = trending.CountMinSketch(width=16, depth=3)
+        counts = {f'term{i}': i + 1 for i in range(40)}
+        for term, count in counts.items():
+            sketch.add(term, count)
+        for term, count in counts.items():
+            self.assertGreaterEqual(sketch.estimate(term), count)
+
+    def test_keeps_top_k_with_decay(self):
+        now = [1000.0]
+        tracker = trending.TrendingTerms(size=2, half_life=100, clock=lambda: now[0])
+        for _ in range(4):
+            tracker.record('요가')
+        tracker.record('필라테스')
+        tracker.record('러닝')
+        self.assertEqual([term for term, _ in tracker.top()][0], '요가')
+        self.assertEqual(len(tracker.top()), 2)
+        self.assertAlmostEqual(tracker.top(1)[0][1], 4.0)
+
+        now[0] += 100  # 반감기 한 번
+        self.assertAlmostEqual(tracker.top(1)[0][1], 2.0)
+        for _ in range(3):
+            tracker.record('러닝')
+        self.assertEqual([term for term, _ in tracker.top()], ['러닝', '요가'])
+
+    def test_rescale_keeps_scores(self):
+        now = [0.0]
+        tracker = trending.TrendingTerms(size=5, half_life=1, clock=lambda: now[0])
+        tracker.record('요가')
+        now[0] = 50  # 가중치가 2^40 을 넘으면 카운터를 다시 맞춤
+        tracker.record('요가')
+        self.assertAlmostEqual(tracker.top(1)[0][1], 1.0)
+
+    def test_searches_are_recorded_and_snapshotted(self):
+        self.make_routine('요가')
+        self.search('요가')
+        self.search('요가')
+        self.search('ㅇㄱ')  # 초성 검색은 세지 않음
+        self.search('없는 검색어')  # 결과가 없으면 세지 않음
+        response = self.client.get('/api/trending')
+        self.assertEqual([item['term'] for item in response.data], ['요가'])
+        self.assertAlmostEqual(response.data[0]['score'], 2.0, places=1)
+
+        trending.flush()
+        self.assertEqual(list(TrendingTerm.objects.values_list('term', flat=True)), ['요가'])
+        trending.reset()
+        self.assertEqual([term for term, _ in trending.top()], ['요가'])
+
+    def scores(self):
+        return dict(TrendingTerm.objects.values_list('term', 'score'))
+
+    def test_flushes_from_workers_are_merged(self):
+        trending.get_tracker()
+        for _ in range(2):
+            trending.get_tracker().record('요가')
+        trending.flush()
+        trending.flush()  # 새로 늘어난 게 없으면 그대로
+        self.assertAlmostEqual(self.scores()['요가'], 2.0, places=3)
+
+        # 다른 워커 (스냅샷으로 시작한 양은 다시 더하지 않음)
+        trending.reset()
+        for _ in range(3):
+            trending.get_tracker().record('요가')
+        trending.get_tracker().record('러닝')
+        trending.flush()
+        scores = self.scores()
+        self.assertAlmostEqual(scores['요가'], 5.0, places=3)
+        self.assertAlmostEqual(scores['러닝'], 1.0, places=3)
+
+    def test_flush_decays_the_stored_score(self):
+        TrendingTerm.objects.create(term='요가', score=4, updated_at=timezone.now() - datetime.timedelta(seconds=trending.half_life()))
+        trending.reset()
+        trending._tracker = trending.TrendingTerms(size=10, half_life=trending.half_life())
+        trending.get_tracker().record('요가')
+        trending.flush()
+        self.assertAlmostEqual(self.scores()['요가'], 3.0, places=3)
 
-# Create your tests here.
+    def test_search_request_does_not_flush(self):
+        self.make_routine('요가')
+        with self.settings(SEARCH_TRENDING_FLUSH_INTERVAL=0), mock.patch('search.trending.threading.Thread') as thread:
+            self.search('요가')
+        thread.assert_called_once_with(target=trending.flush_in_background, name='trending-flush', daemon=True)
+        thread.return_value.start.assert_called_once_with()
+        self.assertFalse(TrendingTerm.objects.exists())
+        trending._flushing = False
@@ -0,0 +1,226 @@
+import hashlib
+import heapq
+import logging
+import threading
+import time
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+# 인기 검색어
+# 검색어마다 테이블에 한 줄씩 쌓지 않고, 워커 메모리의 Count-Min sketch 로 빈도를 세고 상위 k 개만 heap 으로 추적한다.
+# 시간 감쇠는 forward decay: 지금 들어온 검색은 2^((지금 - 기준 시각) / 반감기) 가중치로 더하고,
+# 읽을 때 같은 가중치로 나눈다. 그래서 오래된 카운터를 매번 줄여 줄 필요가 없다.
+# 상위 검색어는 주기적으로 DB(TrendingTerm)에 스냅샷으로 저장하고, 새 워커는 스냅샷으로 시작한다.
+# 저장은 요청 안에서 하지 않고 워커의 백그라운드 스레드에서, 지난 저장 이후 이 워커에서 늘어난 만큼만
+# DB 점수(감쇠 후)에 더한다. 그래서 여러 워커가 저장해도 서로 덮어쓰지 않는다.
+
+SKETCH_WIDTH = 2048
+SKETCH_DEPTH = 4
+MAX_TERM_LENGTH = 100
+# 가중치가 이 값을 넘으면 카운터 전체를 한 번 나눠서 기준 시각을 옮긴다 (float 오버플로 방지)
+RESCALE_AT = 2.0 ** 40
+
+
+class CountMinSketch:
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH):
+        self.width = width
+        self.depth = depth
+        self._rows = [array('d', bytes(8 * width)) for _ in range(depth)]
+
+    def _positions(self, term):
+        digest = hashlib.blake2b(term.encode(), digest_size=8 * self.depth).digest()
+        return [int.from_bytes(digest[i * 8:(i + 1) * 8], 'little') % self.width for i in range(self.depth)]
+
+    def add(self, term, amount):
+        # 더한 뒤의 추정치를 돌려준다
+        estimate = None
+        for row, position in zip(self._rows, self._positions(term)):
+            row[position] += amount
+            estimate = row[position] if estimate is None else min(estimate, row[position])
+        return estimate
+
+    def estimate(self, term):
+        return min(row[position] for row, position in zip(self._rows, self._positions(term)))
+
+    def scale(self, factor):
+        for row in self._rows:
+            for i in range(self.width):
+                row[i] *= factor
+
+
+class TrendingTerms:
+    def __init__(self, size, half_life, width=SKETCH_WIDTH, depth=SKETCH_DEPTH, clock=time.time):
+        self.size = size
+        self.half_life = half_life
+        self.clock = clock
+        self.sketch = CountMinSketch(width, depth)
+        self._landmark = clock()
+        self._top = {}    # term -> 추정치 (가중치 단위)
+        self._heap = []   # (추정치, term) 최소 heap, 갱신 전 항목은 꺼낼 때 버린다
+        self._pending = {}  # term -> 지난 저장 이후 늘어난 양 (가중치 단위, 상위 검색어만)
+        self._lock = threading.Lock()
+
+    def _weight(self, now):
+        return 2.0 ** ((now - self._landmark) / self.half_life)
+
+    def _rescale(self, now):
+        factor = 1 / self._weight(now)
+        self.sketch.scale(factor)
+        self._top = {term: score * factor for term, score in self._top.items()}
+        self._pending = {term: amount * factor for term, amount in self._pending.items()}
+        self._heap = [(score, term) for term, score in self._top.items()]
+        heapq.heapify(self._heap)
+        self._landmark = now
+
+    def _min(self):
+        while self._heap and self._top.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else 0.0
+
+    def record(self, term, amount=1.0, now=None, pending=True):
+        # pending=False: DB 스냅샷에서 읽어 온 양 (다시 저장할 몫이 아님)
+        now = self.clock() if now is None else now
+        with self._lock:
+            weight = self._weight(now)
+            if weight > RESCALE_AT:
+                self._rescale(now)
+                weight = 1.0
+            estimate = self.sketch.add(term, amount * weight)
+            if term not in self._top and len(self._top) >= self.size and estimate <= self._min():
+                return
+            self._top[term] = estimate
+            heapq.heappush(self._heap, (estimate, term))
+            if pending:
+                self._pending[term] = self._pending.get(term, 0.0) + amount * weight
+            while len(self._top) > self.size:
+                score, lowest = heapq.heappop(self._heap)
+                if self._top.get(lowest) == score:
+                    del self._top[lowest]
+                    self._pending.pop(lowest, None)
+            if len(self._heap) > 4 * self.size:
+                self._heap = [(score, term) for term, score in self._top.items()]
+                heapq.heapify(self._heap)
+
+    def top(self, limit=None, now=None):
+        # [(검색어, 지금 기준 감쇠된 점수)] 점수 높은 순
+        now = self.clock() if now is None else now
+        with self._lock:
+            weight = self._weight(now)
+            ranked = heapq.nlargest(limit or self.size, self._top.items(), key=lambda item: item[1])
+        return [(term, score / weight) for term, score in ranked]
+
+    def take_pending(self, now=None):
+        # 지난 저장 이후 늘어난 양 {term: 지금 기준 점수} 을 꺼내고 비운다
+        now = self.clock() if now is None else now
+        with self._lock:
+            weight = self._weight(now)
+            pending, self._pending = self._pending, {}
+        return {term: amount / weight for term, amount in pending.items()}
+
+
+def normalize_term(text):
+    from .suggest import normalize
+    term = normalize(text)
+    if not term or len(term) > MAX_TERM_LENGTH:
+        return None
+    return term
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+_last_flush = time.time()
+_flushing = False
+_flush_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+
+def half_life():
+    return getattr(settings, 'SEARCH_TRENDING_HALF_LIFE', 6 * 60 * 60)
+
+
+def load_snapshot(tracker):
+    from .models import TrendingTerm
+    now = tracker.clock()
+    for term, score, updated_at in TrendingTerm.objects.values_list('term', 'score', 'updated_at'):
+        age = max(now - updated_at.timestamp(), 0)
+        tracker.record(term, amount=score * 2.0 ** (-age / tracker.half_life), now=now, pending=False)
+
+
+def get_tracker():
+    # 워커마다 첫 사용 때 DB 스냅샷으로 채워서 만든다
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                tracker = TrendingTerms(getattr(settings, 'SEARCH_TRENDING_SIZE', 100), half_life())
+                load_snapshot(tracker)
+                _tracker = tracker
+    return _tracker
+
+
+def reset():
+    global _tracker
+    _tracker = None
+
+
+def record(text):
+    term = normalize_term(text)
+    if term is None:
+        return
+    get_tracker().record(term)
+    schedule_flush()
+
+
+def schedule_flush():
+    # 저장할 때가 됐으면 백그라운드 스레드에서 (요청은 기다리지 않음), 한 번에 하나만
+    global _last_flush, _flushing
+    interval = getattr(settings, 'SEARCH_TRENDING_FLUSH_INTERVAL', 5 * 60)
+    if time.time() - _last_flush < interval:
+        return
+    with _flush_lock:
+        if _flushing or time.time() - _last_flush < interval:
+            return
+        _flushing = True
+        _last_flush = time.time()
+    threading.Thread(target=flush_in_background, name='trending-flush', daemon=True).start()
+
+
+def flush_in_background():
+    global _flushing
+    try:
+        flush()
+    except DatabaseError:
+        logger.exception('Could not save trending search terms')
+    finally:
+        connection.close()  # 이 스레드의 DB 연결
+        _flushing = False
+
+
+def flush():
+    # 이 워커에서 늘어난 만큼을 DB 점수에 더하고, 반감기 여러 번이 지나도록 갱신되지 않은 검색어는 지운다
+    from .models import TrendingTerm
+    if _tracker is None:
+        return
+    deltas = _tracker.take_pending()
+    now = timezone.now()
+    expired = now - timedelta(seconds=10 * half_life())
+    with transaction.atomic():
+        # 없는 검색어는 0 점으로 먼저 만들고, 모든 행을 잠근 뒤 (다른 워커의 저장과 겹치지 않도록) 감쇠한 점수에 더한다
+        TrendingTerm.objects.bulk_create(
+            [TrendingTerm(term=term, score=0, updated_at=now) for term in deltas], ignore_conflicts=True,
+        )
+        rows = list(TrendingTerm.objects.select_for_update().filter(term__in=list(deltas)))
+        for row in rows:
+            age = max((now - row.updated_at).total_seconds(), 0)
+            row.score = row.score * 2.0 ** (-age / half_life()) + deltas[row.term]
+            row.updated_at = now
+        TrendingTerm.objects.bulk_update(rows, ['score', 'updated_at'])
+        TrendingTerm.objects.filter(updated_at__lt=expired).delete()
+
+
+def top(limit=10):
+    return get_tracker().top(limit)
@@ -1,5 +1,5 @@
 from django.urls import path, include
-from .views import SearchViewSet,ThemeDetailViewSet
+from .views import SearchViewSet,ThemeDetailViewSet,SuggestViewSet,TrendingViewSet
 from rest_framework import routers
 
 from django.conf import settings
@@ -10,6 +10,8 @@ app_name = 'search'
 default_router = routers.SimpleRouter(trailing_slash=False)
 default_router.register(r'search', SearchViewSet, basename='search')
 default_router.register(r'theme', ThemeDetailViewSet, basename='theme-detail')
+default_router.register(r'suggest', SuggestViewSet, basename='suggest')
+default_router.register(r'trending', TrendingViewSet, basename='trending')
 
 urlpatterns = [
     path('', include(default_router.urls)),
@@ -1,10 +1,28 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from .models import Theme
 from celeb.models import Celeb
 from routine.models import Routine
 from .serializers import ThemeSerializer, CelebritySerializer, RoutineSerializer
+from . import index as search_index
+from . import suggest
+from . import hangul
+from . import choseong
+from . import ranking
+from . import cache as search_cache
+from . import trending
+from project import versions, singleflight
+from django.db.models import Q, Prefetch
+
+CATEGORIES = ["인물", "루틴", "테마"]
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# 캐시가 비어 있을 때 같은 검색의 동시 요청은 한 번만 계산
+flights = singleflight.group('search')
+
 
 class SearchViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated] # 로그인 토큰 받고 다시 활성화
@@ -13,12 +31,71 @@ class SearchViewSet(viewsets.ViewSet):
         if not data:
             return Response({"detail": "Search term not provided."}, status=400)
 
+        # 카테고리별 limit 개씩, 더 보기는 ?category=루틴&cursor=... 로 해당 카테고리만 이어서
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=400)
+        category = request.query_params.get('category')
+        if category is not None and category not in CATEGORIES:
+            return Response({"detail": "Unknown category."}, status=400)
+        cursor_token = request.query_params.get('cursor')
+        cursor = None
+        if cursor_token is not None:
+            cursor = ranking.decode_cursor(cursor_token)
+            if category is None or cursor is None:
+                return Response({"detail": "Invalid cursor."}, status=400)
+        categories = [category] if category else CATEGORIES
+
+        # 같은 검색 결과는 캐시에서 (셀럽 / 루틴 / 테마가 바뀌면 비워짐)
+        data = suggest.normalize_query(data)
+        if not data:
+            return Response({"detail": "Search term not provided."}, status=400)
+        key = (data, category, limit, cursor_token)
+        response = search_cache.results.get(key)
+        if response is None:
+            response, _ = flights.do(key, lambda: self.cached_search(key, data, categories, limit, cursor))
+
+        # 첫 페이지에 결과가 있는 검색어만 인기 검색어로 센다 (초성만 입력한 건 제외)
+        if cursor is None and not hangul.is_choseong_query(data) and any(response[name] for name in categories):
+            trending.record(data)
+        return Response(response)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def cache(self, request):
+        # 검색 결과 캐시 적중률, 합쳐진 요청 수 (튜닝용, 이 워커 기준)
+        stats = search_cache.results.stats()
+        stats['singleflight'] = singleflight.stats()
+        return Response(stats)
+
+    def cached_search(self, key, data, categories, limit, cursor):
+        version = versions.get(versions.CATALOG)
+        response = self.search(data, categories, limit, cursor)
+        search_cache.results.set(key, response, version)
+        return response
+
+    def search(self, data, categories, limit, cursor):
         # 검색어를 이용해 연예인, 루틴, 테마를 검색
-        celebrities = Celeb.objects.filter(name__icontains=data) | Celeb.objects.filter(profession__icontains=data)
-        routines = Routine.objects.filter(title__icontains=data) #| Routine.objects.filter(content__icontains=data)
-        themes = Theme.objects.filter(title__icontains=data) #| Theme.objects.filter(content__icontains=data)
-        ##
-        theme_routines = Routine.objects.all()
+        if hangul.is_choseong_query(data):
+            # 초성만 입력한 경우 ('ㅇㄱ' -> 아침 요가): 미리 저장한 초성 키에서 단어 시작부터 일치하는 것 (자동완성과 같은 규칙)
+            celebrities = choseong.search(Celeb.objects.all(), data)
+            routines = choseong.search(Routine.objects.all(), data)
+            themes = choseong.search(Theme.objects.all(), data)
+        else:
+            # 검색 인덱스(search/index.py)로 후보를 좁힌 뒤 icontains 로 한 번 더 확인
+            celebrities = search_index.search(Celeb.objects.all(), data).filter(Q(name__icontains=data) | Q(profession__icontains=data))
+            routines = search_index.search(Routine.objects.all(), data).filter(Q(title__icontains=data) | Q(content__icontains=data))
+            themes = search_index.search(Theme.objects.all(), data).filter(Q(title__icontains=data) | Q(content__icontains=data))
+
+        # 루틴 카드는 셀럽을 join 으로, 테마별 루틴 제목은 prefetch 한 번으로 가져옴
+        routines = routines.select_related('celebrity')
+        theme_routines = Routine.objects.only('id', 'title')
+        themes = themes.prefetch_related(Prefetch('routine_set', queryset=theme_routines, to_attr='theme_routines'))
+
+        # 점수 / 인기도 순으로 정렬해서 한 페이지만 가져옴
+        celebrities, celeb_next = self.page(ranking.rank_celebs(celebrities, data), "인물", categories, limit, cursor)
+        routines, routine_next = self.page(ranking.rank_routines(routines, data), "루틴", categories, limit, cursor)
+        themes, theme_next = self.page(ranking.rank_themes(themes, data), "테마", categories, limit, cursor)
         # 직렬화
         #celeb_serializer = CelebritySerializer(celebrities, many=True)
         # routine_serializer = RoutineSerializer(routines, many=True)
@@ -41,12 +118,10 @@ class SearchViewSet(viewsets.ViewSet):
         # 테마에 루틴 추가
         theme_data = []
         for theme in themes:
-            routines_in_theme = theme_routines.filter(theme=theme)
-            routines_serializer = RoutineSerializer(routines_in_theme, many=True)
             theme_data.append({
                 "id": theme.id,
                 "title": theme.title,
-                "profession": [routine['title'] for routine in routines_serializer.data],
+                "profession": [routine.title for routine in theme.theme_routines],
                 "image": theme.image,  # 테마 페이지 대표 사진 URL 사용
                 "url": theme.id # 실제 테마 페이지 URL을 여기에 추가합니다.
             })
@@ -62,25 +137,36 @@ class SearchViewSet(viewsets.ViewSet):
                 "url": celeb.id ,    # 테마 페이지 대표 사진 URL 사용
             })
     
-        return Response({
+        result = {
             "인물": celeb_data,
             "루틴": routine_data,
             "테마": theme_data,
-        })
+        }
+        next_cursors = {"인물": celeb_next, "루틴": routine_next, "테마": theme_next}
+        response = {name: result[name] for name in categories}
+        response["next"] = {name: next_cursors[name] for name in categories}
+        return response
+
+    def page(self, queryset, name, categories, limit, cursor):
+        if name not in categories:
+            return [], None
+        return ranking.paginate(queryset, limit, cursor)
     
 
 class ThemeDetailViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     def retrieve(self, request, pk=None):
+        routines = RoutineSerializer().setup_eager_loading(Routine.objects.all())
         try:
-            theme = Theme.objects.get(pk=pk)
+            theme = Theme.objects.prefetch_related(
+                Prefetch('routine_set', queryset=routines, to_attr='theme_routines')
+            ).get(pk=pk)
         except Theme.DoesNotExist:
             return Response({"detail": "Theme not found."}, status=404)
         
         #theme_serializer = ThemeSerializer(theme)
-        routines = Routine.objects.filter(theme=theme)
-        routine_serializer = RoutineSerializer(routines, many=True)
+        routine_serializer = RoutineSerializer(theme.theme_routines, many=True)
         return Response({
             "theme_id": theme.id,
             "theme_title": theme.title,
@@ -88,3 +174,31 @@ class ThemeDetailViewSet(viewsets.ViewSet):
             "theme_image" : theme.image,
             "routine": routine_serializer.data
         })
+
+
+class SuggestViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        # 검색창 자동완성: 입력 중인 글자로 시작하는 셀럽 / 루틴 / 테마 제목
+        prefix = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), suggest.MAX_LIMIT)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=400)
+        return Response(suggest.suggest(prefix, max(limit, 1)))
+
+
+class TrendingViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        # 인기 검색어: 최근 검색 횟수(시간 감쇠) 상위 검색어를 메모리에서 바로
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), suggest.MAX_LIMIT)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=400)
+        return Response([
+            {"rank": rank, "term": term, "score": round(score, 2)}
+            for rank, (term, score) in enumerate(trending.top(max(limit, 1)), start=1)
+        ])